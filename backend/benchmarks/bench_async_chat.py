@@ -0,0 +1,60 @@
+"""Concurrency benchmark for the chat turn pipeline.
+
+Fires ``--requests`` concurrent chat turns at ``send_message`` on a single
+event loop with a mocked LLM that takes ``--llm-latency`` seconds:
+
+- before: the LLM call blocks the loop (a synchronous client inside an
+  async route), so turns are served one after another.
+- after:  the LLM call is awaited (AsyncOpenAI), so turns overlap.
+
+Usage (from backend/):
+    python -m benchmarks.bench_async_chat --requests 20 --llm-latency 2
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks import fakes
+
+from services import chat_service
+
+
+async def _run(requests: int, llm_latency: float, db_latency: float, blocking: bool) -> float:
+    db = fakes.FakeAsyncSupabase(latency=db_latency)
+    user_ids = fakes.seed(db, users=requests)
+    llm = fakes.FakeAsyncOpenAI(latency=0)
+    fakes.install(db=db, llm=llm)
+
+    word_ids = [w["id"] for w in db.tables["vocabularies"][:3]]
+    sessions = [
+        (await chat_service.create_session(user_id, "chat", word_ids))["session_id"]
+        for user_id in user_ids
+    ]
+
+    llm.latency = llm_latency
+    llm.blocking = blocking
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            chat_service.send_message(user_id, session_id, "I made a plan for my trip.")
+            for user_id, session_id in zip(user_ids, sessions)
+        )
+    )
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--llm-latency", type=float, default=2.0)
+    parser.add_argument("--db-latency", type=float, default=0.02)
+    args = parser.parse_args()
+
+    print(f"{args.requests} concurrent turns, mocked LLM {args.llm_latency}s, DB RTT {args.db_latency * 1000:.0f}ms")
+    for label, blocking in (("before (blocking LLM)", True), ("after  (async LLM)", False)):
+        elapsed = asyncio.run(_run(args.requests, args.llm_latency, args.db_latency, blocking))
+        print(f"{label}: {elapsed:7.2f}s total, {args.requests / elapsed:6.2f} req/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Audio normalization before transcription: bytes sent and transcription latency.
+
+For each clip, compares the upload as recorded (what the browser's
+MediaRecorder produces) with transcription_service.normalize_audio's output
+(silence trimmed, mono 16kHz Opus):
+
+- bytes sent to Groq
+- normalization time (ffmpeg decode/encode + VAD in the process pool)
+- transcription latency: measured against Groq when GROQ_API_KEY is set,
+  otherwise modelled as upload time at --uplink-mbps plus Whisper time
+  (--groq-overhead + audio seconds / --groq-speed).
+
+Clips come from --clips (a directory of recordings). Without it, synthetic
+clips are generated: 48kHz stereo Opus webm at 128kbps (Chrome's
+MediaRecorder default) with 0.5-3s of room noise before and after a
+3-12s speech-like segment.
+
+Needs ffmpeg (--ffmpeg to point at a binary).
+
+Usage (from backend/):
+    python -m benchmarks.bench_audio_normalize --synthetic 12
+    python -m benchmarks.bench_audio_normalize --clips ~/recordings
+"""
+import argparse
+import asyncio
+import random
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks import fakes  # noqa: F401  (sets up sys.path / settings)
+
+from config import settings
+from services import transcription_service
+from services.audio_processing import FRAME_BYTES, SAMPLE_RATE, frame_levels, speech_frames
+from services.audio_upload import SpooledAudio
+
+
+def _synthetic_clips(count: int, ffmpeg: str, directory: Path, seed: int) -> list[Path]:
+    rng = random.Random(seed)
+    clips = []
+    for i in range(count):
+        lead, speech, tail = rng.uniform(0.5, 3), rng.uniform(3, 12), rng.uniform(0.5, 3)
+        total = lead + speech + tail
+        path = directory / f"clip{i:02d}.webm"
+        # 말소리 대용: 4Hz로 진폭이 흔들리는 brown noise + 낮은 배경 소음
+        graph = (
+            f"anoisesrc=color=pink:amplitude=0.002:d={total:.2f}:r=48000[room];"
+            f"anoisesrc=color=brown:amplitude=0.5:d={speech:.2f}:r=48000,"
+            f"tremolo=f=4:d=0.9,adelay={int(lead * 1000)}:all=1,apad=whole_dur={total:.2f}[voice];"
+            "[room][voice]amix=inputs=2:normalize=0,aformat=channel_layouts=stereo"
+        )
+        subprocess.run(
+            [ffmpeg, "-hide_banner", "-loglevel", "error", "-y", "-filter_complex", graph,
+             "-c:a", "libopus", "-b:a", "128k", "-ar", "48000", str(path)],
+            check=True,
+        )
+        clips.append(path)
+    return clips
+
+
+def _spooled(path: Path) -> SpooledAudio:
+    audio = SpooledAudio(path.name, "audio/webm", settings.audio_spool_memory_bytes)
+    audio.write(path.read_bytes())
+    audio.seek(0)
+    return audio
+
+
+async def _durations(audio: SpooledAudio) -> tuple[float, float]:
+    """(clip seconds, seconds left after trimming)"""
+    pcm = await transcription_service._run_ffmpeg(
+        ["-i", "pipe:0", "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le", "pipe:1"],
+        source=audio,
+    )
+    frames = speech_frames(frame_levels(pcm))
+    speech = (frames[1] - frames[0]) * FRAME_BYTES if frames else 0
+    return len(pcm) / 2 / SAMPLE_RATE, speech / 2 / SAMPLE_RATE
+
+
+async def _transcribe_latency(audio: SpooledAudio, seconds: float, args) -> float:
+    if settings.groq_api_key:
+        start = time.perf_counter()
+        await transcription_service.transcribe_audio(audio)
+        return time.perf_counter() - start
+    upload = audio.size * 8 / (args.uplink_mbps * 1e6)
+    return upload + args.groq_overhead + seconds / args.groq_speed
+
+
+async def _run(clips: list[Path], args) -> None:
+    transcription_service.start()
+    if transcription_service._pool is None:
+        raise SystemExit("ffmpeg not found; pass --ffmpeg")
+    # 프로세스 풀 워커를 미리 띄운다 (첫 요청의 spawn 비용 제외)
+    with _spooled(clips[0]) as warm:
+        (await transcription_service.normalize_audio(warm)).close()
+
+    source = "Groq (measured)" if settings.groq_api_key else (
+        f"modelled: {args.uplink_mbps}Mbps uplink, {args.groq_overhead}s + audio/{args.groq_speed:g}x"
+    )
+    print(f"{len(clips)} clips, transcription latency {source}")
+    print(f"{'clip':<12} {'audio s':>8} {'bytes before':>13} {'after':>8} {'normalize':>10} "
+          f"{'STT before':>11} {'STT after':>10}")
+    totals = [0, 0, 0.0, 0.0, 0.0]
+    for path in clips:
+        with _spooled(path) as original:
+            seconds, speech_seconds = await _durations(original)
+            start = time.perf_counter()
+            normalized = await transcription_service.normalize_audio(original)
+            normalize_time = time.perf_counter() - start
+            with normalized:
+                after_seconds = speech_seconds if normalized is not original else seconds
+                before = await _transcribe_latency(original, seconds, args)
+                after = normalize_time + await _transcribe_latency(normalized, after_seconds, args)
+                print(
+                    f"{path.name:<12} {seconds:5.1f}>{after_seconds:<4.1f} {original.size:>11,d} "
+                    f"{normalized.size:>8,d} {normalize_time * 1000:8.0f}ms "
+                    f"{before * 1000:9.0f}ms {after * 1000:8.0f}ms"
+                )
+                for i, value in enumerate(
+                    (original.size, normalized.size, normalize_time, before, after)
+                ):
+                    totals[i] += value
+    n = len(clips)
+    print(
+        f"total bytes {totals[0]:,d} -> {totals[1]:,d} ({1 - totals[1] / totals[0]:.1%} smaller); "
+        f"mean normalize {totals[2] / n * 1000:.0f}ms; "
+        f"mean STT latency {totals[3] / n * 1000:.0f}ms -> {totals[4] / n * 1000:.0f}ms "
+        "(after includes normalization)"
+    )
+    saved_bits = (totals[0] - totals[1]) * 8 / n
+    if saved_bits > 0:
+        # 이보다 느린 업링크에서는 정규화가 지연 시간도 줄인다 (Whisper 시간 단축 제외)
+        print(f"break-even uplink: {saved_bits / (totals[2] / n) / 1e6:.1f}Mbps")
+    transcription_service.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clips", help="directory of recorded clips")
+    parser.add_argument("--synthetic", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--ffmpeg", default=settings.audio_ffmpeg_path)
+    parser.add_argument("--uplink-mbps", type=float, default=20.0)
+    parser.add_argument("--groq-overhead", type=float, default=0.25, help="seconds per request")
+    parser.add_argument("--groq-speed", type=float, default=216.0, help="x real time")
+    args = parser.parse_args()
+    settings.audio_ffmpeg_path = args.ffmpeg
+    settings.audio_normalize_enabled = True
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.clips:
+            clips = sorted(p for p in Path(args.clips).iterdir() if p.is_file())
+        else:
+            clips = _synthetic_clips(args.synthetic, args.ffmpeg, Path(tmp), args.seed)
+        asyncio.run(_run(clips, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Prompt size per turn on a long session: full history vs token-budgeted context.
+
+Runs ``--turns`` chat turns through ``send_message`` against the in-memory
+fakes and reports the estimated prompt tokens sent to the LLM per turn,
+next to what resending the full history would have cost. With the default
+budget the prompt size stops growing after the first few turns.
+
+Usage (from backend/):
+    python -m benchmarks.bench_context_window --turns 40
+"""
+import argparse
+import asyncio
+
+from benchmarks import fakes
+
+from services import chat_service
+from services.context_service import SUMMARY_SYSTEM_PROMPT, estimate_tokens
+
+
+async def _run(turns: int) -> None:
+    db = fakes.FakeAsyncSupabase()
+    user_id = fakes.seed(db)[0]
+    llm = fakes.FakeAsyncOpenAI(latency=0)
+    fakes.install(db=db, llm=llm)
+
+    word_ids = [w["id"] for w in db.tables["vocabularies"][:3]]
+    session_id = (await chat_service.create_session(user_id, "chat", word_ids))["session_id"]
+
+    print(f"{'turn':>4} {'full history':>13} {'budgeted':>9}")
+    for turn in range(1, turns + 1):
+        llm.requests.clear()
+        await chat_service.send_message(
+            user_id, session_id, f"Turn {turn}: I think my budget for the trip is fine."
+        )
+        # Let the background summary fold land before the next turn.
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+
+        sent = next(r for r in llm.requests if r[0]["content"] != SUMMARY_SYSTEM_PROMPT)
+        budgeted = sum(estimate_tokens(m["content"]) + 4 for m in sent)
+        history = [m for m in db.tables["chat_messages"] if m["session_id"] == session_id]
+        # Full history = system prompt + every earlier message + the new one.
+        full = (
+            estimate_tokens(sent[0]["content"]) + 4
+            + sum(estimate_tokens(m["content"]) + 4 for m in history[:-2])
+            + estimate_tokens(history[-2]["content"]) + 4
+        )
+        if turn == 1 or turn % 5 == 0:
+            print(f"{turn:>4} {full:>13} {budgeted:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=40)
+    args = parser.parse_args()
+    asyncio.run(_run(args.turns))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Client retries of POST /api/chat/message: LLM calls and saved messages, with and without Idempotency-Key.
+
+Each simulated turn is sent by a client that gives up waiting after
+--client-timeout seconds on --slow-rate of the turns (a flaky mobile
+network) and sends the same request again, up to --attempts times. The
+server keeps working on the abandoned request, as uvicorn does for a
+non-streaming route.
+
+before: the client retries without a key (every attempt is a new turn)
+after:  every attempt of a turn carries the same Idempotency-Key
+
+Runs the ASGI app in-process with fake Supabase / OpenAI.
+
+Usage (from backend/):
+    python -m benchmarks.bench_idempotency --turns 40 --slow-rate 0.3
+"""
+import argparse
+import asyncio
+import random
+import time
+import uuid
+
+from benchmarks import fakes
+
+import httpx
+
+
+async def _turn(client, session_id: str, content: str, key: str | None, timeout: float, attempts: int):
+    headers = {"Idempotency-Key": key} if key else {}
+    pending = set()
+    for attempt in range(attempts):
+        pending.add(asyncio.create_task(
+            client.post("/api/chat/message", json={"session_id": session_id, "content": content},
+                        headers=headers)
+        ))
+        wait = timeout if attempt < attempts - 1 else None
+        done, pending = await asyncio.wait(pending, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+        if done:
+            break
+    # 버려진 요청도 서버에서는 끝까지 처리된다
+    await asyncio.gather(*pending)
+    return next(iter(done)).result()
+
+
+async def _run(args, with_key: bool) -> dict:
+    import main
+    from middleware.auth import get_current_user_id
+    from services import chat_service
+    from services.background_queue import write_behind
+
+    db = fakes.FakeAsyncSupabase(latency=args.db_latency)
+    user_ids = fakes.seed(db, users=1)
+    llm = fakes.FakeAsyncOpenAI(latency=args.llm_latency)
+    fakes.install(db=db, llm=llm)
+    main.app.dependency_overrides[get_current_user_id] = lambda: user_ids[0]
+    write_behind.start()
+
+    word_ids = [w["id"] for w in db.tables["vocabularies"][:3]]
+    session_id = (await chat_service.create_session(user_ids[0], "chat", word_ids))["session_id"]
+    llm.calls = 0
+    client = httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench")
+
+    rng = random.Random(args.seed)
+    start = time.perf_counter()
+    for i in range(args.turns):
+        slow = rng.random() < args.slow_rate
+        response = await _turn(
+            client, session_id, f"Turn {i}: I made a budget for my trip.",
+            key=str(uuid.uuid4()) if with_key else None,
+            timeout=args.client_timeout if slow else 3600,
+            attempts=args.attempts,
+        )
+        assert response.status_code == 200, response.text
+    elapsed = time.perf_counter() - start
+    await write_behind.stop(timeout=10)
+    user_messages = sum(
+        1 for m in db.tables["chat_messages"] if m["session_id"] == session_id and m["role"] == "user"
+    )
+    return {"llm": llm.calls, "user_messages": user_messages, "elapsed": elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--slow-rate", type=float, default=0.3)
+    parser.add_argument("--client-timeout", type=float, default=0.3)
+    parser.add_argument("--attempts", type=int, default=3)
+    parser.add_argument("--llm-latency", type=float, default=0.8)
+    parser.add_argument("--db-latency", type=float, default=0.005)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    print(
+        f"{args.turns} turns, {args.slow_rate:.0%} retried every {args.client_timeout}s "
+        f"(up to {args.attempts} attempts), LLM {args.llm_latency}s"
+    )
+    for label, with_key in (("before", False), ("after", True)):
+        result = asyncio.run(_run(args, with_key))
+        print(
+            f"{label:>6}: LLM calls {result['llm']:4d}  user messages saved {result['user_messages']:4d}"
+            f"  (expected {args.turns})  {result['elapsed']:.1f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Login tail after the Toss calls: select-then-insert vs the login_user RPC.
+
+before: `select * from users where toss_user_key = ...`, then an insert for
+        a new user, then JWT minting (the old login_with_toss)
+after:  auth_service.upsert_login_user (one RPC, db/migrations/007) and
+        JWT minting
+
+Measures latency and DB round trips for first and returning logins over
+the fake Supabase client (--db-latency per round trip), and how many users
+rows each variant creates when --racers first logins with the same
+toss_user_key arrive together. The fake has no UNIQUE constraint, so extra
+rows stand for the inserts Postgres would reject (a failed login).
+
+Usage (from backend/):
+    python -m benchmarks.bench_login_persistence --logins 50 --db-latency 0.01
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks import fakes
+
+from middleware.auth import create_access_token, create_refresh_token
+from services import auth_service
+
+
+async def _legacy_tail(db: fakes.FakeAsyncSupabase, toss_user_key: str) -> dict:
+    existing = await db.table("users").select("*").eq("toss_user_key", toss_user_key).execute()
+    if not existing.data:
+        result = await db.table("users").insert({"toss_user_key": toss_user_key}).execute()
+        user = result.data[0]
+    else:
+        user = existing.data[0]
+    create_access_token(user["id"])
+    create_refresh_token(user["id"])
+    return user
+
+
+async def _tail(db: fakes.FakeAsyncSupabase, toss_user_key: str) -> dict:
+    user = await auth_service.upsert_login_user(toss_user_key)
+    return auth_service.login_response(user)
+
+
+async def _measure(tail, args) -> dict:
+    db = fakes.FakeAsyncSupabase(latency=args.db_latency)
+    fakes.install(db=db)
+    out = {}
+    # 같은 키로 두 번: 처음엔 신규 유저, 다음엔 기존 유저
+    for label in ("first", "returning"):
+        db.round_trips = 0
+        start = time.perf_counter()
+        for i in range(args.logins):
+            await tail(db, f"user-{i}")
+        out[label] = (
+            (time.perf_counter() - start) / args.logins * 1000,
+            db.round_trips / args.logins,
+        )
+    await asyncio.gather(*(tail(db, "racer") for _ in range(args.racers)))
+    out["rows"] = sum(1 for u in db.tables["users"] if u["toss_user_key"] == "racer")
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--db-latency", type=float, default=0.01)
+    parser.add_argument("--racers", type=int, default=2)
+    args = parser.parse_args()
+
+    print(f"{args.logins} logins, DB RTT {args.db_latency * 1000:.0f}ms")
+    for label, tail in (("before", _legacy_tail), ("after", _tail)):
+        result = asyncio.run(_measure(tail, args))
+        first, returning = result["first"], result["returning"]
+        print(
+            f"{label:>6}: first login {first[0]:5.1f}ms ({first[1]:.0f} round trips)  "
+            f"returning {returning[0]:5.1f}ms ({returning[1]:.0f})  "
+            f"users rows from {args.racers} concurrent first logins: {result['rows']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
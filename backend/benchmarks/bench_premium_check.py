@@ -0,0 +1,87 @@
+"""Premium check per speaking request: users-table lookup vs signed entitlement claims.
+
+before: the old require_premium, a sync dependency (FastAPI runs it in its
+        threadpool) that read users.is_premium / premium_expires_at with the
+        sync Supabase client; simulated as a --db-latency round trip in the
+        threadpool
+after:  middleware.premium.require_premium on the token's claims
+
+Both decode the same access token first. Requests arrive in bursts of
+--concurrency; the threadpool is Starlette's default (40 threads).
+
+Usage (from backend/):
+    python -m benchmarks.bench_premium_check --requests 2000 --concurrency 100
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks import fakes  # noqa: F401  (sets up sys.path / settings)
+
+from fastapi.security import HTTPAuthorizationCredentials
+from starlette.concurrency import run_in_threadpool
+
+from middleware.auth import create_access_token, get_current_user_id, get_token_claims
+from middleware.premium import require_premium
+
+USER = {"is_premium": True, "premium_expires_at": "2099-01-01T00:00:00+00:00"}
+
+
+def _legacy_lookup(user_id: str, latency: float) -> dict:
+    time.sleep(latency)  # sync Supabase 클라이언트의 왕복
+    return USER
+
+
+async def _before(credentials, latency: float) -> str:
+    user_id = await get_current_user_id(await get_token_claims(credentials))
+    user = await run_in_threadpool(_legacy_lookup, user_id, latency)
+    assert user["is_premium"]
+    return user_id
+
+
+async def _after(credentials, latency: float) -> str:
+    return await require_premium(await get_token_claims(credentials))
+
+
+async def _run(check, args) -> list[float]:
+    from services import entitlements
+
+    token = create_access_token("user-1", entitlements.claims(USER))
+    credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+
+    async def timed() -> float:
+        start = time.perf_counter()
+        await check(credentials, args.db_latency)
+        return time.perf_counter() - start
+
+    latencies = []
+    for _ in range(args.requests // args.concurrency):
+        latencies += await asyncio.gather(*(timed() for _ in range(args.concurrency)))
+    return sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--db-latency", type=float, default=0.01)
+    args = parser.parse_args()
+
+    print(
+        f"{args.requests} premium checks, {args.concurrency} concurrent, "
+        f"DB RTT {args.db_latency * 1000:.0f}ms"
+    )
+    for label, check in (("before", _before), ("after", _after)):
+        start = time.perf_counter()
+        latencies = asyncio.run(_run(check, args))
+        elapsed = time.perf_counter() - start
+        print(
+            f"{label:>6}: p50 {latencies[len(latencies) // 2] * 1000:7.2f}ms  "
+            f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:7.2f}ms  "
+            f"{len(latencies) / elapsed:8.0f} checks/s  "
+            f"DB round trips {len(latencies) if check is _before else 0}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Per-turn system prompt build time: read + str.format vs the prompt registry.
+
+legacy: read prompts/<mode>_system.txt from disk and str.format the whole
+        template (what chat_service._build_system_prompt did every turn).
+parse:  str.format on a template already in memory (no disk read).
+registry: services.prompt_registry (pre-split template, one join), with the
+        periodic mtime check enabled as in production.
+
+Usage (from backend/):
+    python -m benchmarks.bench_prompt_build --number 20000
+"""
+import argparse
+import timeit
+
+from benchmarks import fakes  # noqa: F401  (sets up sys.path / settings)
+
+from services.prompt_registry import PROMPTS_DIR, build_system_prompt
+
+WORDS = [{"word": "budget"}, {"word": "reluctant"}, {"word": "commute"}]
+WORDS_USED = {"budget": True, "reluctant": False, "commute": False}
+
+
+def _values() -> dict:
+    used = [w for w, u in WORDS_USED.items() if u]
+    return {
+        "level": "intermediate",
+        "word1": WORDS[0]["word"],
+        "word2": WORDS[1]["word"],
+        "word3": WORDS[2]["word"],
+        "used_words": ", ".join(used) if used else "none",
+        # 후보 단어가 없는 턴
+        "word_usage_rules": "",
+        "word_usage_field": "",
+    }
+
+
+def _legacy(mode: str) -> str:
+    filename = "speaking_system.txt" if mode == "speaking" else "chat_system.txt"
+    template = (PROMPTS_DIR / filename).read_text(encoding="utf-8")
+    return template.format(**_values())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20_000)
+    args = parser.parse_args()
+
+    print(f"mean of {args.number} builds")
+    for mode in ("chat", "speaking"):
+        expected = build_system_prompt(mode, "intermediate", WORDS, WORDS_USED)
+        assert _legacy(mode) == expected
+        text = (PROMPTS_DIR / f"{mode}_system.txt").read_text(encoding="utf-8")
+
+        legacy = timeit.timeit(lambda: _legacy(mode), number=args.number)
+        parse = timeit.timeit(lambda: text.format(**_values()), number=args.number)
+        registry = timeit.timeit(
+            lambda: build_system_prompt(mode, "intermediate", WORDS, WORDS_USED),
+            number=args.number,
+        )
+        print(
+            f"{mode:>8}: legacy {legacy / args.number * 1e6:6.2f}us  "
+            f"format-only {parse / args.number * 1e6:6.2f}us  "
+            f"registry {registry / args.number * 1e6:6.2f}us"
+        )
+
+
+if __name__ == "__main__":
+    main()
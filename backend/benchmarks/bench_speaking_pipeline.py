@@ -0,0 +1,137 @@
+"""End-to-end latency of the audio speaking pipeline: sequential vs staged.
+
+before: session lookup, then the Groq upload, then LLM post-processing on
+        every transcript, then the chat turn (the old /transcribe route).
+after:  services.speaking_pipeline: the lookup overlaps the Groq upload
+        and post-processing is skipped for clean transcripts.
+
+Groq, the LLM and the database are simulated with fixed latencies
+(--groq-latency, --llm-latency, --db-latency). Half of the transcripts
+need clean-up (a filler word or a misheard target word). The session cache
+is cleared before every request, as for the first audio turn a worker
+serves for a session (--warm keeps it). Every request uploads different
+audio and the transcript cache is cleared, so nothing is served from it
+(see bench_transcript_cache).
+
+Usage (from backend/):
+    python -m benchmarks.bench_speaking_pipeline --requests 40
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import time
+
+from benchmarks import fakes
+
+import httpx
+
+from services import session_cache, speaking_pipeline, transcript_cache, transcription_service
+from services.audio_upload import SpooledAudio
+from services.chat_service import create_session, get_session_state, send_message
+
+TRANSCRIPTS = [
+    "I made a budget for my trip to Busan.",
+    "Um, I was relucant to take the subway.",
+    "My commute takes about an hour every day.",
+    "I I think the plan is good.",
+]
+
+
+class _GroqStandIn(httpx.AsyncBaseTransport):
+    def __init__(self, latency: float):
+        self.latency = latency
+        self._texts = itertools.cycle(TRANSCRIPTS)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        async for _ in request.stream:
+            pass
+        await asyncio.sleep(self.latency)
+        return httpx.Response(200, text=next(self._texts))
+
+
+def _audio() -> SpooledAudio:
+    audio = SpooledAudio("audio.webm", "audio/webm", spool_bytes=1 << 20)
+    audio.write(os.urandom(32 * 1024))
+    audio.seek(0)
+    return audio
+
+
+async def _before(user_id: str, session_id: str) -> None:
+    state = await get_session_state(user_id, session_id)
+    words = [w["word"] for w in state.words]
+    with _audio() as audio:
+        raw = await transcription_service.transcribe_audio(audio)
+    processed = await transcription_service.post_process_transcript(raw, words)
+    await send_message(user_id, session_id, processed or raw, mode="speaking")
+
+
+async def _after(user_id: str, session_id: str) -> None:
+    timer = speaking_pipeline.StageTimer()
+    with _audio() as audio:
+        _, transcription = await speaking_pipeline.transcribe(user_id, session_id, audio, timer)
+    with timer.stage("respond"):
+        await send_message(user_id, session_id, transcription["text"], mode="speaking")
+    speaking_pipeline.record(timer)
+
+
+def _llm_reply(messages: list[dict]) -> str:
+    if messages[0]["content"].startswith("You are a dictation post-processor"):
+        return messages[-1]["content"].split("RAW_TRANSCRIPTION: ", 1)[-1]
+    return fakes._reply_for(messages)
+
+
+async def _run(args, pipeline) -> list[float]:
+    db = fakes.FakeAsyncSupabase(latency=args.db_latency)
+    user_ids = fakes.seed(db, users=1)
+    db.tables["users"][0]["is_premium"] = True
+    fakes.install(db=db, llm=fakes.FakeAsyncOpenAI(latency=args.llm_latency, reply=_llm_reply))
+    transcription_service.settings.groq_api_key = "bench"
+    transcription_service.groq_client = httpx.AsyncClient(
+        base_url="https://groq.bench", transport=_GroqStandIn(args.groq_latency)
+    )
+    words = [w for w in db.tables["vocabularies"] if w["word"] in ("budget", "commute")]
+    word_ids = [w["id"] for w in db.tables["vocabularies"][:3 - len(words)]] + [
+        w["id"] for w in words
+    ]
+    session_id = (await create_session(user_ids[0], "speaking", word_ids))["session_id"]
+
+    latencies = []
+    for _ in range(args.requests):
+        transcript_cache.clear()
+        if not args.warm:
+            session_cache.invalidate(session_id)
+        start = time.perf_counter()
+        await pipeline(user_ids[0], session_id)
+        latencies.append(time.perf_counter() - start)
+    return sorted(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--groq-latency", type=float, default=0.3)
+    parser.add_argument("--llm-latency", type=float, default=0.4)
+    parser.add_argument("--db-latency", type=float, default=0.03)
+    parser.add_argument("--warm", action="store_true", help="keep the session cache warm")
+    args = parser.parse_args()
+
+    print(
+        f"{args.requests} audio turns, Groq {args.groq_latency}s, LLM {args.llm_latency}s, "
+        f"DB RTT {args.db_latency * 1000:.0f}ms, {'warm' if args.warm else 'cold'} session cache"
+    )
+    for label, pipeline in (("before", _before), ("after", _after)):
+        latencies = asyncio.run(_run(args, pipeline))
+        print(
+            f"{label:>6}: mean {sum(latencies) / len(latencies):5.3f}s  "
+            f"p50 {latencies[len(latencies) // 2]:5.3f}s  p95 {latencies[int(len(latencies) * 0.95) - 1]:5.3f}s"
+        )
+    print("stage timings (after):")
+    stats = speaking_pipeline.stats()
+    for name, stage in stats["stages"].items():
+        print(f"  {name:<15} p50 {stage['p50_ms']:7.1f}ms  p95 {stage['p95_ms']:7.1f}ms")
+    print(f"  post-processing: {stats['post_process']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Per-request auth overhead: full JWT verification vs the verified-token cache.
+
+jose:   middleware.auth.get_token_claims with the cache disabled, i.e. the
+        python-jose decode (HMAC check, claims parsing, exp validation) on
+        every request, as before
+pyjwt:  the same checks with PyJWT's decode, for comparison (skipped when
+        PyJWT is not installed; the app itself stays on python-jose)
+cached: get_token_claims with the verified-token LRU cache (token_cache_size)
+
+--users distinct access tokens are sent round-robin, so each token is
+verified once and then served from the cache.
+
+Usage (from backend/):
+    python -m benchmarks.bench_token_auth --requests 50000 --users 100
+"""
+import argparse
+import asyncio
+import time
+import warnings
+
+from benchmarks import fakes  # noqa: F401  (sets up sys.path / settings)
+
+from fastapi import HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials
+
+from config import settings
+from middleware import auth
+from services.ttl_cache import TTLCache
+
+try:
+    import jwt as pyjwt
+
+    # fakes의 테스트용 짧은 시크릿에 대한 경고
+    warnings.filterwarnings("ignore", message="The HMAC key is")
+except ImportError:
+    pyjwt = None
+
+
+async def _pyjwt_claims(credentials: HTTPAuthorizationCredentials) -> dict:
+    try:
+        payload = pyjwt.decode(
+            credentials.credentials, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm]
+        )
+    except pyjwt.PyJWTError:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    if payload.get("sub") is None or payload.get("type") != "access":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED)
+    return payload
+
+
+async def _run(check, credentials: list, requests: int) -> float:
+    start = time.perf_counter()
+    for i in range(requests):
+        await check(credentials[i % len(credentials)])
+    return (time.perf_counter() - start) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--users", type=int, default=100)
+    args = parser.parse_args()
+
+    credentials = [
+        HTTPAuthorizationCredentials(
+            scheme="Bearer", credentials=auth.create_access_token(f"user-{i}")
+        )
+        for i in range(args.users)
+    ]
+    ttl = settings.jwt_access_token_expire_minutes * 60
+    variants = [("jose", TTLCache(maxsize=0, ttl=ttl), auth.get_token_claims)]
+    if pyjwt is not None:
+        variants.append(("pyjwt", None, _pyjwt_claims))
+    variants.append(("cached", TTLCache(maxsize=settings.token_cache_size, ttl=ttl), auth.get_token_claims))
+
+    print(f"{args.requests} authenticated requests, {args.users} distinct tokens")
+    baseline = None
+    for label, cache, check in variants:
+        if cache is not None:
+            auth._verified = cache
+        per_request = asyncio.run(_run(check, credentials, args.requests))
+        baseline = baseline or per_request
+        line = (
+            f"{label:>6}: {per_request * 1e6:7.2f}us/request  "
+            f"{1 / per_request:9.0f} requests/s  x{baseline / per_request:5.1f}"
+        )
+        if cache is not None and cache.maxsize:
+            line += f"  hit rate {cache.stats()['hit_rate']}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
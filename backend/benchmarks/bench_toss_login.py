@@ -0,0 +1,238 @@
+"""Toss login latency (token exchange + login-me) over mTLS: client per call vs pooled client.
+
+before: a new httpx.AsyncClient per partner API call (certificate loaded
+        from disk, TCP + TLS handshake every time)
+after:  toss_api_service's pooled keep-alive client
+
+The stand-in partner API is uvicorn serving HTTPS on localhost and
+requiring a client certificate (a throwaway CA, server and client
+certificate are generated with `cryptography`). A TCP proxy in front of it
+adds --rtt of round-trip latency, so handshakes cost what they would across
+a network. The stand-in speaks HTTP/1.1 only; TOSS_HTTP2 is not measured.
+
+Usage (from backend/):
+    python -m benchmarks.bench_toss_login --logins 50 --rtt 0.01
+"""
+import argparse
+import asyncio
+import datetime
+import ipaddress
+import os
+import socket
+import ssl
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from benchmarks import fakes  # noqa: F401  (sets up sys.path / settings)
+
+import httpx
+import uvicorn
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.x509.oid import NameOID
+
+from config import settings
+from services import toss_api_service
+
+
+def _write_certs(directory: Path) -> dict[str, str]:
+    now = datetime.datetime.now(datetime.timezone.utc)
+
+    def issue(name: str, issuer_name, issuer_key, ca: bool = False, san=None):
+        key = ec.generate_private_key(ec.SECP256R1())
+        subject = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, name)])
+        builder = (
+            x509.CertificateBuilder()
+            .subject_name(subject)
+            .issuer_name(issuer_name or subject)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(minutes=1))
+            .not_valid_after(now + datetime.timedelta(days=1))
+            .add_extension(x509.BasicConstraints(ca=ca, path_length=None), critical=True)
+        )
+        if san:
+            builder = builder.add_extension(x509.SubjectAlternativeName(san), critical=False)
+        cert = builder.sign(issuer_key or key, hashes.SHA256())
+        return key, cert
+
+    ca_key, ca_cert = issue("bench-ca", None, None, ca=True)
+    paths = {}
+    for role, san in (
+        ("server", [x509.DNSName("localhost"), x509.IPAddress(ipaddress.ip_address("127.0.0.1"))]),
+        ("client", None),
+    ):
+        key, cert = issue(f"bench-{role}", ca_cert.subject, ca_key, san=san)
+        paths[f"{role}_key"] = str(directory / f"{role}.key")
+        paths[f"{role}_crt"] = str(directory / f"{role}.crt")
+        Path(paths[f"{role}_key"]).write_bytes(key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption(),
+        ))
+        Path(paths[f"{role}_crt"]).write_bytes(cert.public_bytes(serialization.Encoding.PEM))
+    paths["ca"] = str(directory / "ca.crt")
+    Path(paths["ca"]).write_bytes(ca_cert.public_bytes(serialization.Encoding.PEM))
+    return paths
+
+
+async def _partner_api(scope, receive, send):
+    if scope["type"] != "http":
+        return
+    while (await receive()).get("more_body"):
+        pass
+    if scope["path"].endswith("/generate-token"):
+        body = b'{"resultType": "SUCCESS", "success": {"accessToken": "toss-token"}}'
+    else:
+        body = b'{"resultType": "SUCCESS", "success": {"userKey": 123456}}'
+    await send({"type": "http.response.start", "status": 200,
+                "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": body})
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(certs: dict[str, str]) -> int:
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(
+        _partner_api, host="127.0.0.1", port=port, log_level="error",
+        ssl_certfile=certs["server_crt"], ssl_keyfile=certs["server_key"],
+        ssl_ca_certs=certs["ca"], ssl_cert_reqs=ssl.CERT_REQUIRED,
+    ))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return port
+
+
+class _LatencyProxy:
+    """TCP proxy delaying every chunk by rtt/2 in each direction."""
+
+    def __init__(self, upstream_port: int, rtt: float):
+        self.upstream_port = upstream_port
+        self.delay = rtt / 2
+        self.connections = 0
+        self._handlers: set[asyncio.Task] = set()
+
+    async def start(self) -> int:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        self._server.close()
+        await asyncio.wait_for(asyncio.gather(*self._handlers), timeout=5)
+
+    async def _pipe(self, reader, writer):
+        queue: asyncio.Queue = asyncio.Queue()
+
+        async def forward():
+            while True:
+                due, chunk = await queue.get()
+                await asyncio.sleep(max(0.0, due - time.monotonic()))
+                if not chunk:
+                    writer.close()
+                    return
+                writer.write(chunk)
+                await writer.drain()
+
+        forwarder = asyncio.create_task(forward())
+        try:
+            while chunk := await reader.read(65536):
+                queue.put_nowait((time.monotonic() + self.delay, chunk))
+        except ConnectionError:
+            pass
+        queue.put_nowait((time.monotonic() + self.delay, b""))
+        await forwarder
+
+    async def _handle(self, client_reader, client_writer):
+        self.connections += 1
+        self._handlers.add(asyncio.current_task())
+        up_reader, up_writer = await asyncio.open_connection("127.0.0.1", self.upstream_port)
+        await asyncio.gather(
+            self._pipe(client_reader, up_writer),
+            self._pipe(up_reader, client_writer),
+            return_exceptions=True,
+        )
+
+
+async def _legacy_call(method: str, path: str, **kwargs) -> dict:
+    async with httpx.AsyncClient(
+        cert=(settings.toss_mtls_cert_path, settings.toss_mtls_key_path),
+        base_url=settings.toss_api_url,
+        timeout=30.0,
+    ) as client:
+        response = await client.request(method, path, **kwargs)
+        return response.json()["success"]
+
+
+async def _legacy_login() -> None:
+    token = await _legacy_call(
+        "POST", "/api-partner/v1/apps-in-toss/user/oauth2/generate-token",
+        json={"authorizationCode": "code", "referrer": "DEFAULT"},
+    )
+    await _legacy_call(
+        "GET", "/api-partner/v1/apps-in-toss/user/oauth2/login-me",
+        headers={"Authorization": f"Bearer {token['accessToken']}"},
+    )
+
+
+async def _pooled_login() -> None:
+    token = await toss_api_service.exchange_authorization_code("code", "DEFAULT")
+    await toss_api_service.get_toss_user_info(token["accessToken"])
+
+
+async def _run(login, upstream_port: int, args) -> tuple[list[float], int]:
+    proxy = _LatencyProxy(upstream_port, args.rtt)
+    settings.toss_api_url = f"https://localhost:{await proxy.start()}"
+    await login()  # 워밍업 (pooled: 첫 연결)
+    proxy.connections = 0
+
+    latencies = []
+    for _ in range(args.logins // args.concurrency):
+        start = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(args.concurrency)))
+        latencies.append((time.perf_counter() - start))
+        await asyncio.sleep(args.interval)
+    await toss_api_service.close()
+    await proxy.stop()
+    return sorted(latencies), proxy.connections
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=1, help="logins started together")
+    parser.add_argument("--rtt", type=float, default=0.01, help="network round trip, seconds")
+    parser.add_argument("--interval", type=float, default=0.05, help="pause between logins")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        certs = _write_certs(Path(tmp))
+        os.environ["SSL_CERT_FILE"] = certs["ca"]  # httpx가 stand-in 서버 인증서를 신뢰하도록
+        settings.toss_mtls_cert_path = certs["client_crt"]
+        settings.toss_mtls_key_path = certs["client_key"]
+        upstream_port = _start_server(certs)
+
+        print(
+            f"{args.logins} logins ({args.concurrency} at a time), "
+            f"RTT {args.rtt * 1000:.0f}ms, mTLS stand-in over HTTP/1.1"
+        )
+        for label, login in (("before", _legacy_login), ("after", _pooled_login)):
+            latencies, connections = asyncio.run(_run(login, upstream_port, args))
+            print(
+                f"{label:>6}: mean {sum(latencies) / len(latencies) * 1000:6.1f}ms  "
+                f"p50 {latencies[len(latencies) // 2] * 1000:6.1f}ms  "
+                f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:6.1f}ms  "
+                f"new connections {connections}"
+            )
+
+
+if __name__ == "__main__":
+    main()
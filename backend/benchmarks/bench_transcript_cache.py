@@ -0,0 +1,144 @@
+"""Retried audio uploads: Groq / post-processing calls and latency, with and without the transcript cache.
+
+Replays a stream of /transcribe requests in which --retry-rate of the
+requests re-upload a clip sent in the last few requests (a client retrying
+after a timeout). Half of the clips need LLM clean-up.
+
+before: transcript cache disabled (every request pays Groq, and the LLM
+        when needed)
+after:  services.transcript_cache (audio hash -> raw transcript,
+        (raw transcript, target words) -> processed transcript)
+
+Groq, the LLM and the database are simulated with fixed latencies.
+
+Usage (from backend/):
+    python -m benchmarks.bench_transcript_cache --requests 100 --retry-rate 0.2
+"""
+import argparse
+import asyncio
+import random
+import re
+import time
+
+from benchmarks import fakes
+
+import httpx
+
+from services import speaking_pipeline, transcript_cache, transcription_service
+from services.audio_upload import SpooledAudio
+from services.chat_service import create_session
+from services.ttl_cache import TTLCache
+
+TRANSCRIPTS = [
+    "I made a budget for my trip to Busan.",
+    "Um, I was relucant to take the subway.",
+    "My commute takes about an hour every day.",
+    "I I think the plan is good.",
+]
+
+
+class _GroqStandIn(httpx.AsyncBaseTransport):
+    """Returns the same transcript for the same clip."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = b"".join([chunk async for chunk in request.stream])
+        clip = int(re.search(rb"clip(\d+)", body).group(1))
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return httpx.Response(200, text=f"{TRANSCRIPTS[clip % len(TRANSCRIPTS)]} ({clip})")
+
+
+def _audio(clip: int) -> SpooledAudio:
+    audio = SpooledAudio("audio.webm", "audio/webm", spool_bytes=1 << 20)
+    audio.write(f"clip{clip:06d}".encode().ljust(32 * 1024, b"\x1a"))
+    audio.seek(0)
+    return audio
+
+
+def _llm_reply(messages: list[dict]) -> str:
+    if messages[0]["content"].startswith("You are a dictation post-processor"):
+        return messages[-1]["content"].split("RAW_TRANSCRIPTION: ", 1)[-1]
+    return fakes._reply_for(messages)
+
+
+def _requests(count: int, retry_rate: float, seed: int) -> list[int]:
+    rng = random.Random(seed)
+    clips: list[int] = []
+    for _ in range(count):
+        if clips and rng.random() < retry_rate:
+            clips.append(rng.choice(clips[-5:]))
+        else:
+            clips.append(len(set(clips)))
+    return clips
+
+
+async def _run(args, cached: bool) -> dict:
+    db = fakes.FakeAsyncSupabase(latency=args.db_latency)
+    user_ids = fakes.seed(db, users=1)
+    db.tables["users"][0]["is_premium"] = True
+    llm = fakes.FakeAsyncOpenAI(latency=args.llm_latency, reply=_llm_reply)
+    fakes.install(db=db, llm=llm)
+    groq = _GroqStandIn(args.groq_latency)
+    transcription_service.settings.groq_api_key = "bench"
+    transcription_service.groq_client = httpx.AsyncClient(
+        base_url="https://groq.bench", transport=groq
+    )
+    size = 2000 if cached else 0
+    transcript_cache._raw = TTLCache(size, ttl=1800)
+    transcript_cache._processed = TTLCache(size, ttl=1800)
+
+    word_ids = [w["id"] for w in db.tables["vocabularies"][:3]]
+    session_id = (await create_session(user_ids[0], "speaking", word_ids))["session_id"]
+    llm.calls = 0
+
+    latencies = []
+    for clip in _requests(args.requests, args.retry_rate, args.seed):
+        start = time.perf_counter()
+        with _audio(clip) as audio:
+            await speaking_pipeline.transcribe(
+                user_ids[0], session_id, audio, speaking_pipeline.StageTimer()
+            )
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {
+        "groq": groq.calls,
+        "llm": llm.calls,
+        "mean": sum(latencies) / len(latencies),
+        "p50": latencies[len(latencies) // 2],
+        "stats": transcript_cache.stats(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=100)
+    parser.add_argument("--retry-rate", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--groq-latency", type=float, default=0.3)
+    parser.add_argument("--llm-latency", type=float, default=0.4)
+    parser.add_argument("--db-latency", type=float, default=0.005)
+    args = parser.parse_args()
+
+    print(
+        f"{args.requests} requests, {args.retry_rate:.0%} retries, "
+        f"Groq {args.groq_latency}s, LLM {args.llm_latency}s"
+    )
+    for label, cached in (("before", False), ("after", True)):
+        result = asyncio.run(_run(args, cached))
+        print(
+            f"{label:>6}: Groq calls {result['groq']:4d}  post-processing calls {result['llm']:4d}  "
+            f"transcribe mean {result['mean']:5.3f}s  p50 {result['p50']:5.3f}s"
+        )
+    stats = result["stats"]
+    print(
+        f"hit rate: audio {stats['audio']['hit_rate']:.1%}, "
+        f"transcript {stats['transcript']['hit_rate']:.1%}"
+    )
+
+
+if __name__ == "__main__":
+    main()
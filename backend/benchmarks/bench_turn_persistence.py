@@ -0,0 +1,102 @@
+"""Latency of persisting one chat turn: sequential PostgREST calls vs one RPC.
+
+The legacy path below reproduces the writes send_message used to make after
+the LLM replied (two chat_messages inserts, the users read-modify-write on
+completion, the study_sessions update). The new path is the single
+``save_chat_turn`` RPC. Each round trip costs ``--rtt`` seconds.
+
+Usage (from backend/):
+    python -m benchmarks.bench_turn_persistence --rtt 0.03 --turns 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+from datetime import date
+
+from benchmarks import fakes
+
+from services import chat_service
+
+
+async def _legacy_persist(db, user_id, session_id, words_used, is_completed):
+    await db.table("chat_messages").insert(
+        {"session_id": session_id, "role": "user", "content": "hi", "word_usage_snapshot": words_used}
+    ).execute()
+    await db.table("chat_messages").insert(
+        {"session_id": session_id, "role": "assistant", "content": "hello", "word_usage_snapshot": words_used}
+    ).execute()
+    update_data = {"words_used": words_used}
+    if is_completed:
+        update_data["is_completed"] = True
+        user = await (
+            db.table("users")
+            .select("total_sessions, streak_days, last_study_date")
+            .eq("id", user_id)
+            .single()
+            .execute()
+        )
+        await db.table("users").update(
+            {
+                "total_sessions": user.data["total_sessions"] + 1,
+                "streak_days": 1,
+                "last_study_date": date.today().isoformat(),
+            }
+        ).eq("id", user_id).execute()
+    await db.table("study_sessions").update(update_data).eq("id", session_id).execute()
+
+
+async def _rpc_persist(db, user_id, session_id, words_used, is_completed):
+    await db.rpc(
+        "save_chat_turn",
+        {
+            "p_session_id": session_id,
+            "p_user_id": user_id,
+            "p_user_message_id": str(uuid.uuid4()),
+            "p_user_content": "hi",
+            "p_assistant_message_id": str(uuid.uuid4()),
+            "p_assistant_content": "hello",
+            "p_feedback": None,
+            "p_words_used": words_used,
+            "p_is_completed": is_completed,
+        },
+    ).execute()
+
+
+async def _measure(persist, rtt: float, turns: int, is_completed: bool) -> list[float]:
+    db = fakes.FakeAsyncSupabase()
+    user_id = fakes.seed(db)[0]
+    fakes.install(db=db, llm=fakes.FakeAsyncOpenAI(latency=0))
+    word_ids = [w["id"] for w in db.tables["vocabularies"][:3]]
+    session_id = (await chat_service.create_session(user_id, "chat", word_ids))["session_id"]
+    words_used = {"a": True, "b": True, "c": is_completed}
+
+    db.latency = rtt
+    samples = []
+    for _ in range(turns):
+        start = time.perf_counter()
+        await persist(db, user_id, session_id, words_used, is_completed)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rtt", type=float, default=0.03, help="seconds per Supabase round trip")
+    parser.add_argument("--turns", type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"Supabase RTT {args.rtt * 1000:.0f}ms, {args.turns} turns each")
+    for completed in (False, True):
+        label = "completing turn" if completed else "regular turn   "
+        for name, persist in (("legacy", _legacy_persist), ("rpc   ", _rpc_persist)):
+            samples = asyncio.run(_measure(persist, args.rtt, args.turns, completed))
+            print(
+                f"{label} {name}: p50 {statistics.median(samples):6.1f}ms  "
+                f"max {max(samples):6.1f}ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""Peak RSS of concurrent /api/speaking/transcribe uploads: buffered vs streamed.
+
+before: the old route (UploadFile + `await audio.read()`, the size checked
+        afterwards, the bytes handed to httpx as the multipart file).
+after:  the current route (services.audio_upload spools the body while
+        parsing it and enforces the cap per chunk; the spooled file is
+        streamed to Groq).
+
+Each variant runs in its own process (peak RSS only grows), on the ASGI app
+in-process with fake Supabase/OpenAI and a Groq stand-in that consumes the
+streamed request body. Clients stream their bodies in 64KB chunks from one
+shared buffer, so client-side memory is the same for both variants. The
+reported figure is peak RSS minus RSS after a warm-up request.
+
+Usage (from backend/):
+    python -m benchmarks.bench_upload_memory --uploads 50 --size-mb 8
+"""
+import argparse
+import asyncio
+import json
+import resource
+import subprocess
+import sys
+import time
+
+from benchmarks import fakes
+
+import httpx
+
+CHUNK = 64 * 1024
+BOUNDARY = "benchboundary7f3a"
+
+
+class _GroqStandIn(httpx.AsyncBaseTransport):
+    """Consumes the request body chunk by chunk (httpx.MockTransport reads it
+    into memory first, which would hide the difference)."""
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        async for _ in request.stream:
+            pass
+        await asyncio.sleep(0.2)
+        return httpx.Response(200, text="I made a plan for my trip.")
+
+
+def _legacy_router(groq):
+    from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+
+    from middleware.premium import require_premium
+    from services.chat_service import get_session_state, send_message
+    from services.transcription_service import post_process_transcript
+
+    router = APIRouter()
+
+    @router.post("/api/speaking/transcribe")
+    async def transcribe(
+        audio: UploadFile = File(...),
+        session_id: str = Form(...),
+        user_id: str = Depends(require_premium),
+    ):
+        audio_data = await audio.read()
+        if len(audio_data) > 10 * 1024 * 1024:
+            raise HTTPException(status_code=400, detail="Audio file too large (max 10MB)")
+        state = await get_session_state(user_id, session_id)
+        response = await groq.post(
+            "/audio/transcriptions",
+            files={"file": (audio.filename, audio_data, "audio/webm")},
+            data={"model": "whisper-large-v3-turbo"},
+        )
+        text = await post_process_transcript(response.text, [w["word"] for w in state.words])
+        return await send_message(user_id, session_id, text, mode="speaking")
+
+    return router
+
+
+async def _body(session_id: str, payload: bytes, size: int):
+    yield (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="session_id"\r\n\r\n'
+        f"{session_id}\r\n"
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="audio"; filename="audio.webm"\r\n'
+        "Content-Type: audio/webm\r\n\r\n"
+    ).encode()
+    sent = 0
+    while sent < size:
+        n = min(CHUNK, size - sent)
+        yield payload[:n]
+        sent += n
+        await asyncio.sleep(0)
+    yield f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+def _rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 2**20
+
+
+async def _child(mode: str, uploads: int, size: int) -> dict:
+    import main
+    from fastapi import FastAPI
+
+    from middleware.premium import require_premium
+    from services import chat_service, transcription_service
+
+    db = fakes.FakeAsyncSupabase(latency=0.005)
+    user_ids = fakes.seed(db, users=1)
+    db.tables["users"][0]["is_premium"] = True
+    fakes.install(db=db, llm=fakes.FakeAsyncOpenAI(latency=0.05))
+    transcription_service.settings.groq_api_key = "bench"
+
+    groq = httpx.AsyncClient(base_url="https://groq.bench", transport=_GroqStandIn())
+    transcription_service.groq_client = groq
+
+    if mode == "after":
+        app = main.app
+    else:
+        app = FastAPI()
+        app.include_router(_legacy_router(groq))
+    app.dependency_overrides[require_premium] = lambda: user_ids[0]
+
+    word_ids = [w["id"] for w in db.tables["vocabularies"][:3]]
+    session_id = (await chat_service.create_session(user_ids[0], "speaking", word_ids))[
+        "session_id"
+    ]
+    payload = b"\x1a" * CHUNK
+    client = httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=120
+    )
+    headers = {"Content-Type": f"multipart/form-data; boundary={BOUNDARY}"}
+
+    async def upload(nbytes: int) -> int:
+        response = await client.post(
+            "/api/speaking/transcribe",
+            content=_body(session_id, payload, nbytes),
+            headers=headers,
+        )
+        return response.status_code
+
+    assert await upload(CHUNK) == 200
+    baseline = _rss_mb()
+    start = time.perf_counter()
+    statuses = await asyncio.gather(*(upload(size) for _ in range(uploads)))
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {
+        "ok": statuses.count(200),
+        "peak_delta_mb": peak - baseline,
+        "elapsed": elapsed,
+        "oversized_status": await upload(11 * 1024 * 1024),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--uploads", type=int, default=50)
+    parser.add_argument("--size-mb", type=float, default=8.0)
+    parser.add_argument("--mode", choices=["before", "after"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    size = int(args.size_mb * 2**20)
+
+    if args.mode:
+        print(json.dumps(asyncio.run(_child(args.mode, args.uploads, size))))
+        return
+
+    print(f"{args.uploads} concurrent uploads of {args.size_mb:g}MB")
+    for mode in ("before", "after"):
+        out = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bench_upload_memory", "--mode", mode,
+             "--uploads", str(args.uploads), "--size-mb", str(args.size_mb)],
+            capture_output=True, text=True, check=True, cwd=fakes.BACKEND_DIR,
+        )
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        print(
+            f"{mode:>6}: peak RSS +{result['peak_delta_mb']:7.1f}MB  "
+            f"{result['ok']}/{args.uploads} ok in {result['elapsed']:.2f}s  "
+            f"(11MB upload -> {result['oversized_status']})"
+        )
+
+
+if __name__ == "__main__":
+    main()
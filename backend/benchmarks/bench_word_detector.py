@@ -0,0 +1,67 @@
+"""Local target-word detection: cost per message and recall on inflected forms.
+
+detector: services.word_detector over the full seed vocabulary index, as
+          chat_service runs it on every turn.
+substring: the old `_generate_summary` check (word in message.lower()),
+          which misses inflections ("studied") and matches inside other
+          words ("cat" in "education").
+
+Usage (from backend/):
+    python -m benchmarks.bench_word_detector --number 20000
+"""
+import argparse
+import json
+import os
+import timeit
+
+from benchmarks import fakes
+
+from services.word_detector import LemmaIndex
+
+MESSAGES = [
+    "I budgeted carefully last month but my friends spent way too much.",
+    "She studied the implications before she was reluctant to commute.",
+    "Thank you! I really appreciated the help with the schedule.",
+    "Honestly I don't know, maybe we could just stay home tomorrow.",
+]
+CASES = [
+    ("budget", "We budgeted for the trip."),
+    ("study", "She studied all night."),
+    ("commute", "My commutes are long."),
+    ("thank you", "Thank you so much!"),
+    ("cat", "Education matters."),  # not a use
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=20_000)
+    args = parser.parse_args()
+
+    with open(os.path.join(fakes.SEED_DIR, "vocabularies.json"), encoding="utf-8") as f:
+        vocab = [w["word"] for w in json.load(f)]
+    words = ["budget", "reluctant", "commute"]
+    build = timeit.timeit(lambda: LemmaIndex(vocab + words), number=10) / 10
+    index = LemmaIndex(vocab + words + ["study", "thank you", "cat"])
+    print(f"index over {len(vocab)} words: {len(index)} forms, built in {build * 1e3:.2f}ms")
+
+    detector = timeit.timeit(
+        lambda: [index.detect(m, words) for m in MESSAGES], number=args.number
+    )
+    substring = timeit.timeit(
+        lambda: [[w for w in words if w.lower() in m.lower()] for m in MESSAGES],
+        number=args.number,
+    )
+    per = args.number * len(MESSAGES)
+    print(f"detector  {detector / per * 1e6:6.2f}us/message")
+    print(f"substring {substring / per * 1e6:6.2f}us/message")
+
+    for word, text in CASES:
+        print(
+            f"  {word!r:>12} in {text!r:<30} detector={bool(index.detect(text, [word]))!s:<5} "
+            f"substring={word in text.lower()}"
+        )
+
+
+if __name__ == "__main__":
+    main()
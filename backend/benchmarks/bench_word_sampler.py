@@ -0,0 +1,60 @@
+"""Word sampling cost per request: filter-then-sample vs O(k) rejection sampling.
+
+legacy: build the list of level words not in the recent set, then
+        random.sample (what get_random_words did after downloading the level).
+sampler: services.word_sampler.sample_ids on the index's per-level id tuple.
+
+The legacy numbers exclude the PostgREST transfer of the whole level, which
+the index removes as well. The last row shows the fallback path with almost
+every word in the level recently studied.
+
+Usage (from backend/):
+    python -m benchmarks.bench_word_sampler --sizes 10000 100000
+"""
+import argparse
+import random
+import timeit
+import uuid
+
+from benchmarks import fakes  # noqa: F401  (sets up sys.path / settings)
+
+from services.word_sampler import sample_ids
+
+
+def _legacy(pool: list[dict], k: int, recent: set[str]) -> list[dict]:
+    available = [w for w in pool if w["id"] not in recent]
+    if len(available) < k:
+        available = pool
+    return random.sample(available, min(k, len(available)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--recent", type=int, default=30, help="recently studied words")
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"k={args.k}, {args.recent} recent words excluded, mean of {args.number} calls")
+    for size in args.sizes:
+        ids = tuple(str(uuid.uuid4()) for _ in range(size))
+        rows = [{"id": i} for i in ids]
+        recent = set(random.sample(ids, args.recent))
+
+        legacy = timeit.timeit(lambda: _legacy(rows, args.k, recent), number=args.number)
+        fast = timeit.timeit(lambda: sample_ids(ids, args.k, recent), number=args.number)
+        print(
+            f"n={size:>7}: legacy {legacy / args.number * 1e6:9.1f}us  "
+            f"sampler {fast / args.number * 1e6:7.1f}us"
+        )
+
+    size = args.sizes[0]
+    ids = tuple(str(uuid.uuid4()) for _ in range(size))
+    recent = set(ids[: size - 1])
+    fallback = timeit.timeit(lambda: sample_ids(ids, args.k, recent), number=args.number)
+    print(f"n={size:>7}, all but one recent (fallback): {fallback / args.number * 1e6:7.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,440 @@
+"""In-memory stand-ins for Supabase and OpenAI used by the benchmark scripts.
+
+The fakes implement just enough of the PostgREST query builder and the
+OpenAI chat-completions surface for the service layer to run unchanged,
+with a configurable per-call latency so round trips and LLM time can be
+simulated without network access.
+"""
+import asyncio
+import copy
+import itertools
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SEED_DIR = os.path.join(BACKEND_DIR, "..", "data", "seed")
+
+# Settings() requires these; the fakes never talk to the real services.
+os.environ.setdefault("SUPABASE_URL", "https://bench.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", "bench.bench.bench")
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench")
+os.environ.setdefault("JWT_SECRET_KEY", "bench-secret")
+
+if BACKEND_DIR not in sys.path:
+    sys.path.append(BACKEND_DIR)
+
+
+TABLE_DEFAULTS = {
+    "users": {
+        "level": "beginner",
+        "is_premium": False,
+        "premium_expires_at": None,
+        "total_sessions": 0,
+        "streak_days": 0,
+        "last_study_date": None,
+        "entitlement_epoch": 0,
+        "entitlement_changed_at": None,
+    },
+    "study_sessions": {
+        "words_used": {},
+        "is_completed": False,
+        "completed_at": None,
+        "summary_stats": None,
+    },
+    "chat_messages": {"feedback": None, "word_usage_snapshot": {}},
+}
+
+_clock = itertools.count()
+_epoch = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+def _timestamp() -> str:
+    # Strictly increasing so ordering by created_at is deterministic.
+    return (_epoch + timedelta(milliseconds=next(_clock))).isoformat()
+
+
+class FakeResult:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class FakeQuery:
+    def __init__(self, db: "FakeAsyncSupabase", table: str):
+        self._db = db
+        self._table = table
+        self._op = "select"
+        self._columns = "*"
+        self._count = None
+        self._payload = None
+        self._filters = []
+        self._order: list[tuple[str, bool]] = []
+        self._limit = None
+        self._offset = 0
+        self._single = False
+        self._ignore_duplicates = False
+
+    def select(self, columns: str = "*", count: str | None = None):
+        self._columns = columns
+        self._count = count
+        return self
+
+    def insert(self, rows):
+        self._op, self._payload = "insert", rows
+        return self
+
+    def upsert(self, rows, on_conflict: str = "", ignore_duplicates: bool = False):
+        self._op, self._payload = "upsert", (rows, on_conflict)
+        self._ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, data: dict):
+        self._op, self._payload = "update", data
+        return self
+
+    def delete(self):
+        self._op = "delete"
+        return self
+
+    def eq(self, column, value):
+        self._filters.append(lambda r: r.get(column) == value)
+        return self
+
+    def neq(self, column, value):
+        self._filters.append(lambda r: r.get(column) != value)
+        return self
+
+    def in_(self, column, values):
+        values = set(values)
+        self._filters.append(lambda r: r.get(column) in values)
+        return self
+
+    def gte(self, column, value):
+        self._filters.append(lambda r: r.get(column) is not None and r[column] >= value)
+        return self
+
+    def lte(self, column, value):
+        self._filters.append(lambda r: r.get(column) is not None and r[column] <= value)
+        return self
+
+    def order(self, column, desc: bool = False):
+        # PostgREST처럼 여러 번 부르면 뒤의 것이 동률 정렬 기준
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, n: int):
+        self._limit = n
+        return self
+
+    def offset(self, n: int):
+        self._offset = n
+        return self
+
+    def range(self, start: int, end: int):
+        self._offset, self._limit = start, end - start + 1
+        return self
+
+    def single(self):
+        self._single = True
+        return self
+
+    def maybe_single(self):
+        return self.single()
+
+    def _project(self, row: dict) -> dict:
+        if self._columns.strip() == "*":
+            return dict(row)
+        cols = [c.strip() for c in self._columns.split(",")]
+        return {c: row.get(c) for c in cols}
+
+    def _matches(self, row: dict) -> bool:
+        return all(f(row) for f in self._filters)
+
+    def _new_row(self, row: dict) -> dict:
+        new = dict(TABLE_DEFAULTS.get(self._table, {}))
+        new.update(row)
+        new.setdefault("id", str(uuid.uuid4()))
+        now = _timestamp()
+        new.setdefault("created_at", now)
+        if self._table == "study_sessions":
+            new.setdefault("started_at", now)
+        return new
+
+    def _run(self) -> FakeResult:
+        rows = self._db.tables.setdefault(self._table, [])
+        if self._op in ("insert", "upsert"):
+            payload = self._payload[0] if self._op == "upsert" else self._payload
+            items = payload if isinstance(payload, list) else [payload]
+            created = []
+            for item in items:
+                if self._op == "upsert":
+                    keys = [k.strip() for k in self._payload[1].split(",") if k.strip()]
+                    existing = next(
+                        (r for r in rows if keys and all(r.get(k) == item.get(k) for k in keys)),
+                        None,
+                    )
+                    if existing is not None:
+                        if self._ignore_duplicates:
+                            continue
+                        existing.update(item)
+                        created.append(dict(existing))
+                        continue
+                new = self._new_row(item)
+                rows.append(new)
+                created.append(dict(new))
+            return FakeResult(created)
+
+        matched = [r for r in rows if self._matches(r)]
+        if self._op == "update":
+            for r in matched:
+                r.update(self._payload)
+            return FakeResult([dict(r) for r in matched])
+        if self._op == "delete":
+            self._db.tables[self._table] = [r for r in rows if r not in matched]
+            return FakeResult([dict(r) for r in matched])
+
+        for column, desc in reversed(self._order):
+            matched.sort(key=lambda r: r.get(column) or "", reverse=desc)
+        count = len(matched) if self._count else None
+        end = None if self._limit is None else self._offset + self._limit
+        data = [self._project(r) for r in matched[self._offset:end]]
+        if self._single:
+            if len(data) != 1:
+                raise LookupError(f"{self._table}: expected 1 row, got {len(data)}")
+            return FakeResult(data[0], count)
+        return FakeResult(data, count)
+
+    async def execute(self) -> FakeResult:
+        self._db.round_trips += 1
+        if self._db.latency:
+            await asyncio.sleep(self._db.latency)
+        # Copy in and out, as JSON serialization over HTTP would.
+        self._payload = copy.deepcopy(self._payload)
+        return copy.deepcopy(self._run())
+
+
+class FakeRPC:
+    def __init__(self, db: "FakeAsyncSupabase", name: str, params: dict):
+        self._db = db
+        self._name = name
+        self._params = params
+
+    async def execute(self) -> FakeResult:
+        self._db.round_trips += 1
+        if self._db.latency:
+            await asyncio.sleep(self._db.latency)
+        params = copy.deepcopy(self._params)
+        return FakeResult(copy.deepcopy(self._db.functions[self._name](self._db, params)))
+
+
+def _save_chat_turn(db: "FakeAsyncSupabase", p: dict) -> dict:
+    """Python mirror of db/migrations/006_session_summary_stats.sql."""
+    session = next(
+        r for r in db.tables["study_sessions"]
+        if r["id"] == p["p_session_id"] and r["user_id"] == p["p_user_id"]
+    )
+    messages = db.tables.setdefault("chat_messages", [])
+    existing = {m["id"] for m in messages}
+    for message_id, role, content, feedback in (
+        (p["p_user_message_id"], "user", p["p_user_content"], None),
+        (p["p_assistant_message_id"], "assistant", p["p_assistant_content"], p["p_feedback"]),
+    ):
+        if message_id in existing:
+            continue
+        messages.append(
+            FakeQuery(db, "chat_messages")._new_row(
+                {
+                    "id": message_id,
+                    "session_id": p["p_session_id"],
+                    "role": role,
+                    "content": content,
+                    "feedback": feedback,
+                    "word_usage_snapshot": p["p_words_used"],
+                }
+            )
+        )
+
+    newly_completed = p["p_is_completed"] and not session["is_completed"]
+    session["words_used"] = p["p_words_used"]
+    if p.get("p_summary_stats") is not None:
+        session["summary_stats"] = p["p_summary_stats"]
+    session["is_completed"] = session["is_completed"] or p["p_is_completed"]
+    if newly_completed:
+        session["completed_at"] = _timestamp()
+        user = next(r for r in db.tables["users"] if r["id"] == p["p_user_id"])
+        user["total_sessions"] += 1
+    return {"newly_completed": newly_completed}
+
+
+def _login_user(db: "FakeAsyncSupabase", p: dict) -> dict:
+    """Python mirror of db/migrations/007_login_user.sql."""
+    users = db.tables.setdefault("users", [])
+    user = next((r for r in users if r["toss_user_key"] == p["p_toss_user_key"]), None)
+    if user is None:
+        user = FakeQuery(db, "users")._new_row(
+            {
+                "toss_user_key": p["p_toss_user_key"],
+                "level": p.get("p_level") or "beginner",
+                "is_premium": bool(p.get("p_is_premium")),
+            }
+        )
+        users.append(user)
+        return {**user, "is_new": True}
+    if p.get("p_is_premium") is not None:
+        user["is_premium"] = p["p_is_premium"]
+    return {**user, "is_new": False}
+
+
+def _set_premium_entitlement(db: "FakeAsyncSupabase", p: dict) -> dict:
+    """Python mirror of db/migrations/008_entitlement_epoch.sql."""
+    user = next(r for r in db.tables["users"] if r["id"] == p["p_user_id"])
+    user["is_premium"] = p["p_is_premium"]
+    user["premium_expires_at"] = p.get("p_premium_expires_at")
+    if p.get("p_revoke"):
+        user["entitlement_epoch"] += 1
+        user["entitlement_changed_at"] = datetime.now(timezone.utc).isoformat()
+    return dict(user)
+
+
+class FakeAsyncSupabase:
+    """In-memory async Supabase client with simulated round-trip latency."""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.tables: dict[str, list[dict]] = {}
+        self.functions: dict = {
+            "save_chat_turn": _save_chat_turn,
+            "login_user": _login_user,
+            "set_premium_entitlement": _set_premium_entitlement,
+        }
+        self.round_trips = 0
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def rpc(self, name: str, params: dict | None = None) -> FakeRPC:
+        return FakeRPC(self, name, params or {})
+
+
+def _reply_for(messages: list[dict]) -> str:
+    return json.dumps(
+        {
+            "message": "That sounds great! Tell me more about your plans for the weekend.",
+            "word_usage": {},
+            "feedback": None,
+            "grammar_correction": None,
+            "hint": None,
+        }
+    )
+
+
+class _FakeStream:
+    """Mimics openai.AsyncStream: async-iterable chunks plus close()."""
+
+    def __init__(self, content: str, chunk_size: int):
+        self._content = content
+        self._chunk_size = chunk_size
+
+    async def __aiter__(self):
+        content, size = self._content, self._chunk_size
+        for i in range(0, len(content), size):
+            await asyncio.sleep(0)
+            yield SimpleNamespace(
+                choices=[SimpleNamespace(delta=SimpleNamespace(content=content[i:i + size]))]
+            )
+
+    async def close(self) -> None:
+        pass
+
+
+class _FakeCompletions:
+    def __init__(self, owner: "FakeAsyncOpenAI"):
+        self._owner = owner
+
+    async def create(self, *, model: str, messages: list[dict], **kwargs):
+        owner = self._owner
+        owner.calls += 1
+        owner.models.append(model)
+        owner.requests.append(messages)
+        if owner.blocking:
+            # Reproduces a synchronous SDK call made from an async route.
+            time.sleep(owner.latency)
+        else:
+            await asyncio.sleep(owner.latency)
+        content = owner.reply(messages) if owner.reply else _reply_for(messages)
+        if kwargs.get("stream"):
+            return _FakeStream(content, owner.chunk_size)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(
+                prompt_tokens=sum(len(m["content"]) for m in messages) // 4,
+                completion_tokens=len(content) // 4,
+            ),
+        )
+
+
+class FakeAsyncOpenAI:
+    """AsyncOpenAI stand-in whose completions take ``latency`` seconds.
+
+    With ``blocking=True`` the delay is a ``time.sleep`` that holds the event
+    loop, which is what a synchronous client does inside an ``async def``.
+    """
+
+    def __init__(
+        self, latency: float = 2.0, blocking: bool = False, reply=None, chunk_size: int = 4
+    ):
+        self.latency = latency
+        self.chunk_size = chunk_size
+        self.blocking = blocking
+        self.reply = reply
+        self.calls = 0
+        self.models: list[str] = []
+        self.requests: list[list[dict]] = []
+        self.chat = SimpleNamespace(completions=_FakeCompletions(self))
+
+
+def seed(db: FakeAsyncSupabase, users: int = 1, level: str = "intermediate") -> list[str]:
+    """Load the vocabulary seed and create ``users`` users; return their ids."""
+    with open(os.path.join(SEED_DIR, "vocabularies.json"), encoding="utf-8") as f:
+        for word in json.load(f):
+            db.tables.setdefault("vocabularies", []).append(
+                {"id": str(uuid.uuid4()), "pronunciation": None, **word}
+            )
+    user_ids = []
+    for i in range(users):
+        user_id = str(uuid.uuid4())
+        db.tables.setdefault("users", []).append(
+            {
+                "id": user_id,
+                "toss_user_key": f"bench-{i}",
+                **TABLE_DEFAULTS["users"],
+                "level": level,
+            }
+        )
+        user_ids.append(user_id)
+    return user_ids
+
+
+def install(db=None, llm=None) -> None:
+    """Point every loaded backend module at the given fakes.
+
+    Per-process caches are reset so nothing leaks between fake databases.
+    """
+    from services import session_cache, vocab_index
+
+    session_cache._cache.clear()
+    vocab_index._index = None
+    for name, module in list(sys.modules.items()):
+        if not name.split(".")[0] in ("services", "routers", "middleware", "db"):
+            continue
+        if db is not None and hasattr(module, "async_supabase"):
+            module.async_supabase = db
+        if llm is not None:
+            for attr in ("client", "openai_client"):
+                if hasattr(module, attr):
+                    setattr(module, attr, llm)
@@ -0,0 +1,233 @@
+"""Replay speaking sessions through the model tiering policy: cost and latency saved.
+
+Each user turn of each session is routed by services.model_policy and
+compared with the old behaviour (every speaking turn on gpt-4o). Prompt
+tokens are estimated the same way the context builder does (system prompt +
+budgeted history + message), and completion tokens from the recorded reply
+plus the feedback JSON. Latency is modelled per model as time-to-first-token
++ completion tokens / throughput. Override the defaults with the flags
+below to match production measurements.
+
+A word counts as used once word_detector finds it in a turn, which
+approximates the LLM's word_usage judgement. The replay measures cost and latency only, not
+reply quality; spot-check the turns routed to the light model before
+tightening the thresholds.
+
+Sessions come from a JSONL file, one session per line:
+    {"level": "intermediate", "target_words": ["budget", ...],
+     "messages": [{"role": "assistant"|"user", "content": "..."}, ...]}
+Export recorded speaking sessions with --export (needs SUPABASE_* env);
+without --sessions, synthetic sessions built from the seed vocabulary are
+replayed.
+
+Usage (from backend/):
+    python -m benchmarks.replay_model_tiering --export sessions.jsonl --limit 500
+    python -m benchmarks.replay_model_tiering --sessions sessions.jsonl
+    python -m benchmarks.replay_model_tiering --synthetic 200
+"""
+import argparse
+import json
+import os
+import random
+from collections import Counter
+
+from benchmarks import fakes
+
+from config import settings
+from services import model_policy
+from services.word_detector import LemmaIndex
+from services.context_service import build_context, estimate_tokens
+from services.prompt_registry import build_system_prompt
+
+# USD per 1M tokens (input, output)
+PRICES = {"gpt-4o": (2.50, 10.00), "gpt-4o-mini": (0.15, 0.60)}
+# Tokens of the feedback/word_usage JSON around the conversational reply
+RESPONSE_OVERHEAD_TOKENS = 180
+
+SHORT_REPLIES = [
+    "Yes, I think so.", "Really? That's cool.", "I don't know.", "Maybe tomorrow.",
+    "That sounds fun!", "No, not really.", "I like it.", "Sure, why not?",
+    "Hmm, it's hard to say.", "I went there last year.",
+]
+WORD_SENTENCES = [
+    "I think {w} is really important for me.",
+    "Yesterday I had to {w} something at work.",
+    "My friend told me about the {w} last week.",
+    "It was so {w} that I couldn't stop laughing.",
+]
+LONG_SENTENCES = [
+    "When I was a student I used to travel with my family every summer and we "
+    "always stayed at a small hotel near the beach.",
+    "I usually take the subway to work but on rainy days it gets so crowded that "
+    "I sometimes wait for the next train instead.",
+]
+
+
+def _synthetic_sessions(count: int, seed: int) -> list[dict]:
+    rng = random.Random(seed)
+    with open(os.path.join(fakes.SEED_DIR, "vocabularies.json"), encoding="utf-8") as f:
+        vocab = json.load(f)
+    by_level: dict[str, list[str]] = {}
+    for word in vocab:
+        by_level.setdefault(word["level"], []).append(word["word"])
+
+    sessions = []
+    for _ in range(count):
+        level = rng.choice(sorted(by_level))
+        words = rng.sample(by_level[level], 3)
+        messages = [{"role": "assistant", "content": "Hi! Let's talk about your weekend."}]
+        remaining = list(words)
+        for _turn in range(rng.randint(4, 12)):
+            roll = rng.random()
+            if remaining and roll < 0.3:
+                text = rng.choice(WORD_SENTENCES).format(w=remaining.pop(0))
+            elif roll < 0.45:
+                text = rng.choice(LONG_SENTENCES)
+            else:
+                text = rng.choice(SHORT_REPLIES)
+            messages.append({"role": "user", "content": text})
+            messages.append(
+                {"role": "assistant", "content": "That's interesting! Can you tell me more about it?"}
+            )
+            if not remaining:
+                break
+        sessions.append({"level": level, "target_words": words, "messages": messages})
+    return sessions
+
+
+def _export(path: str, limit: int) -> None:
+    from db.supabase_client import get_supabase
+
+    supabase = get_supabase()
+    sessions = (
+        supabase.table("study_sessions")
+        .select("id, user_id, target_words")
+        .eq("mode", "speaking")
+        .order("started_at", desc=True)
+        .limit(limit)
+        .execute()
+    ).data
+    with open(path, "w", encoding="utf-8") as out:
+        for session in sessions:
+            level = (
+                supabase.table("users").select("level").eq("id", session["user_id"])
+                .single().execute()
+            ).data["level"]
+            words = (
+                supabase.table("vocabularies").select("id, word")
+                .in_("id", session["target_words"]).execute()
+            ).data
+            messages = (
+                supabase.table("chat_messages").select("role, content")
+                .eq("session_id", session["id"]).order("created_at").execute()
+            ).data
+            record = {
+                "level": level,
+                "target_words": [w["word"] for w in words],
+                "messages": messages,
+            }
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+    print(f"Exported {len(sessions)} speaking sessions to {path}")
+
+
+def _latency(model: str, completion_tokens: int, args) -> float:
+    ttft, tps = (
+        (args.strong_ttft, args.strong_tps)
+        if model == settings.speaking_tier_strong_model
+        else (args.light_ttft, args.light_tps)
+    )
+    return ttft + completion_tokens / tps
+
+
+def _cost(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    price_in, price_out = PRICES.get(model, PRICES["gpt-4o"])
+    return (prompt_tokens * price_in + completion_tokens * price_out) / 1e6
+
+
+def _replay(sessions: list[dict], args) -> None:
+    baseline_model = settings.speaking_tier_strong_model
+    totals = {"baseline": [0.0, []], "tiered": [0.0, []]}
+    reasons: Counter = Counter()
+
+    for session in sessions:
+        words = [{"word": w} for w in session["target_words"]]
+        words_used = {w: False for w in session["target_words"]}
+        lemmas = LemmaIndex(session["target_words"])
+        messages = session["messages"]
+        history: list[dict] = []
+        user_turns = 0
+        for i, msg in enumerate(messages):
+            if msg["role"] != "user":
+                history.append(msg)
+                continue
+            reply = next(
+                (m["content"] for m in messages[i + 1:] if m["role"] == "assistant"), ""
+            )
+            unused = [w for w, used in words_used.items() if not used]
+            candidates = lemmas.detect(msg["content"], unused, near_miss=True)
+            system_prompt = build_system_prompt(
+                "speaking", session["level"], words, words_used, candidates
+            )
+            window = build_context(system_prompt, None, history, len(history), msg["content"])
+            completion = estimate_tokens(reply) + RESPONSE_OVERHEAD_TOKENS
+
+            signals = model_policy.turn_signals(
+                "speaking", msg["content"], user_turns, candidates
+            )
+            decision = model_policy.choose_model(signals)
+            reasons[decision.reason] += 1
+            for name, model in (("baseline", baseline_model), ("tiered", decision.model)):
+                totals[name][0] += _cost(model, window.prompt_tokens, completion)
+                totals[name][1].append(_latency(model, completion, args))
+
+            # 후보로 찾은 단어는 사용한 것으로 본다 (LLM 판정 근사)
+            for word in candidates:
+                words_used[word] = True
+            history += [msg, {"role": "assistant", "content": reply}]
+            user_turns += 1
+
+    turns = sum(reasons.values())
+    print(f"{len(sessions)} sessions, {turns} speaking turns")
+    for reason, count in reasons.most_common():
+        print(f"  {reason:<14} {count:>6} ({count / turns:6.1%})")
+    for name in ("baseline", "tiered"):
+        cost, latencies = totals[name]
+        latencies.sort()
+        print(
+            f"{name:>8}: cost ${cost:8.4f}  mean {sum(latencies) / turns:5.2f}s  "
+            f"p95 {latencies[int(turns * 0.95) - 1]:5.2f}s"
+        )
+    base_cost, base_lat = totals["baseline"][0], sum(totals["baseline"][1])
+    tier_cost, tier_lat = totals["tiered"][0], sum(totals["tiered"][1])
+    print(
+        f"   saved: cost {1 - tier_cost / base_cost:6.1%}  "
+        f"mean latency {1 - tier_lat / base_lat:6.1%}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", help="JSONL of recorded sessions")
+    parser.add_argument("--export", help="write recorded speaking sessions to this JSONL")
+    parser.add_argument("--limit", type=int, default=500)
+    parser.add_argument("--synthetic", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--strong-ttft", type=float, default=0.6)
+    parser.add_argument("--strong-tps", type=float, default=80.0, help="tokens/s")
+    parser.add_argument("--light-ttft", type=float, default=0.4)
+    parser.add_argument("--light-tps", type=float, default=120.0, help="tokens/s")
+    args = parser.parse_args()
+
+    if args.export:
+        _export(args.export, args.limit)
+        return
+    if args.sessions:
+        with open(args.sessions, encoding="utf-8") as f:
+            sessions = [json.loads(line) for line in f if line.strip()]
+    else:
+        sessions = _synthetic_sessions(args.synthetic, args.seed)
+    _replay(sessions, args)
+
+
+if __name__ == "__main__":
+    main()
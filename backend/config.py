@@ -13,17 +13,44 @@ class Settings(BaseSettings):
     # Groq (Whisper STT - fast transcription)
     groq_api_key: str = ""
 
+    # Audio uploads (/api/speaking/transcribe): size cap, and bytes kept in
+    # memory before the upload spools to a temporary file
+    audio_max_upload_bytes: int = 10 * 1024 * 1024
+    audio_spool_memory_bytes: int = 1024 * 1024
+    # Normalization before transcription (silence trim, mono 16kHz Opus);
+    # needs ffmpeg. Off by default: it only lowers latency on slow uplinks
+    # (see benchmarks/bench_audio_normalize.py)
+    audio_normalize_enabled: bool = False
+    audio_normalize_workers: int = 2
+    audio_normalize_timeout_seconds: float = 5.0
+    audio_normalize_bitrate: str = "24k"
+    audio_ffmpeg_path: str = "ffmpeg"
+
     # JWT
     jwt_secret_key: str
     jwt_algorithm: str = "HS256"
     jwt_access_token_expire_minutes: int = 60
     jwt_refresh_token_expire_days: int = 7
+    # Verified access tokens cached per worker (0 verifies every request)
+    token_cache_size: int = 10000
+    # How often each worker re-reads premium revocations (entitlement epochs)
+    entitlement_refresh_seconds: int = 15
+    # X-Metrics-Token for /api/metrics (unset: served only outside production)
+    metrics_token: str = ""
 
     # Apps in Toss
     toss_api_url: str = "https://apps-in-toss-api.toss.im"
     toss_pay_api_url: str = "https://pay-apps-in-toss-api.toss.im"
     toss_mtls_cert_path: str = "./certs/client.crt"
     toss_mtls_key_path: str = "./certs/client.key"
+    # Pooled mTLS client for the partner API (one per worker)
+    toss_http2: bool = False
+    toss_max_connections: int = 20
+    toss_max_keepalive_connections: int = 10
+    toss_keepalive_expiry_seconds: float = 30.0
+    toss_connect_timeout_seconds: float = 5.0
+    toss_read_timeout_seconds: float = 10.0
+    toss_pool_timeout_seconds: float = 5.0
 
     # AES
     aes_decryption_key: str = ""
@@ -32,6 +59,75 @@ class Settings(BaseSettings):
     free_daily_session_limit: int = 3
     cors_origins: str = "*"
 
+    # Chat context (token budget per turn, recent messages kept verbatim)
+    chat_context_token_budget: int = 3000
+    chat_context_recent_messages: int = 8
+    chat_summary_model: str = "gpt-4o-mini"
+
+    # In-process session state cache (0 disables)
+    session_cache_size: int = 1000
+    session_cache_ttl_seconds: int = 1800
+    session_cache_max_messages: int = 40
+
+    # Transcript cache: audio hash -> raw transcript, and
+    # (raw transcript, target words) -> post-processed transcript (0 disables)
+    transcript_cache_size: int = 2000
+    transcript_cache_ttl_seconds: int = 1800
+
+    # Idempotency-Key responses kept per (user, key) (0 stores none; duplicates
+    # in flight are still joined)
+    idempotency_cache_size: int = 10000
+    idempotency_ttl_seconds: int = 86400
+
+    # Write-behind queue for post-response DB writes
+    write_behind_shards: int = 8
+    write_behind_queue_size: int = 1000
+    write_behind_max_retries: int = 5
+    write_behind_flush_timeout_seconds: float = 20.0
+
+    # In-memory vocabulary index
+    vocab_index_refresh_seconds: int = 300
+    vocab_index_max_age_seconds: int = 3600
+
+    # Prompt templates: seconds between mtime checks for hot reload (0 disables)
+    prompt_reload_interval_seconds: float = 2.0
+
+    # LLM gateway: per-route deadlines (total seconds incl. retries), retries,
+    # hedging and gpt-4o -> gpt-4o-mini circuit breaking
+    llm_deadline_chat_seconds: float = 25.0
+    llm_deadline_opening_seconds: float = 20.0
+    llm_deadline_summary_seconds: float = 30.0
+    llm_deadline_transcript_seconds: float = 8.0
+    llm_max_retries: int = 2
+    llm_hedge_min_delay_seconds: float = 1.0
+    llm_fallback_models: dict[str, str] = {"gpt-4o": "gpt-4o-mini"}
+    llm_breaker_error_rate: float = 0.3
+    llm_breaker_latency_p95_seconds: float = 12.0
+    llm_breaker_cooldown_seconds: float = 30.0
+
+    # Speaking-mode model tiering (turns that need detailed feedback use the strong model)
+    speaking_tier_enabled: bool = True
+    speaking_tier_strong_model: str = "gpt-4o"
+    speaking_tier_light_model: str = "gpt-4o-mini"
+    speaking_tier_long_message_words: int = 15
+    speaking_tier_opening_turns: int = 1
+
+    # Pre-generated session openings (0 disables the pool)
+    opening_pool_size: int = 5000
+    opening_pool_ttl_seconds: int = 86400
+    opening_pool_concurrency: int = 4
+    opening_pool_refill_seconds: int = 60
+    # Openings started per refill pass; the rest wait for the next pass
+    opening_pool_refill_batch: int = 100
+    # Speculative openings for words shown by /api/vocab/random (per user per day; 0 disables)
+    speculation_budget_per_user: int = 4
+    speculation_ttl_seconds: int = 600
+
+    # Daily word recommendations (words stored per user/day; the API serves a prefix)
+    daily_word_count: int = 5
+    daily_recommendation_active_days: int = 14
+    daily_recommendation_concurrency: int = 20
+
     model_config = {"env_file": ".env", "env_file_encoding": "utf-8"}
 
 
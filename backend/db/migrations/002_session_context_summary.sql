@@ -0,0 +1,10 @@
+-- Rolling conversation summary for token-budgeted chat context
+-- Run this in Supabase SQL Editor
+
+-- 최근 메시지 창 밖으로 밀려난 대화를 요약해 저장
+ALTER TABLE study_sessions
+  ADD COLUMN context_summary TEXT,
+  ADD COLUMN summarized_message_count INTEGER NOT NULL DEFAULT 0;
+
+-- 세션 내 메시지를 시간순으로 offset/limit 조회
+CREATE INDEX idx_messages_session_created ON chat_messages(session_id, created_at);
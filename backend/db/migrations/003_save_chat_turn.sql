@@ -0,0 +1,68 @@
+-- Persist one chat turn in a single round trip
+-- Run this in Supabase SQL Editor
+
+-- 유저 메시지 + AI 메시지 저장, 세션 words_used/완료 상태 갱신,
+-- (이번 턴에 완료된 경우) 유저 통계 갱신을 하나의 트랜잭션으로 처리한다.
+CREATE OR REPLACE FUNCTION save_chat_turn(
+  p_session_id UUID,
+  p_user_id UUID,
+  p_user_content TEXT,
+  p_assistant_content TEXT,
+  p_feedback JSONB,
+  p_words_used JSONB,
+  p_is_completed BOOLEAN
+)
+RETURNS JSONB AS $$
+DECLARE
+  v_was_completed BOOLEAN;
+  v_user_message chat_messages;
+  v_assistant_message chat_messages;
+  v_newly_completed BOOLEAN;
+BEGIN
+  SELECT is_completed INTO v_was_completed
+  FROM study_sessions
+  WHERE id = p_session_id AND user_id = p_user_id
+  FOR UPDATE;
+
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'session % not found', p_session_id USING ERRCODE = 'P0002';
+  END IF;
+
+  -- NOW()는 트랜잭션 내내 같으므로 순서 보장을 위해 clock_timestamp() 사용
+  INSERT INTO chat_messages (session_id, role, content, word_usage_snapshot, created_at)
+  VALUES (p_session_id, 'user', p_user_content, p_words_used, clock_timestamp())
+  RETURNING * INTO v_user_message;
+
+  INSERT INTO chat_messages (session_id, role, content, feedback, word_usage_snapshot, created_at)
+  VALUES (p_session_id, 'assistant', p_assistant_content, p_feedback, p_words_used, clock_timestamp())
+  RETURNING * INTO v_assistant_message;
+
+  v_newly_completed := p_is_completed AND NOT v_was_completed;
+
+  UPDATE study_sessions
+  SET words_used = p_words_used,
+      is_completed = is_completed OR p_is_completed,
+      completed_at = CASE WHEN v_newly_completed THEN NOW() ELSE completed_at END
+  WHERE id = p_session_id;
+
+  -- 세션 완료 시 학습 횟수 / 연속 학습일 갱신
+  IF v_newly_completed THEN
+    UPDATE users
+    SET total_sessions = total_sessions + 1,
+        streak_days = CASE
+          WHEN last_study_date IS NULL THEN 1
+          WHEN CURRENT_DATE - last_study_date = 1 THEN streak_days + 1
+          WHEN CURRENT_DATE - last_study_date > 1 THEN 1
+          ELSE streak_days
+        END,
+        last_study_date = CURRENT_DATE
+    WHERE id = p_user_id;
+  END IF;
+
+  RETURN jsonb_build_object(
+    'user_message', to_jsonb(v_user_message),
+    'assistant_message', to_jsonb(v_assistant_message),
+    'newly_completed', v_newly_completed
+  );
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,66 @@
+-- Make save_chat_turn safe to retry from the write-behind queue
+-- Run this in Supabase SQL Editor
+
+-- 메시지 ID를 호출자가 생성해 넘긴다. 같은 ID로 재시도하면 메시지는 다시
+-- 삽입되지 않고, 세션이 이미 완료 상태이므로 유저 통계도 중복 반영되지 않는다.
+DROP FUNCTION IF EXISTS save_chat_turn(UUID, UUID, TEXT, TEXT, JSONB, JSONB, BOOLEAN);
+
+CREATE OR REPLACE FUNCTION save_chat_turn(
+  p_session_id UUID,
+  p_user_id UUID,
+  p_user_message_id UUID,
+  p_user_content TEXT,
+  p_assistant_message_id UUID,
+  p_assistant_content TEXT,
+  p_feedback JSONB,
+  p_words_used JSONB,
+  p_is_completed BOOLEAN
+)
+RETURNS JSONB AS $$
+DECLARE
+  v_was_completed BOOLEAN;
+  v_newly_completed BOOLEAN;
+BEGIN
+  SELECT is_completed INTO v_was_completed
+  FROM study_sessions
+  WHERE id = p_session_id AND user_id = p_user_id
+  FOR UPDATE;
+
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'session % not found', p_session_id USING ERRCODE = 'P0002';
+  END IF;
+
+  -- NOW()는 트랜잭션 내내 같으므로 순서 보장을 위해 clock_timestamp() 사용
+  INSERT INTO chat_messages (id, session_id, role, content, word_usage_snapshot, created_at)
+  VALUES (p_user_message_id, p_session_id, 'user', p_user_content, p_words_used, clock_timestamp())
+  ON CONFLICT (id) DO NOTHING;
+
+  INSERT INTO chat_messages (id, session_id, role, content, feedback, word_usage_snapshot, created_at)
+  VALUES (p_assistant_message_id, p_session_id, 'assistant', p_assistant_content, p_feedback, p_words_used, clock_timestamp())
+  ON CONFLICT (id) DO NOTHING;
+
+  v_newly_completed := p_is_completed AND NOT v_was_completed;
+
+  UPDATE study_sessions
+  SET words_used = p_words_used,
+      is_completed = is_completed OR p_is_completed,
+      completed_at = CASE WHEN v_newly_completed THEN NOW() ELSE completed_at END
+  WHERE id = p_session_id;
+
+  -- 세션 완료 시 학습 횟수 / 연속 학습일 갱신
+  IF v_newly_completed THEN
+    UPDATE users
+    SET total_sessions = total_sessions + 1,
+        streak_days = CASE
+          WHEN last_study_date IS NULL THEN 1
+          WHEN CURRENT_DATE - last_study_date = 1 THEN streak_days + 1
+          WHEN CURRENT_DATE - last_study_date > 1 THEN 1
+          ELSE streak_days
+        END,
+        last_study_date = CURRENT_DATE
+    WHERE id = p_user_id;
+  END IF;
+
+  RETURN jsonb_build_object('newly_completed', v_newly_completed);
+END;
+$$ LANGUAGE plpgsql;
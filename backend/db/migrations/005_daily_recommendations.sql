@@ -0,0 +1,13 @@
+-- Per-user daily word recommendations (오늘의 단어)
+-- Run this in Supabase SQL Editor
+
+-- (user, date) 당 한 행: 배치 잡이 전날 미리 채우고, 없으면 첫 요청 때 계산
+CREATE TABLE daily_recommendations (
+  user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+  rec_date DATE NOT NULL,
+  word_ids UUID[] NOT NULL,
+  created_at TIMESTAMPTZ DEFAULT NOW(),
+  PRIMARY KEY (user_id, rec_date)
+);
+
+ALTER TABLE daily_recommendations ENABLE ROW LEVEL SECURITY;
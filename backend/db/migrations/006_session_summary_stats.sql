@@ -0,0 +1,75 @@
+-- Incrementally maintained session summary
+-- Run this in Supabase SQL Editor
+
+-- 세션 완료 요약에 필요한 값을 턴마다 누적해 저장한다:
+-- {"first_message_at", "last_message_at", "message_count",
+--  "first_use": {단어: 그 단어를 처음 사용한 유저 메시지}}
+-- NULL이면 (이 마이그레이션 이전 세션) 완료 시 메시지를 다시 읽어 계산한다.
+ALTER TABLE study_sessions
+  ADD COLUMN summary_stats JSONB;
+
+-- save_chat_turn이 턴과 함께 누적값을 저장한다. 재시도 시 같은 값이 다시
+-- 쓰이므로 멱등성은 그대로 유지된다.
+DROP FUNCTION IF EXISTS save_chat_turn(UUID, UUID, UUID, TEXT, UUID, TEXT, JSONB, JSONB, BOOLEAN);
+
+CREATE OR REPLACE FUNCTION save_chat_turn(
+  p_session_id UUID,
+  p_user_id UUID,
+  p_user_message_id UUID,
+  p_user_content TEXT,
+  p_assistant_message_id UUID,
+  p_assistant_content TEXT,
+  p_feedback JSONB,
+  p_words_used JSONB,
+  p_is_completed BOOLEAN,
+  p_summary_stats JSONB DEFAULT NULL
+)
+RETURNS JSONB AS $$
+DECLARE
+  v_was_completed BOOLEAN;
+  v_newly_completed BOOLEAN;
+BEGIN
+  SELECT is_completed INTO v_was_completed
+  FROM study_sessions
+  WHERE id = p_session_id AND user_id = p_user_id
+  FOR UPDATE;
+
+  IF NOT FOUND THEN
+    RAISE EXCEPTION 'session % not found', p_session_id USING ERRCODE = 'P0002';
+  END IF;
+
+  -- NOW()는 트랜잭션 내내 같으므로 순서 보장을 위해 clock_timestamp() 사용
+  INSERT INTO chat_messages (id, session_id, role, content, word_usage_snapshot, created_at)
+  VALUES (p_user_message_id, p_session_id, 'user', p_user_content, p_words_used, clock_timestamp())
+  ON CONFLICT (id) DO NOTHING;
+
+  INSERT INTO chat_messages (id, session_id, role, content, feedback, word_usage_snapshot, created_at)
+  VALUES (p_assistant_message_id, p_session_id, 'assistant', p_assistant_content, p_feedback, p_words_used, clock_timestamp())
+  ON CONFLICT (id) DO NOTHING;
+
+  v_newly_completed := p_is_completed AND NOT v_was_completed;
+
+  UPDATE study_sessions
+  SET words_used = p_words_used,
+      summary_stats = COALESCE(p_summary_stats, summary_stats),
+      is_completed = is_completed OR p_is_completed,
+      completed_at = CASE WHEN v_newly_completed THEN NOW() ELSE completed_at END
+  WHERE id = p_session_id;
+
+  -- 세션 완료 시 학습 횟수 / 연속 학습일 갱신
+  IF v_newly_completed THEN
+    UPDATE users
+    SET total_sessions = total_sessions + 1,
+        streak_days = CASE
+          WHEN last_study_date IS NULL THEN 1
+          WHEN CURRENT_DATE - last_study_date = 1 THEN streak_days + 1
+          WHEN CURRENT_DATE - last_study_date > 1 THEN 1
+          ELSE streak_days
+        END,
+        last_study_date = CURRENT_DATE
+    WHERE id = p_user_id;
+  END IF;
+
+  RETURN jsonb_build_object('newly_completed', v_newly_completed);
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,41 @@
+-- Login persistence in one round trip
+-- Run this in Supabase SQL Editor
+
+-- 로그인 시 toss_user_key로 유저를 찾거나 만든다 (조회 + 삽입 두 번의 왕복 대신 한 번).
+-- 동시에 들어온 첫 로그인 두 건도 UNIQUE(toss_user_key)의 ON CONFLICT로
+-- 한 행만 만들고, 진 쪽은 먼저 커밋된 행을 읽는다.
+-- 반환: users 행 전체 + "is_new" (이번 호출이 행을 만들었는지)
+--
+-- p_level / p_is_premium: 새 유저의 초기값 (NULL이면 컬럼 기본값).
+-- p_is_premium이 NULL이 아니면 기존 유저에도 적용한다 (/dev-login).
+CREATE OR REPLACE FUNCTION login_user(
+  p_toss_user_key TEXT,
+  p_level TEXT DEFAULT NULL,
+  p_is_premium BOOLEAN DEFAULT NULL
+)
+RETURNS JSONB AS $$
+DECLARE
+  v_user users;
+  v_is_new BOOLEAN := true;
+BEGIN
+  INSERT INTO users (toss_user_key, level, is_premium)
+  VALUES (p_toss_user_key, COALESCE(p_level, 'beginner'), COALESCE(p_is_premium, false))
+  ON CONFLICT (toss_user_key) DO NOTHING
+  RETURNING * INTO v_user;
+
+  IF NOT FOUND THEN
+    v_is_new := false;
+    -- 기존 유저: 매 로그인마다 행을 다시 쓰지 않도록 DO UPDATE 대신 조회
+    IF p_is_premium IS NULL THEN
+      SELECT * INTO v_user FROM users WHERE toss_user_key = p_toss_user_key;
+    ELSE
+      UPDATE users
+      SET is_premium = p_is_premium, updated_at = NOW()
+      WHERE toss_user_key = p_toss_user_key
+      RETURNING * INTO v_user;
+    END IF;
+  END IF;
+
+  RETURN to_jsonb(v_user) || jsonb_build_object('is_new', v_is_new);
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,32 @@
+-- Premium entitlements carried in access tokens
+-- Run this in Supabase SQL Editor
+
+-- 액세스 토큰에 프리미엄 여부/만료 시각/entitlement_epoch를 서명해 넣는다.
+-- 강제 다운그레이드(환불, 관리자 조치 등)는 epoch를 올리고, 그보다 낮은
+-- epoch의 토큰은 프리미엄 확인에서 거절된다 (클라이언트가 토큰을 다시 받음).
+-- entitlement_changed_at: 서버가 최근 변경분만 주기적으로 읽어가기 위한 시각
+ALTER TABLE users
+  ADD COLUMN entitlement_epoch INTEGER NOT NULL DEFAULT 0,
+  ADD COLUMN entitlement_changed_at TIMESTAMPTZ;
+
+CREATE INDEX idx_users_entitlement_changed ON users(entitlement_changed_at)
+  WHERE entitlement_changed_at IS NOT NULL;
+
+-- 프리미엄 상태 변경. p_revoke면 epoch를 올려 이미 발급된 토큰을 무효화한다.
+-- 반환: 변경된 users 행 (새 토큰 발급용)
+CREATE OR REPLACE FUNCTION set_premium_entitlement(
+  p_user_id UUID,
+  p_is_premium BOOLEAN,
+  p_premium_expires_at TIMESTAMPTZ DEFAULT NULL,
+  p_revoke BOOLEAN DEFAULT false
+)
+RETURNS JSONB AS $$
+  UPDATE users
+  SET is_premium = p_is_premium,
+      premium_expires_at = p_premium_expires_at,
+      entitlement_epoch = entitlement_epoch + CASE WHEN p_revoke THEN 1 ELSE 0 END,
+      entitlement_changed_at = CASE WHEN p_revoke THEN NOW() ELSE entitlement_changed_at END,
+      updated_at = NOW()
+  WHERE id = p_user_id
+  RETURNING to_jsonb(users.*);
+$$ LANGUAGE sql;
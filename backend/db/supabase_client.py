@@ -1,4 +1,4 @@
-from supabase import create_client, Client
+from supabase import AsyncClient, Client, create_client
 
 from config import settings
 
@@ -8,7 +8,16 @@ from config import settings
 _key = settings.supabase_service_key or settings.supabase_key
 supabase: Client = create_client(settings.supabase_url, _key)
 
+# Async client for request handlers: PostgREST calls are awaited on the
+# event loop instead of blocking the worker while the HTTP round trip runs.
+async_supabase: AsyncClient = AsyncClient(settings.supabase_url, _key)
+
 
 def get_supabase() -> Client:
     """Return the Supabase client (service role)."""
     return supabase
+
+
+def get_async_supabase() -> AsyncClient:
+    """Return the async Supabase client (service role)."""
+    return async_supabase
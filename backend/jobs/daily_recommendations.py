@@ -0,0 +1,31 @@
+"""Precompute tomorrow's daily word recommendations for active users.
+
+Run before the day starts (see the cron job in render.yaml):
+
+    python -m jobs.daily_recommendations              # tomorrow
+    python -m jobs.daily_recommendations 2026-01-31   # a given date
+"""
+import asyncio
+import logging
+import os
+import sys
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import recommendation_service
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    day = (
+        date.fromisoformat(sys.argv[1])
+        if len(sys.argv) > 1
+        else date.today() + timedelta(days=1)
+    )
+    count = asyncio.run(recommendation_service.precompute(day))
+    print(f"Precomputed daily words for {count} users ({day}).")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,20 +1,54 @@
 import logging
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, Request
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
 from config import settings
+from middleware.auth import require_metrics_token, token_cache_stats
 from middleware.logging import LoggingMiddleware, setup_json_logging
 from routers import auth, chat, history, iap, level_test, speaking, vocab
+from services import (
+    entitlements,
+    idempotency,
+    llm_gateway,
+    model_policy,
+    opening_pool,
+    session_cache,
+    speaking_pipeline,
+    toss_api_service,
+    transcription_service,
+    vocab_index,
+)
+from services.background_queue import write_behind
 
 setup_json_logging()
 logger = logging.getLogger("toking-api")
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    write_behind.start()
+    await vocab_index.start()
+    opening_pool.start()
+    transcription_service.start()
+    await entitlements.start()
+    yield
+    await entitlements.stop()
+    transcription_service.stop()
+    await toss_api_service.close()
+    await opening_pool.stop()
+    await vocab_index.stop()
+    # 응답 후 처리 대기 중인 DB 쓰기를 모두 반영하고 종료
+    await write_behind.stop(timeout=settings.write_behind_flush_timeout_seconds)
+
+
 app = FastAPI(
     title="TokingToking API",
     description="AI 영어 어휘 학습 앱 - 앱인토스",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # Logging middleware (innermost = runs first)
@@ -40,6 +74,15 @@ app.include_router(iap.router)
 app.include_router(history.router)
 
 
+@app.exception_handler(llm_gateway.LLMDeadlineExceeded)
+async def llm_deadline_handler(request: Request, exc: llm_gateway.LLMDeadlineExceeded):
+    logger.warning(f"LLM deadline exceeded: {exc}")
+    return JSONResponse(
+        status_code=504,
+        content={"detail": "AI 응답이 지연되고 있습니다. 잠시 후 다시 시도해주세요."},
+    )
+
+
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     logger.error(f"Unhandled error: {exc}", exc_info=True)
@@ -52,3 +95,19 @@ async def global_exception_handler(request: Request, exc: Exception):
 @app.get("/api/health")
 async def health_check():
     return {"status": "ok", "service": "toking-toking"}
+
+
+@app.get("/api/metrics", dependencies=[Depends(require_metrics_token)])
+async def metrics():
+    """프로세스 내 캐시/큐 지표 (X-Metrics-Token 필요, 토큰 미설정 시 개발 환경에서만)"""
+    return {
+        "session_cache": session_cache.stats(),
+        "write_behind": write_behind.stats(),
+        "opening_pool": opening_pool.pool.stats(),
+        "llm": llm_gateway.stats(),
+        "speaking_tiers": model_policy.stats(),
+        "speaking_pipeline": speaking_pipeline.stats(),
+        "idempotency": idempotency.store.stats(),
+        "entitlements": entitlements.stats(),
+        "token_cache": token_cache_stats(),
+    }
@@ -1,19 +1,42 @@
+import os
+import secrets
+import time
 from datetime import datetime, timedelta, timezone
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from jose import JWTError, jwt
 
 from config import settings
+from services.ttl_cache import TTLCache
 
 security = HTTPBearer()
 
+# 검증을 마친 액세스 토큰 -> 클레임. 같은 세션 동안 같은 토큰이 계속 오므로
+# 서명 검증은 토큰당 한 번만 한다. 항목은 토큰의 exp보다 먼저 만료된다.
+_verified: TTLCache[str, dict] = TTLCache(
+    maxsize=settings.token_cache_size,
+    ttl=settings.jwt_access_token_expire_minutes * 60,
+)
 
-def create_access_token(user_id: str) -> str:
+
+def create_access_token(user_id: str, entitlements: dict | None = None) -> str:
+    """`entitlements`: premium claims from services.entitlements.claims(user row).
+
+    Without them the token grants no premium access.
+    """
     expire = datetime.now(timezone.utc) + timedelta(
         minutes=settings.jwt_access_token_expire_minutes
     )
-    payload = {"sub": user_id, "exp": expire, "type": "access"}
+    payload = {
+        "sub": user_id,
+        "exp": expire,
+        "type": "access",
+        "premium": False,
+        "premium_expires_at": None,
+        "entitlement_epoch": 0,
+        **(entitlements or {}),
+    }
     return jwt.encode(payload, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
 
 
@@ -25,10 +48,18 @@ def create_refresh_token(user_id: str) -> str:
     return jwt.encode(payload, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
 
 
-def get_current_user_id(
+async def get_token_claims(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-) -> str:
+) -> dict:
+    """Verified access-token payload (sub + entitlement claims).
+
+    Tokens verified before are served from an LRU cache until their `exp`;
+    the returned dict is shared and must not be modified.
+    """
     token = credentials.credentials
+    payload = _verified.get(token)
+    if payload is not None:
+        return payload
     try:
         payload = jwt.decode(
             token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm]
@@ -40,9 +71,32 @@ def get_current_user_id(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid token",
             )
-        return user_id
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token expired or invalid",
         )
+    _verified.set(token, payload, ttl=payload["exp"] - time.time())
+    return payload
+
+
+async def get_current_user_id(claims: dict = Depends(get_token_claims)) -> str:
+    return claims["sub"]
+
+
+def token_cache_stats() -> dict:
+    return _verified.stats()
+
+
+async def require_metrics_token(x_metrics_token: str | None = Header(default=None)) -> None:
+    """Internal metrics: METRICS_TOKEN when configured, otherwise only outside production."""
+    expected = settings.metrics_token
+    if not expected:
+        if os.environ.get("ENVIRONMENT") == "production":
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+        return
+    if x_metrics_token is None or not secrets.compare_digest(x_metrics_token, expected):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+        )
@@ -0,0 +1,38 @@
+from typing import Awaitable, Callable
+
+from fastapi import Header, HTTPException, Response, status
+
+from services.idempotency import IdempotencyConflict, store, valid_key
+
+
+def get_idempotency_key(
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key"),
+) -> str | None:
+    if idempotency_key is not None and not valid_key(idempotency_key):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Idempotency-Key must be 1-255 printable ASCII characters",
+        )
+    return idempotency_key
+
+
+async def idempotent(
+    user_id: str,
+    key: str | None,
+    request_fingerprint: str,
+    response: Response,
+    call: Callable[[], Awaitable[dict]],
+) -> dict:
+    """Run `call()` once per (user, Idempotency-Key); without a key, just run it.
+
+    Responses returned to a retry carry `Idempotent-Replayed: true`.
+    """
+    if key is None:
+        return await call()
+    try:
+        result, replayed = await store.run(user_id, key, request_fingerprint, call)
+    except IdempotencyConflict as exc:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(exc))
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
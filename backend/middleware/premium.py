@@ -1,21 +1,24 @@
-from datetime import datetime, timezone
+import time
 
 from fastapi import Depends, HTTPException, status
 
-from db.supabase_client import supabase
-from middleware.auth import get_current_user_id
+from middleware.auth import get_token_claims
+from services import entitlements
 
 
-def require_premium(user_id: str = Depends(get_current_user_id)) -> str:
-    result = (
-        supabase.table("users")
-        .select("is_premium, premium_expires_at")
-        .eq("id", user_id)
-        .single()
-        .execute()
-    )
-    user = result.data
-    if not user or not user.get("is_premium"):
+async def require_premium(claims: dict = Depends(get_token_claims)) -> str:
+    """Premium check from the token's signed entitlement claims (no DB read)."""
+    if entitlements.is_stale(claims):
+        # 발급 이후 강제 다운그레이드됨 (또는 클레임 없는 예전 토큰): 토큰을 다시 받아야 한다
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail={
+                "code": "ENTITLEMENTS_CHANGED",
+                "message": "구독 상태가 변경되었습니다. 다시 로그인해주세요.",
+            },
+        )
+
+    if not claims.get("premium"):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail={
@@ -25,20 +28,15 @@ def require_premium(user_id: str = Depends(get_current_user_id)) -> str:
             },
         )
 
-    expires_at = user.get("premium_expires_at")
-    if expires_at:
-        expire_dt = datetime.fromisoformat(expires_at.replace("Z", "+00:00"))
-        if expire_dt < datetime.now(timezone.utc):
-            supabase.table("users").update({"is_premium": False}).eq(
-                "id", user_id
-            ).execute()
-            raise HTTPException(
-                status_code=status.HTTP_403_FORBIDDEN,
-                detail={
-                    "code": "SUBSCRIPTION_EXPIRED",
-                    "message": "구독이 만료되었습니다. 갱신해주세요.",
-                    "action": "REDIRECT_SUBSCRIBE",
-                },
-            )
+    expires_at = claims.get("premium_expires_at")
+    if expires_at is not None and expires_at < time.time():
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail={
+                "code": "SUBSCRIPTION_EXPIRED",
+                "message": "구독이 만료되었습니다. 갱신해주세요.",
+                "action": "REDIRECT_SUBSCRIBE",
+            },
+        )
 
-    return user_id
+    return claims["sub"]
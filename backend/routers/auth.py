@@ -6,10 +6,17 @@ from jose import JWTError, jwt
 from datetime import date
 
 from config import settings
-from db.supabase_client import supabase
+from db.supabase_client import async_supabase, supabase
 from middleware.auth import create_access_token, create_refresh_token, get_current_user_id
 from models.user import LoginRequest, LoginResponse, TokenRefreshRequest, TokenResponse, UserInfo
-from services.auth_service import get_user_info, login_with_toss
+from services import entitlements, recommendation_service, session_cache
+from services.auth_service import (
+    get_user_info,
+    login_response,
+    login_with_toss,
+    refresh_access_token,
+    upsert_login_user,
+)
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
@@ -38,7 +45,13 @@ async def refresh_token(request: TokenRefreshRequest):
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid refresh token",
             )
-        new_access = create_access_token(user_id)
+        # 액세스 토큰에는 현재 구독 상태를 다시 담는다
+        new_access = await refresh_access_token(user_id)
+        if new_access is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="Invalid refresh token",
+            )
         new_refresh = create_refresh_token(user_id)
         return TokenResponse(access_token=new_access, refresh_token=new_refresh)
     except JWTError:
@@ -69,49 +82,18 @@ async def dev_login():
         raise HTTPException(status_code=404, detail="Not found")
 
     dev_key = "DEV_TEST_USER"
-    existing = (
-        supabase.table("users")
-        .select("*")
-        .eq("toss_user_key", dev_key)
-        .execute()
-    )
-
-    if len(existing.data) == 0:
-        result = (
-            supabase.table("users")
-            .insert({"toss_user_key": dev_key, "level": "intermediate", "is_premium": True})
-            .execute()
-        )
-        user = result.data[0]
-        is_new_user = True
-    else:
-        user = existing.data[0]
-        is_new_user = False
-
-        # Admin: 매번 프리미엄 활성화 + 오늘 세션 초기화
-        supabase.table("users").update({"is_premium": True}).eq("id", user["id"]).execute()
-        user["is_premium"] = True
+    # Admin: 매번 프리미엄 활성화
+    user = await upsert_login_user(dev_key, level="intermediate", is_premium=True)
 
+    if not user["is_new"]:
+        # 오늘 세션 초기화
         today = date.today().isoformat()
-        supabase.table("study_sessions").delete().eq(
+        await async_supabase.table("study_sessions").delete().eq(
             "user_id", user["id"]
         ).gte("started_at", f"{today}T00:00:00").execute()
+        session_cache.invalidate_user(user["id"])
 
-    access_token = create_access_token(user["id"])
-    refresh_token = create_refresh_token(user["id"])
-
-    return {
-        "access_token": access_token,
-        "refresh_token": refresh_token,
-        "user": {
-            "id": user["id"],
-            "level": user["level"],
-            "is_premium": user["is_premium"],
-            "total_sessions": user["total_sessions"],
-            "streak_days": user["streak_days"],
-        },
-        "is_new_user": is_new_user,
-    }
+    return login_response(user)
 
 
 @router.patch("/dev-update")
@@ -119,7 +101,10 @@ async def dev_update(
     updates: dict,
     user_id: str = Depends(get_current_user_id),
 ):
-    """테스트 유저 정보 수정 (개발 전용)"""
+    """테스트 유저 정보 수정 (개발 전용)
+
+    is_premium을 바꾸면 기존 토큰의 구독 클레임을 무효화하고 새 access_token을 함께 돌려준다.
+    """
     if os.environ.get("ENVIRONMENT") == "production":
         raise HTTPException(status_code=404, detail="Not found")
 
@@ -128,5 +113,18 @@ async def dev_update(
     if not filtered:
         raise HTTPException(status_code=400, detail="No valid fields")
 
-    supabase.table("users").update(filtered).eq("id", user_id).execute()
-    return get_user_info(user_id)
+    access_token = None
+    if "is_premium" in filtered:
+        user = await entitlements.set_premium(
+            user_id, bool(filtered.pop("is_premium")), revoke=True
+        )
+        access_token = create_access_token(user_id, entitlements.claims(user))
+    if filtered:
+        supabase.table("users").update(filtered).eq("id", user_id).execute()
+    session_cache.invalidate_user(user_id)
+    if "level" in filtered:
+        recommendation_service.reset_for_user(user_id)
+    result = get_user_info(user_id)
+    if access_token is not None:
+        result["access_token"] = access_token
+    return result
@@ -1,31 +1,34 @@
 from datetime import date
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.responses import StreamingResponse
 
 from config import settings
-from db.supabase_client import supabase
-from middleware.auth import get_current_user_id
+from db.supabase_client import async_supabase
+from middleware.auth import get_current_user_id, get_token_claims
+from middleware.idempotency import get_idempotency_key, idempotent
 from models.chat import ChatMessageRequest, SessionCreateRequest
-from services.chat_service import create_session, get_session_detail, send_message
+from services.chat_service import (
+    create_session,
+    get_session_detail,
+    send_message,
+    stream_message,
+)
+from services.entitlements import is_stale, premium_active
+from services.idempotency import fingerprint
+from services.streaming import SSE_HEADERS, encode_sse
 
 router = APIRouter(prefix="/api/chat", tags=["chat"])
 
 
-def _check_daily_limit(user_id: str):
+async def _check_daily_limit(user_id: str, claims: dict):
     """무료 유저 일일 세션 제한 (3회/일)."""
-    user = (
-        supabase.table("users")
-        .select("is_premium")
-        .eq("id", user_id)
-        .single()
-        .execute()
-    )
-    if user.data.get("is_premium"):
-        return  # 프리미엄 유저는 제한 없음
+    if premium_active(claims) and not is_stale(claims):
+        return  # 프리미엄 유저는 제한 없음 (토큰의 구독 클레임으로 판단)
 
     today = date.today().isoformat()
-    sessions_today = (
-        supabase.table("study_sessions")
+    sessions_today = await (
+        async_supabase.table("study_sessions")
         .select("id", count="exact")
         .eq("user_id", user_id)
         .gte("started_at", f"{today}T00:00:00")
@@ -38,16 +41,25 @@ def _check_daily_limit(user_id: str):
         )
 
 
+def _validate_content(content: str):
+    if not content.strip():
+        raise HTTPException(status_code=400, detail="Message content cannot be empty")
+
+    if len(content) > 500:
+        raise HTTPException(status_code=400, detail="Message too long (max 500 chars)")
+
+
 @router.post("/session")
 async def start_session(
     request: SessionCreateRequest,
-    user_id: str = Depends(get_current_user_id),
+    claims: dict = Depends(get_token_claims),
 ):
+    user_id = claims["sub"]
     if len(request.word_ids) != 3:
         raise HTTPException(status_code=400, detail="Exactly 3 word IDs required")
 
-    _check_daily_limit(user_id)
-    result = create_session(user_id, request.mode, request.word_ids)
+    await _check_daily_limit(user_id, claims)
+    result = await create_session(user_id, request.mode, request.word_ids)
     return result
 
 
@@ -57,7 +69,7 @@ async def get_session(
     user_id: str = Depends(get_current_user_id),
 ):
     try:
-        result = get_session_detail(user_id, session_id)
+        result = await get_session_detail(user_id, session_id)
         return result
     except Exception:
         raise HTTPException(status_code=404, detail="Session not found")
@@ -66,13 +78,31 @@ async def get_session(
 @router.post("/message")
 async def chat_message(
     request: ChatMessageRequest,
+    response: Response,
     user_id: str = Depends(get_current_user_id),
+    idempotency_key: str | None = Depends(get_idempotency_key),
 ):
-    if not request.content.strip():
-        raise HTTPException(status_code=400, detail="Message content cannot be empty")
+    """재시도는 같은 Idempotency-Key 헤더로 보내면 LLM 호출/메시지 저장 없이 첫 응답을 받는다."""
+    _validate_content(request.content)
+    result = await idempotent(
+        user_id,
+        idempotency_key,
+        fingerprint("chat/message", request.session_id, request.content),
+        response,
+        lambda: send_message(user_id, request.session_id, request.content, mode="chat"),
+    )
+    return result
 
-    if len(request.content) > 500:
-        raise HTTPException(status_code=400, detail="Message too long (max 500 chars)")
 
-    result = send_message(user_id, request.session_id, request.content, mode="chat")
-    return result
+@router.post("/message/stream")
+async def chat_message_stream(
+    request: ChatMessageRequest,
+    user_id: str = Depends(get_current_user_id),
+):
+    """SSE: "delta" 이벤트로 AI 메시지를 토큰 단위로 보내고, 마지막 "done" 이벤트에
+    /message 와 같은 응답 본문(word_usage, hint, grammar_correction, session_status)을 보낸다."""
+    _validate_content(request.content)
+    events = await stream_message(user_id, request.session_id, request.content, mode="chat")
+    return StreamingResponse(
+        encode_sse(events), media_type="text/event-stream", headers=SSE_HEADERS
+    )
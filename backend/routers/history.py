@@ -5,9 +5,12 @@ from fastapi import APIRouter, Depends, Query
 
 from db.supabase_client import supabase
 from middleware.auth import get_current_user_id
+from services.vocab_service import get_words_by_ids
 
 router = APIRouter(prefix="/api/history", tags=["history"])
 
+HISTORY_WORD_FIELDS = ("id", "word", "pos", "definition_ko")
+
 
 @router.get("/sessions")
 async def get_sessions(
@@ -94,17 +97,11 @@ async def get_word_history(
     for wids in date_words.values():
         all_word_ids.update(wids)
 
-    # 단어 정보 조회
+    # 단어 정보 조회 (메모리 인덱스, 갱신 이후 추가된 단어는 DB에서)
     word_map: dict[str, dict] = {}
     if all_word_ids:
-        words_result = (
-            supabase.table("vocabularies")
-            .select("id, word, pos, definition_ko")
-            .in_("id", list(all_word_ids))
-            .execute()
-        )
-        for w in words_result.data:
-            word_map[w["id"]] = w
+        for word in await get_words_by_ids(list(all_word_ids), HISTORY_WORD_FIELDS):
+            word_map[word["id"]] = word
 
     # 날짜별 정리 (최신순)
     sorted_dates = sorted(date_words.keys(), reverse=True)[:limit]
@@ -1,86 +1,182 @@
-from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+import asyncio
+import logging
 
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
+
+from middleware.idempotency import get_idempotency_key, idempotent
 from middleware.premium import require_premium
 from models.chat import SpeakingMessageRequest
-from services.chat_service import send_message
-from services.transcription_service import transcribe_and_process
-from services.vocab_service import get_words_by_ids
-from db.supabase_client import supabase
+from services.audio_upload import UploadError, receive_audio
+from services import speaking_pipeline
+from services.chat_service import send_message, stream_message
+from services.idempotency import fingerprint
+from services.streaming import SSE_HEADERS, encode_sse
+
+logger = logging.getLogger("toking-api")
 
 router = APIRouter(prefix="/api/speaking", tags=["speaking"])
 
+# /transcribe reads its multipart body itself (services.audio_upload);
+# documented here since FastAPI no longer sees File/Form parameters.
+TRANSCRIBE_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["audio", "session_id"],
+                    "properties": {
+                        "audio": {"type": "string", "format": "binary"},
+                        "session_id": {"type": "string"},
+                    },
+                }
+            }
+        },
+    }
+}
+
+
+def _validate_transcribed_text(text: str):
+    if not text.strip():
+        raise HTTPException(status_code=400, detail="Transcribed text cannot be empty")
+
+    if len(text) > 500:
+        raise HTTPException(status_code=400, detail="Text too long (max 500 chars)")
+
 
 @router.post("/message")
 async def speaking_message(
     request: SpeakingMessageRequest,
+    response: Response,
     user_id: str = Depends(require_premium),
+    idempotency_key: str | None = Depends(get_idempotency_key),
 ):
-    """Text-based speaking message (fallback when audio upload not used)."""
-    if not request.transcribed_text.strip():
-        raise HTTPException(status_code=400, detail="Transcribed text cannot be empty")
+    """Text-based speaking message (fallback when audio upload not used).
 
-    if len(request.transcribed_text) > 500:
-        raise HTTPException(status_code=400, detail="Text too long (max 500 chars)")
-
-    result = send_message(
-        user_id, request.session_id, request.transcribed_text, mode="speaking"
+    Retries sent with the same Idempotency-Key header get the first
+    response back instead of a second turn.
+    """
+    _validate_transcribed_text(request.transcribed_text)
+    result = await idempotent(
+        user_id,
+        idempotency_key,
+        fingerprint("speaking/message", request.session_id, request.transcribed_text),
+        response,
+        lambda: send_message(
+            user_id, request.session_id, request.transcribed_text, mode="speaking"
+        ),
     )
     return result
 
 
-@router.post("/transcribe")
-async def transcribe_and_respond(
-    audio: UploadFile = File(...),
-    session_id: str = Form(...),
+@router.post("/message/stream")
+async def speaking_message_stream(
+    request: SpeakingMessageRequest,
     user_id: str = Depends(require_premium),
 ):
     """
-    Audio-based speaking: Groq Whisper transcription + LLM post-processing + AI response.
+    Streaming variant of /message over Server-Sent Events.
 
-    Pipeline (inspired by Freeflow):
-    1. Receive audio blob from frontend
-    2. Groq Whisper: fast transcription (<1 second)
-    3. LLM post-processing: fix spelling with vocabulary context
-    4. Send processed text to chat service for AI response
+    Emits "delta" events with the reply text as it is generated, then a
+    single "done" event carrying the same body as /message (word_usage,
+    feedback, hint, grammar_correction, session_status).
     """
-    # Validate audio
-    audio_data = await audio.read()
-    if len(audio_data) > 10 * 1024 * 1024:  # 10MB limit
-        raise HTTPException(status_code=400, detail="Audio file too large (max 10MB)")
-
-    if len(audio_data) == 0:
-        raise HTTPException(status_code=400, detail="Empty audio file")
-
-    # Get target words for vocabulary-aware post-processing
-    session = (
-        supabase.table("study_sessions")
-        .select("target_words")
-        .eq("id", session_id)
-        .eq("user_id", user_id)
-        .single()
-        .execute()
+    _validate_transcribed_text(request.transcribed_text)
+    events = await stream_message(
+        user_id, request.session_id, request.transcribed_text, mode="speaking"
     )
-    words = get_words_by_ids(session.data["target_words"])
-    target_word_names = [w["word"] for w in words]
-
-    # Groq Whisper transcription + LLM post-processing
-    transcription = await transcribe_and_process(
-        audio_data,
-        target_words=target_word_names,
-        filename=audio.filename or "audio.webm",
+    return StreamingResponse(
+        encode_sse(events), media_type="text/event-stream", headers=SSE_HEADERS
     )
 
-    processed_text = transcription["text"]
-    if not processed_text.strip():
-        raise HTTPException(status_code=400, detail="Could not transcribe audio")
 
-    # Send to AI for response + feedback
-    result = send_message(user_id, session_id, processed_text, mode="speaking")
+@router.post("/transcribe", openapi_extra=TRANSCRIBE_REQUEST_BODY)
+async def transcribe_and_respond(
+    request: Request,
+    response: Response,
+    user_id: str = Depends(require_premium),
+    idempotency_key: str | None = Depends(get_idempotency_key),
+):
+    """
+    Audio-based speaking: Groq Whisper transcription + LLM post-processing + AI response.
 
-    # Include transcription details in response
-    result["transcription"] = {
-        "raw": transcription["raw_transcript"],
-        "processed": transcription["processed_transcript"],
-    }
+    Pipeline (inspired by Freeflow, stages in services/speaking_pipeline.py):
+    1. Receive audio blob from frontend (streamed, 10MB cap enforced while reading)
+    2. Groq Whisper: fast transcription (<1 second), started alongside the
+       session/target-word lookup; an unknown or foreign session cancels
+       the upload
+    3. LLM post-processing: fix spelling with vocabulary context (skipped
+       when the raw transcript is already clean)
+    4. Send processed text to chat service for AI response
 
+    Stage durations are returned in the Server-Timing header. A retry with
+    the same Idempotency-Key header and audio gets the first response back.
+    """
+    timer = speaking_pipeline.StageTimer()
+
+    # Validate audio (크기 제한은 읽는 도중에 검사)
+    try:
+        with timer.stage("receive"):
+            audio, fields = await receive_audio(request)
+    except UploadError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+    session_id = fields.get("session_id")
+    if not session_id:
+        audio.close()
+        raise HTTPException(status_code=400, detail="session_id is required")
+
+    async def run() -> dict:
+        with audio:
+            # Groq Whisper transcription (세션/단어 조회와 동시에) + 필요할 때만 LLM 후처리
+            _, transcription = await speaking_pipeline.transcribe(
+                user_id, session_id, audio, timer
+            )
+
+        processed_text = transcription["text"]
+        if not processed_text.strip():
+            raise HTTPException(status_code=400, detail="Could not transcribe audio")
+
+        # Send to AI for response + feedback
+        with timer.stage("respond"):
+            result = await send_message(user_id, session_id, processed_text, mode="speaking")
+
+        # Include transcription details in response
+        result["transcription"] = {
+            "raw": transcription["raw_transcript"],
+            "processed": transcription["processed_transcript"],
+        }
+
+        speaking_pipeline.record(timer)
+        response.headers["Server-Timing"] = timer.server_timing()
+        logger.info(
+            "Speaking pipeline",
+            extra={
+                "request_id": getattr(request.state, "request_id", "N/A"),
+                "data": {
+                    "timings_ms": timer.timings_ms(),
+                    "post_processed": transcription["post_processed"],
+                },
+            },
+        )
+        return result
+
+    try:
+        result = await idempotent(
+            user_id,
+            idempotency_key,
+            fingerprint("speaking/transcribe", session_id, audio.digest),
+            response,
+            run,
+        )
+    except asyncio.CancelledError:
+        # 클라이언트가 끊겨도 진행 중인 run()이 audio를 끝까지 쓰고 닫는다
+        raise
+    except Exception:
+        audio.close()
+        raise
+    # 재시도(저장된 응답 / 진행 중인 요청 대기)는 run()을 호출하지 않는다
+    audio.close()
     return result
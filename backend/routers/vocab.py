@@ -1,7 +1,8 @@
 from fastapi import APIRouter, Depends, Query
 
-from middleware.auth import get_current_user_id
-from services.vocab_service import get_random_words
+from middleware.auth import get_token_claims
+from services import entitlements, opening_pool
+from services.recommendation_service import get_daily_words
 
 router = APIRouter(prefix="/api/vocab", tags=["vocab"])
 
@@ -9,7 +10,13 @@ router = APIRouter(prefix="/api/vocab", tags=["vocab"])
 @router.get("/random")
 async def random_words(
     count: int = Query(default=3, ge=1, le=5),
-    user_id: str = Depends(get_current_user_id),
+    claims: dict = Depends(get_token_claims),
 ):
-    words = get_random_words(user_id, count)
+    user_id = claims["sub"]
+    # 오늘의 단어: (유저, 날짜)별로 저장된 추천을 조회
+    words = await get_daily_words(user_id, count)
+    # 보통 바로 이 단어들로 세션을 시작하므로 첫 메시지를 미리 생성
+    opening_pool.pool.speculate(
+        user_id, [w["id"] for w in words], entitlements.premium_active(claims)
+    )
     return {"words": words}
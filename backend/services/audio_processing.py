@@ -0,0 +1,65 @@
+"""
+CPU-side audio helpers run in the transcription process pool.
+
+Kept free of app imports (settings, clients) so pool workers start quickly
+and never touch the event loop's state.
+"""
+
+import math
+import operator
+from array import array
+
+SAMPLE_RATE = 16000
+FRAME_MS = 20
+FRAME_BYTES = SAMPLE_RATE * FRAME_MS // 1000 * 2
+# Frames quieter than this are silence regardless of the noise floor
+MIN_SPEECH_DBFS = -45.0
+# ...and frames must be this much louder than the noise floor (dB)
+NOISE_MARGIN_DB = 12.0
+# Kept around the detected speech so word onsets/endings are not clipped
+PADDING_MS = 250
+
+
+def _dbfs(rms: float) -> float:
+    return 20 * math.log10(rms / 32768) if rms > 0 else -120.0
+
+
+def frame_levels(pcm: bytes) -> array:
+    """RMS level (dBFS) of each whole FRAME_MS frame of `pcm` (16-bit mono).
+
+    Run in the pool on bounded chunks; only this envelope (4 bytes per
+    frame) comes back to the event loop.
+    """
+    samples = array("h")
+    samples.frombytes(pcm[: len(pcm) - len(pcm) % FRAME_BYTES])
+    frame = FRAME_BYTES // 2
+    return array(
+        "f",
+        (
+            _dbfs(math.sqrt(sum(map(operator.mul, chunk, chunk)) / frame))
+            for chunk in (samples[i:i + frame] for i in range(0, len(samples), frame))
+        ),
+    )
+
+
+def speech_frames(levels) -> tuple[int, int] | None:
+    """Frame range [first, last) that contains speech, or None if silent.
+
+    Energy VAD: a frame is speech when its RMS level is above
+    MIN_SPEECH_DBFS and within NOISE_MARGIN_DB of the loudest frame, or
+    NOISE_MARGIN_DB above the noise floor (10th-percentile frame) if that
+    is lower. Only leading and trailing silence is cut.
+    """
+    if not levels:
+        return None
+    ordered = sorted(levels)
+    noise_floor, peak = ordered[len(ordered) // 10], ordered[-1]
+    threshold = max(
+        MIN_SPEECH_DBFS, min(noise_floor + NOISE_MARGIN_DB, peak - NOISE_MARGIN_DB)
+    )
+    voiced = [i for i, level in enumerate(levels) if level >= threshold]
+    if not voiced:
+        return None
+
+    pad = PADDING_MS // FRAME_MS
+    return max(0, voiced[0] - pad), min(len(levels), voiced[-1] + 1 + pad)
@@ -0,0 +1,192 @@
+"""
+Streaming receive of audio uploads.
+
+`receive_audio()` parses the multipart body straight from `request.stream()`
+with python-multipart. The audio part is written chunk by chunk into a
+`SpooledAudio` buffer: in memory up to `audio_spool_memory_bytes`, on a
+temporary file beyond. The size cap is checked on every chunk, so an
+oversized upload is rejected as soon as it crosses the limit (or up front
+from Content-Length) instead of after it has been read in full.
+
+`SpooledAudio` is file-like (read/seek/tell) but has no `fileno()`. httpx
+then streams it to the transcription API in 64KB chunks rather than
+holding another copy of the upload.
+
+The SHA-256 of the audio is computed as it is written (`SpooledAudio.digest`),
+so retried uploads of the same clip can be recognised without re-reading it
+(services/transcript_cache.py).
+"""
+
+import hashlib
+from tempfile import SpooledTemporaryFile
+
+from python_multipart import MultipartParser
+from python_multipart.multipart import parse_options_header
+from starlette.requests import Request
+
+from config import settings
+
+# Room for the multipart framing and the small text fields
+FORM_OVERHEAD_BYTES = 64 * 1024
+MAX_FIELD_BYTES = 1024
+MAX_PARTS = 8
+
+
+class UploadError(ValueError):
+    """The upload is malformed, empty or over the size limit (HTTP 400)."""
+
+
+class SpooledAudio:
+    """Uploaded audio, spooled to disk past `spool_bytes`."""
+
+    def __init__(self, filename: str, content_type: str, spool_bytes: int):
+        self.filename = filename
+        self.content_type = content_type
+        self.size = 0
+        self._file = SpooledTemporaryFile(max_size=spool_bytes)
+        self._sha256 = hashlib.sha256()
+
+    def write(self, data: bytes) -> None:
+        self._file.write(data)
+        self._sha256.update(data)
+        self.size += len(data)
+
+    @property
+    def digest(self) -> str:
+        """SHA-256 (hex) of everything written so far."""
+        return self._sha256.hexdigest()
+
+    def read(self, size: int = -1) -> bytes:
+        return self._file.read(size)
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self._file.seek(offset, whence)
+
+    def tell(self) -> int:
+        return self._file.tell()
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "SpooledAudio":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class _FormReader:
+    def __init__(self, file_field: str, max_bytes: int, spool_bytes: int):
+        self.file_field = file_field
+        self.max_bytes = max_bytes
+        self.spool_bytes = spool_bytes
+        self.fields: dict[str, str] = {}
+        self.audio: SpooledAudio | None = None
+        self._parts = 0
+        self._headers: dict[bytes, bytes] = {}
+        self._header_name = b""
+        self._header_value = b""
+        self._name = ""
+        self._data: bytearray | None = None
+        self._sink: SpooledAudio | None = None
+
+    def on_part_begin(self) -> None:
+        self._parts += 1
+        if self._parts > MAX_PARTS:
+            raise UploadError("Too many form fields")
+        self._headers, self._data, self._sink = {}, None, None
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._header_value += data[start:end]
+
+    def on_header_end(self) -> None:
+        self._headers[self._header_name.lower()] = self._header_value
+        self._header_name = self._header_value = b""
+
+    def on_headers_finished(self) -> None:
+        _, options = parse_options_header(self._headers.get(b"content-disposition"))
+        self._name = options.get(b"name", b"").decode("utf-8", "replace")
+        if b"filename" not in options:
+            self._data = bytearray()
+        elif self._name == self.file_field and self.audio is None:
+            self.audio = self._sink = SpooledAudio(
+                filename=options[b"filename"].decode("utf-8", "replace"),
+                content_type=self._headers.get(b"content-type", b"").decode("latin-1"),
+                spool_bytes=self.spool_bytes,
+            )
+        # 그 외 파일 파트는 버린다 (본문 전체 크기 제한은 receive_audio에서)
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if self._sink is not None:
+            if self._sink.size + (end - start) > self.max_bytes:
+                raise UploadError(
+                    f"Audio file too large (max {self.max_bytes // (1024 * 1024)}MB)"
+                )
+            self._sink.write(data[start:end])
+        elif self._data is not None:
+            if len(self._data) + (end - start) > MAX_FIELD_BYTES:
+                raise UploadError(f"Form field too large: {self._name}")
+            self._data += data[start:end]
+
+    def on_part_end(self) -> None:
+        if self._data is not None:
+            self.fields[self._name] = self._data.decode("utf-8", "replace")
+
+
+async def receive_audio(
+    request: Request, file_field: str = "audio"
+) -> tuple[SpooledAudio, dict[str, str]]:
+    """Read a multipart upload: (audio, text fields).
+
+    Raises UploadError for a missing, empty or oversized file. The caller
+    closes the returned audio.
+    """
+    max_bytes = settings.audio_max_upload_bytes
+    max_body = max_bytes + FORM_OVERHEAD_BYTES
+    too_large = f"Audio file too large (max {max_bytes // (1024 * 1024)}MB)"
+
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > max_body:
+        raise UploadError(too_large)
+    content_type, params = parse_options_header(request.headers.get("content-type"))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise UploadError("Expected a multipart/form-data upload")
+
+    reader = _FormReader(file_field, max_bytes, settings.audio_spool_memory_bytes)
+    parser = MultipartParser(
+        params[b"boundary"],
+        {
+            "on_part_begin": reader.on_part_begin,
+            "on_part_data": reader.on_part_data,
+            "on_part_end": reader.on_part_end,
+            "on_header_field": reader.on_header_field,
+            "on_header_value": reader.on_header_value,
+            "on_header_end": reader.on_header_end,
+            "on_headers_finished": reader.on_headers_finished,
+        },
+    )
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_body:
+                raise UploadError(too_large)
+            parser.write(chunk)
+        parser.finalize()
+    except Exception as exc:
+        if reader.audio is not None:
+            reader.audio.close()
+        if isinstance(exc, UploadError):
+            raise
+        raise UploadError(f"Malformed multipart upload: {exc}") from exc
+
+    audio = reader.audio
+    if audio is None or audio.size == 0:
+        if audio is not None:
+            audio.close()
+        raise UploadError("Empty audio file")
+    audio.seek(0)
+    return audio, reader.fields
@@ -1,8 +1,39 @@
-from db.supabase_client import supabase
+from db.supabase_client import async_supabase, supabase
 from middleware.auth import create_access_token, create_refresh_token
+from services import entitlements
 from services.toss_api_service import exchange_authorization_code, get_toss_user_info
 
 
+async def upsert_login_user(
+    toss_user_key: str, level: str | None = None, is_premium: bool | None = None
+) -> dict:
+    """Find or create the user for `toss_user_key` in one round trip.
+
+    Returns the users row plus "is_new" (db/migrations/007_login_user.sql).
+    """
+    result = await async_supabase.rpc(
+        "login_user",
+        {"p_toss_user_key": toss_user_key, "p_level": level, "p_is_premium": is_premium},
+    ).execute()
+    return result.data
+
+
+def login_response(user: dict) -> dict:
+    # JWT 발급은 user id가 필요한 CPU 작업이라 DB 왕복 뒤에 한다
+    return {
+        "access_token": create_access_token(user["id"], entitlements.claims(user)),
+        "refresh_token": create_refresh_token(user["id"]),
+        "user": {
+            "id": user["id"],
+            "level": user["level"],
+            "is_premium": entitlements.premium_active(entitlements.claims(user)),
+            "total_sessions": user["total_sessions"],
+            "streak_days": user["streak_days"],
+        },
+        "is_new_user": user["is_new"],
+    }
+
+
 async def login_with_toss(authorization_code: str, referrer: str) -> dict:
     # 1. 토스 API로 토큰 교환
     token_data = await exchange_authorization_code(authorization_code, referrer)
@@ -12,50 +43,39 @@ async def login_with_toss(authorization_code: str, referrer: str) -> dict:
     user_info = await get_toss_user_info(toss_access_token)
     toss_user_key = user_info["userKey"]
 
-    # 3. 내부 유저 조회 또는 생성
-    existing = (
-        supabase.table("users")
-        .select("*")
-        .eq("toss_user_key", toss_user_key)
-        .execute()
-    )
-
-    is_new_user = len(existing.data) == 0
-
-    if is_new_user:
-        result = (
-            supabase.table("users")
-            .insert({"toss_user_key": toss_user_key})
-            .execute()
-        )
-        user = result.data[0]
-    else:
-        user = existing.data[0]
+    # 3. 내부 유저 조회 또는 생성 (한 번의 RPC)
+    user = await upsert_login_user(str(toss_user_key))
 
     # 4. 내부 JWT 발급
-    access_token = create_access_token(user["id"])
-    refresh_token = create_refresh_token(user["id"])
+    return login_response(user)
 
-    return {
-        "access_token": access_token,
-        "refresh_token": refresh_token,
-        "user": {
-            "id": user["id"],
-            "level": user["level"],
-            "is_premium": user["is_premium"],
-            "total_sessions": user["total_sessions"],
-            "streak_days": user["streak_days"],
-        },
-        "is_new_user": is_new_user,
-    }
+
+async def refresh_access_token(user_id: str) -> str | None:
+    """Access token with the user's current entitlements (None if the user is gone)."""
+    result = await (
+        async_supabase.table("users")
+        .select("id, is_premium, premium_expires_at, entitlement_epoch")
+        .eq("id", user_id)
+        .execute()
+    )
+    if not result.data:
+        return None
+    return create_access_token(user_id, entitlements.claims(result.data[0]))
 
 
 def get_user_info(user_id: str) -> dict:
     result = (
         supabase.table("users")
-        .select("id, level, is_premium, total_sessions, streak_days, last_study_date")
+        .select(
+            "id, level, is_premium, premium_expires_at, total_sessions, streak_days, last_study_date"
+        )
         .eq("id", user_id)
         .single()
         .execute()
     )
-    return result.data
+    user = result.data
+    if user:
+        # 만료된 구독은 is_premium 값과 상관없이 프리미엄이 아니다
+        user["is_premium"] = entitlements.premium_active(entitlements.claims(user))
+        del user["premium_expires_at"]
+    return user
@@ -0,0 +1,167 @@
+"""
+Write-behind queue for work that does not need to finish before the response.
+
+Jobs are submitted with a key (the session id). All jobs with the same key go
+to the same shard and run one at a time in submission order, so a session's
+writes are applied in order. Each shard is a bounded asyncio.Queue: when it
+is full, `submit` waits (backpressure) instead of dropping work. Failed jobs
+are retried with exponential backoff and jitter; the shard holds later jobs
+until the retry succeeds or gives up, which keeps per-key ordering.
+
+`start()` / `stop()` are called from the app lifespan; `stop()` drains the
+queues before shutdown. When the queue is not running (scripts, benchmarks)
+jobs run inline.
+"""
+
+import asyncio
+import logging
+import random
+import zlib
+from typing import Awaitable, Callable
+
+from config import settings
+
+logger = logging.getLogger("toking-api")
+
+Job = Callable[[], Awaitable[None]]
+FailureHandler = Callable[[Exception], None]
+
+
+class WriteBehindQueue:
+    def __init__(
+        self,
+        shards: int,
+        maxsize: int,
+        max_retries: int,
+        retry_base_delay: float = 0.2,
+        retry_max_delay: float = 5.0,
+    ):
+        self.shards = shards
+        self.maxsize = maxsize
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self._queues: list[asyncio.Queue] = []
+        self._workers: list[asyncio.Task] = []
+        self._pending: dict[str, int] = {}
+        self._idle: dict[str, asyncio.Event] = {}
+        self.completed = 0
+        self.retried = 0
+        self.failed = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._queues = [asyncio.Queue(maxsize=self.maxsize) for _ in range(self.shards)]
+        self._workers = [
+            asyncio.create_task(self._worker(q), name=f"write-behind-{i}")
+            for i, q in enumerate(self._queues)
+        ]
+
+    async def stop(self, timeout: float) -> None:
+        """Drain queued jobs (up to `timeout` seconds), then stop the workers."""
+        if not self.running:
+            return
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(q.join() for q in self._queues)), timeout
+            )
+        except asyncio.TimeoutError:
+            left = sum(q.qsize() for q in self._queues)
+            logger.error(f"Write-behind flush timed out, {left} jobs dropped")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._queues = []
+
+    async def submit(
+        self,
+        key: str,
+        job: Job,
+        name: str = "job",
+        on_failure: FailureHandler | None = None,
+    ) -> None:
+        """Queue `job` behind earlier jobs for the same key.
+
+        `on_failure` is called once the job has exhausted its retries.
+        """
+        if not self.running:
+            await self._run(key, job, name, on_failure)
+            return
+        self._pending[key] = self._pending.get(key, 0) + 1
+        self._idle.setdefault(key, asyncio.Event()).clear()
+        shard = zlib.crc32(key.encode()) % self.shards
+        await self._queues[shard].put((key, job, name, on_failure))
+
+    def has_pending(self, key: str) -> bool:
+        return self._pending.get(key, 0) > 0
+
+    async def wait_idle(self, key: str) -> None:
+        """Wait until every job submitted for `key` has finished."""
+        event = self._idle.get(key)
+        if event is not None and self.has_pending(key):
+            await event.wait()
+
+    async def _worker(self, queue: asyncio.Queue) -> None:
+        while True:
+            key, job, name, on_failure = await queue.get()
+            try:
+                await self._run(key, job, name, on_failure)
+            finally:
+                queue.task_done()
+                self._done(key)
+
+    def _done(self, key: str) -> None:
+        remaining = self._pending.get(key, 1) - 1
+        if remaining > 0:
+            self._pending[key] = remaining
+            return
+        self._pending.pop(key, None)
+        event = self._idle.pop(key, None)
+        if event is not None:
+            event.set()
+
+    async def _run(
+        self, key: str, job: Job, name: str, on_failure: FailureHandler | None
+    ) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                await job()
+                self.completed += 1
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                if attempt == self.max_retries:
+                    self.failed += 1
+                    logger.error(
+                        f"Write-behind {name} failed for {key}: {exc}",
+                        exc_info=True,
+                    )
+                    if on_failure is not None:
+                        on_failure(exc)
+                    return
+                self.retried += 1
+                delay = min(self.retry_max_delay, self.retry_base_delay * 2**attempt)
+                await asyncio.sleep(delay * random.uniform(0.5, 1.5))
+
+    def stats(self) -> dict:
+        return {
+            "queued": sum(q.qsize() for q in self._queues),
+            "pending_keys": len(self._pending),
+            "completed": self.completed,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
+
+
+write_behind = WriteBehindQueue(
+    shards=settings.write_behind_shards,
+    maxsize=settings.write_behind_queue_size,
+    max_retries=settings.write_behind_max_retries,
+)
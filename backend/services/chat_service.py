@@ -1,47 +1,58 @@
+import asyncio
 import json
-from datetime import date, datetime, timezone
-from pathlib import Path
-
-from openai import OpenAI
+import uuid
+from datetime import datetime, timezone
+from typing import AsyncIterator
 
 from config import settings
-from db.supabase_client import supabase
+from db.supabase_client import async_supabase
+from services import llm_gateway, model_policy, opening_pool, session_cache, vocab_index
+from services.background_queue import write_behind
+from services.context_service import build_context, schedule_fold
+from services.prompt_registry import build_system_prompt
+from services.streaming import MessageFieldParser
 from services.vocab_service import get_words_by_ids
 
-client = OpenAI(api_key=settings.openai_api_key)
-
-PROMPTS_DIR = Path(__file__).parent.parent / "prompts"
 
+def _message_row(
+    session_id: str,
+    role: str,
+    content: str,
+    words_used: dict,
+    feedback: dict | None = None,
+) -> dict:
+    """chat_messages 행. ID를 미리 만들어 write-behind 재시도가 중복 저장되지 않게 한다."""
+    return {
+        "id": str(uuid.uuid4()),
+        "session_id": session_id,
+        "role": role,
+        "content": content,
+        "feedback": feedback,
+        "word_usage_snapshot": words_used,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
 
-def _load_prompt(filename: str) -> str:
-    return (PROMPTS_DIR / filename).read_text(encoding="utf-8")
 
+def _without_created_at(row: dict) -> dict:
+    # created_at은 DB 저장 시각(NOW())을 쓴다
+    return {k: v for k, v in row.items() if k != "created_at"}
 
-def _build_system_prompt(
-    mode: str, level: str, target_words: list[dict], words_used: dict
-) -> str:
-    template = _load_prompt(
-        "speaking_system.txt" if mode == "speaking" else "chat_system.txt"
-    )
-    word_names = [w["word"] for w in target_words]
-    used_list = [w for w, used in words_used.items() if used]
 
-    return template.format(
-        level=level,
-        word1=word_names[0] if len(word_names) > 0 else "",
-        word2=word_names[1] if len(word_names) > 1 else "",
-        word3=word_names[2] if len(word_names) > 2 else "",
-        used_words=", ".join(used_list) if used_list else "none",
+async def create_session(user_id: str, mode: str, word_ids: list[str]) -> dict:
+    # 단어 정보 / 유저 레벨 동시 조회
+    words, user = await asyncio.gather(
+        get_words_by_ids(word_ids),
+        async_supabase.table("users")
+        .select("level")
+        .eq("id", user_id)
+        .single()
+        .execute(),
     )
-
-
-def create_session(user_id: str, mode: str, word_ids: list[str]) -> dict:
-    words = get_words_by_ids(word_ids)
     words_used = {w["word"]: False for w in words}
+    level = user.data["level"]
 
-    # 세션 생성
-    session = (
-        supabase.table("study_sessions")
+    insert_session = (
+        async_supabase.table("study_sessions")
         .insert(
             {
                 "user_id": user_id,
@@ -52,44 +63,49 @@ def create_session(user_id: str, mode: str, word_ids: list[str]) -> dict:
         )
         .execute()
     )
+    # 세션 생성과 첫 메시지 준비를 동시에 진행. 미리 생성해 둔 (또는 생성 중인)
+    # 첫 메시지가 있으면 LLM 호출 없이 바로 시작
+    session, opening = await asyncio.gather(
+        insert_session,
+        opening_pool.pool.take(opening_pool.pool_key(mode, level, word_ids), words),
+    )
     session_id = session.data[0]["id"]
 
-    # 유저 레벨 조회
-    user = (
-        supabase.table("users")
-        .select("level")
-        .eq("id", user_id)
-        .single()
-        .execute()
+    # 첫 메시지는 캐시에 먼저 반영하고 DB 저장은 응답 후 처리
+    first_message = _message_row(session_id, "assistant", opening, words_used)
+    state = session_cache.SessionState(
+        session_id=session_id,
+        user_id=user_id,
+        mode=mode,
+        level=level,
+        target_word_ids=word_ids,
+        words=words,
+        words_used=dict(words_used),
+        summary=session_cache.SessionSummary().with_messages([first_message]),
     )
+    state.messages.append(first_message)
+    state.message_count = 1
+    session_cache.put(state)
+    summary_stats = state.summary.to_json()
+
+    async def _save_first_message():
+        await asyncio.gather(
+            async_supabase.table("chat_messages")
+            .upsert(_without_created_at(first_message), on_conflict="id")
+            .execute(),
+            async_supabase.table("study_sessions")
+            .update({"summary_stats": summary_stats})
+            .eq("id", session_id)
+            .execute(),
+        )
 
-    # AI 첫 메시지 생성
-    system_prompt = _build_system_prompt(mode, user.data["level"], words, words_used)
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {
-                "role": "user",
-                "content": "Start the conversation. Set up a natural scenario.",
-            },
-        ],
-        temperature=0.8,
-        response_format={"type": "json_object"},
+    await write_behind.submit(
+        session_id,
+        _save_first_message,
+        name="first_message",
+        on_failure=lambda exc: session_cache.invalidate(session_id),
     )
 
-    ai_response = json.loads(response.choices[0].message.content)
-
-    # 첫 메시지 저장
-    supabase.table("chat_messages").insert(
-        {
-            "session_id": session_id,
-            "role": "assistant",
-            "content": ai_response.get("message", ""),
-            "word_usage_snapshot": words_used,
-        }
-    ).execute()
-
     return {
         "session_id": session_id,
         "mode": mode,
@@ -99,105 +115,166 @@ def create_session(user_id: str, mode: str, word_ids: list[str]) -> dict:
         ],
         "initial_message": {
             "role": "assistant",
-            "content": ai_response.get("message", ""),
+            "content": opening,
             "word_usage": words_used,
         },
     }
 
 
-def send_message(user_id: str, session_id: str, content: str, mode: str = "chat") -> dict:
-    # 세션 조회
-    session = (
-        supabase.table("study_sessions")
+async def get_session_state(user_id: str, session_id: str) -> session_cache.SessionState:
+    """세션 상태 (단어, 레벨, 최근 메시지)를 캐시에서, 없으면 DB에서 읽는다."""
+    state = session_cache.get(session_id, user_id)
+    if state is not None:
+        return state
+
+    # 아직 저장되지 않은 쓰기가 있으면 끝난 뒤에 읽는다
+    await write_behind.wait_idle(session_id)
+
+    # 세션 / 유저 레벨 / 최근 메시지(+전체 개수) 동시 조회
+    session, user, recent = await asyncio.gather(
+        async_supabase.table("study_sessions")
         .select("*")
         .eq("id", session_id)
         .eq("user_id", user_id)
         .single()
-        .execute()
-    )
-    session_data = session.data
-    words_used = session_data["words_used"]
-
-    # 세션의 단어 정보 조회
-    words = get_words_by_ids(session_data["target_words"])
-
-    # 유저 레벨 조회
-    user = (
-        supabase.table("users")
+        .execute(),
+        async_supabase.table("users")
         .select("level")
         .eq("id", user_id)
         .single()
-        .execute()
+        .execute(),
+        async_supabase.table("chat_messages")
+        .select("role, content, feedback, word_usage_snapshot, created_at", count="exact")
+        .eq("session_id", session_id)
+        .order("created_at", desc=True)
+        .limit(settings.session_cache_max_messages)
+        .execute(),
     )
+    session_data = session.data
 
-    # 이전 메시지 조회
-    prev_messages = (
-        supabase.table("chat_messages")
-        .select("role, content")
-        .eq("session_id", session_id)
-        .order("created_at")
-        .execute()
+    # 세션의 단어 정보 조회
+    words = await get_words_by_ids(session_data["target_words"])
+
+    state = session_cache.SessionState(
+        session_id=session_id,
+        user_id=user_id,
+        mode=session_data["mode"],
+        level=user.data["level"],
+        target_word_ids=session_data["target_words"],
+        words=words,
+        words_used=session_data["words_used"],
+        is_completed=session_data.get("is_completed", False),
+        context_summary=session_data.get("context_summary"),
+        summarized_count=session_data.get("summarized_message_count") or 0,
+        message_count=recent.count if recent.count is not None else len(recent.data),
+        summary=session_cache.SessionSummary.from_json(session_data.get("summary_stats")),
     )
+    state.messages.extend(reversed(recent.data))
+    session_cache.put(state)
+    return state
 
-    # OpenAI 메시지 구성
-    system_prompt = _build_system_prompt(mode, user.data["level"], words, words_used)
-    messages = [{"role": "system", "content": system_prompt}]
-    for msg in prev_messages.data:
-        messages.append({"role": msg["role"], "content": msg["content"]})
-    messages.append({"role": "user", "content": content})
 
-    # AI 응답
-    model = "gpt-4o" if mode == "speaking" else "gpt-4o-mini"
-    response = client.chat.completions.create(
-        model=model,
-        messages=messages,
-        temperature=0.8,
-        response_format={"type": "json_object"},
+async def _prepare_turn(
+    user_id: str, session_id: str, content: str, mode: str
+) -> tuple[session_cache.SessionState, str, list[dict], list[str]]:
+    """세션 상태를 읽고 이번 턴의 (state, model, messages, candidates)를 만든다."""
+    state, index = await asyncio.gather(
+        get_session_state(user_id, session_id), vocab_index.get_index()
     )
 
-    ai_response = json.loads(response.choices[0].message.content)
+    # 메시지에 (변화형 포함) 등장한 미사용 타겟 단어만 LLM이 판정한다.
+    # 스피킹은 STT가 잘못 적은 철자(near miss)도 후보. 후보가 없으면
+    # 프롬프트에서 단어 사용 판정 부분을 뺀다
+    unused = [w for w, used in state.words_used.items() if not used]
+    candidates = index.lemmas.detect(content, unused, near_miss=mode == "speaking")
 
-    # 단어 사용 상태 업데이트 (누적)
-    new_word_usage = ai_response.get("word_usage", {})
-    for word, used in new_word_usage.items():
-        if used:
+    # OpenAI 메시지 구성: system + 요약 + 최근 메시지 (토큰 예산 내)
+    system_prompt = build_system_prompt(
+        mode, state.level, state.words, state.words_used, candidates
+    )
+    window = build_context(
+        system_prompt,
+        state.context_summary,
+        state.recent(settings.chat_context_recent_messages),
+        state.message_count - state.summarized_count,
+        content,
+    )
+    # 창 밖으로 밀려난 메시지는 응답 후 요약에 합친다
+    schedule_fold(
+        session_id, state.context_summary, state.summarized_count, window.overflow_count
+    )
+
+    # 스피킹은 턴마다 필요한 만큼의 모델로 (타겟 단어 시도/긴 문장/세션 초반은 gpt-4o)
+    decision = model_policy.choose_model(
+        model_policy.turn_signals(mode, content, state.message_count // 2, candidates)
+    )
+    model_policy.record(decision)
+    return state, decision.model, window.messages, candidates
+
+
+async def _complete_turn(
+    user_id: str,
+    session_id: str,
+    state: session_cache.SessionState,
+    content: str,
+    mode: str,
+    ai_response: dict,
+    candidates: list[str],
+) -> dict:
+    """LLM 응답을 반영해 메시지/세션 상태를 저장하고 API 응답을 만든다."""
+    words_used = dict(state.words_used)
+
+    # 단어 사용 상태 업데이트 (누적). 후보로 물어본 단어만 받는다
+    new_word_usage = ai_response.get("word_usage") or {}
+    for word in candidates:
+        if new_word_usage.get(word):
             words_used[word] = True
 
     completed_count = sum(1 for v in words_used.values() if v)
     is_completed = completed_count == len(words_used)
 
-    # 유저 메시지 저장
-    supabase.table("chat_messages").insert(
-        {
-            "session_id": session_id,
-            "role": "user",
-            "content": content,
-            "word_usage_snapshot": words_used,
-        }
-    ).execute()
-
-    # AI 메시지 저장
     feedback = ai_response.get("feedback") if mode == "speaking" else None
-    supabase.table("chat_messages").insert(
-        {
-            "session_id": session_id,
-            "role": "assistant",
-            "content": ai_response.get("message", ""),
-            "feedback": feedback,
-            "word_usage_snapshot": words_used,
-        }
-    ).execute()
+    user_message = _message_row(session_id, "user", content, words_used)
+    assistant_message = _message_row(
+        session_id, "assistant", ai_response.get("message", ""), words_used, feedback
+    )
 
-    # 세션 상태 업데이트
-    update_data = {"words_used": words_used}
-    if is_completed:
-        update_data["is_completed"] = True
-        update_data["completed_at"] = datetime.now(timezone.utc).isoformat()
-        _update_user_stats(user_id)
+    # 완료 요약용 누적값 (시각/메시지 수/단어별 첫 사용 문장)
+    summary = None
+    if state.summary is not None:
+        newly_used = [w for w, used in words_used.items() if used and not state.words_used.get(w)]
+        summary = state.summary.with_messages([user_message, assistant_message], newly_used)
 
-    supabase.table("study_sessions").update(update_data).eq(
-        "id", session_id
-    ).execute()
+    # 캐시에 먼저 반영 (다음 턴은 캐시에서 읽음)
+    session_cache.record_turn(
+        session_id, [user_message, assistant_message], words_used, is_completed, summary
+    )
+
+    async def _save_turn():
+        # 유저/AI 메시지, 세션 상태, 유저 통계를 한 번의 RPC로 저장 (재시도 안전)
+        await async_supabase.rpc(
+            "save_chat_turn",
+            {
+                "p_session_id": session_id,
+                "p_user_id": user_id,
+                "p_user_message_id": user_message["id"],
+                "p_user_content": content,
+                "p_assistant_message_id": assistant_message["id"],
+                "p_assistant_content": assistant_message["content"],
+                "p_feedback": feedback,
+                "p_words_used": words_used,
+                "p_is_completed": is_completed,
+                "p_summary_stats": summary.to_json() if summary is not None else None,
+            },
+        ).execute()
+
+    # 응답 후 순서대로 저장; 최종 실패 시 캐시를 버려 DB 기준으로 다시 읽게 한다
+    await write_behind.submit(
+        session_id,
+        _save_turn,
+        name="save_chat_turn",
+        on_failure=lambda exc: session_cache.invalidate(session_id),
+    )
 
     result = {
         "message": {
@@ -216,37 +293,107 @@ def send_message(user_id: str, session_id: str, content: str, mode: str = "chat"
     }
 
     if is_completed:
-        result["summary"] = _generate_summary(session_id, session_data)
+        if summary is not None:
+            result["summary"] = _summary_result(session_id, state.words, summary)
+        else:
+            result["summary"] = await _generate_summary(session_id, state)
 
     return result
 
 
-def get_session_detail(user_id: str, session_id: str) -> dict:
-    session = (
-        supabase.table("study_sessions")
-        .select("*")
-        .eq("id", session_id)
-        .eq("user_id", user_id)
-        .single()
-        .execute()
+async def send_message(user_id: str, session_id: str, content: str, mode: str = "chat") -> dict:
+    state, model, messages, candidates = await _prepare_turn(
+        user_id, session_id, content, mode
     )
 
-    messages = (
-        supabase.table("chat_messages")
-        .select("role, content, feedback, word_usage_snapshot, created_at")
-        .eq("session_id", session_id)
-        .order("created_at")
-        .execute()
+    # AI 응답
+    response = await llm_gateway.complete(
+        llm_gateway.CHAT_TURN,
+        model=model,
+        messages=messages,
+        temperature=0.8,
+        response_format={"type": "json_object"},
+    )
+
+    ai_response = json.loads(response.choices[0].message.content)
+    return await _complete_turn(
+        user_id, session_id, state, content, mode, ai_response, candidates
     )
 
-    words = get_words_by_ids(session.data["target_words"])
+
+async def stream_message(
+    user_id: str, session_id: str, content: str, mode: str = "chat"
+) -> AsyncIterator[tuple[str, dict]]:
+    """send_message의 스트리밍 버전.
+
+    세션 조회/검증은 여기서 바로 끝내므로 잘못된 세션은 응답을 시작하기 전에
+    HTTP 오류가 된다. 돌려주는 이터레이터는 LLM이 JSON을 생성하는 동안
+    "message" 필드를 증분 파싱해 ("delta", {"content": ...}) 이벤트로 흘려보내고,
+    스트림이 끝나면 send_message와 같은 응답 본문을 ("done", result)로 보낸다.
+    """
+    state, model, messages, candidates = await _prepare_turn(
+        user_id, session_id, content, mode
+    )
+    return _stream_turn(
+        user_id, session_id, content, mode, state, model, messages, candidates
+    )
+
+
+async def _stream_turn(
+    user_id: str,
+    session_id: str,
+    content: str,
+    mode: str,
+    state: session_cache.SessionState,
+    model: str,
+    messages: list[dict],
+    candidates: list[str],
+) -> AsyncIterator[tuple[str, dict]]:
+    stream = llm_gateway.stream(
+        llm_gateway.CHAT_STREAM,
+        model=model,
+        messages=messages,
+        temperature=0.8,
+        response_format={"type": "json_object"},
+    )
+
+    parser = MessageFieldParser()
+    raw_chunks = []
+    async for piece in stream:
+        raw_chunks.append(piece)
+        text = parser.feed(piece)
+        if text:
+            yield "delta", {"content": text}
+
+    ai_response = json.loads("".join(raw_chunks))
+    result = await _complete_turn(
+        user_id, session_id, state, content, mode, ai_response, candidates
+    )
+    yield "done", result
+
+
+async def get_session_detail(user_id: str, session_id: str) -> dict:
+    state = await get_session_state(user_id, session_id)
+
+    if state.has_full_history:
+        messages = list(state.messages)
+    else:
+        await write_behind.wait_idle(session_id)
+        result = await (
+            async_supabase.table("chat_messages")
+            .select("role, content, feedback, word_usage_snapshot, created_at")
+            .eq("session_id", session_id)
+            .order("created_at")
+            .execute()
+        )
+        messages = result.data
 
     return {
         "session_id": session_id,
-        "mode": session.data["mode"],
+        "mode": state.mode,
         "target_words": [
             {"id": w["id"], "word": w["word"], "definition_ko": w["definition_ko"]}
-            for w in words
+            for w in state.words
         ],
         "messages": [
             {
@@ -255,86 +402,78 @@ def get_session_detail(user_id: str, session_id: str) -> dict:
                 "feedback": m.get("feedback"),
                 "word_usage": m.get("word_usage_snapshot", {}),
             }
-            for m in messages.data
+            for m in messages
         ],
         "session_status": {
-            "words_used": session.data["words_used"],
-            "completed_count": sum(
-                1 for v in session.data["words_used"].values() if v
-            ),
-            "is_completed": session.data.get("is_completed", False),
+            "words_used": state.words_used,
+            "completed_count": sum(1 for v in state.words_used.values() if v),
+            "is_completed": state.is_completed,
         },
     }
 
 
-def _update_user_stats(user_id: str):
-    user = (
-        supabase.table("users")
-        .select("total_sessions, streak_days, last_study_date")
-        .eq("id", user_id)
-        .single()
-        .execute()
-    )
-    user_data = user.data
-    today = date.today()
-    last_study = user_data.get("last_study_date")
-
-    new_streak = user_data["streak_days"]
-    if last_study:
-        last_date = date.fromisoformat(last_study)
-        if (today - last_date).days == 1:
-            new_streak += 1
-        elif (today - last_date).days > 1:
-            new_streak = 1
-    else:
-        new_streak = 1
-
-    supabase.table("users").update(
-        {
-            "total_sessions": user_data["total_sessions"] + 1,
-            "streak_days": new_streak,
-            "last_study_date": today.isoformat(),
-        }
-    ).eq("id", user_id).execute()
+def _duration_seconds(first: str | None, last: str | None) -> int:
+    if not first or not last:
+        return 0
+    t1 = datetime.fromisoformat(first.replace("Z", "+00:00"))
+    t2 = datetime.fromisoformat(last.replace("Z", "+00:00"))
+    return int((t2 - t1).total_seconds())
 
 
-def _generate_summary(session_id: str, session_data: dict) -> dict:
-    messages = (
-        supabase.table("chat_messages")
-        .select("role, content, created_at")
-        .eq("session_id", session_id)
-        .order("created_at")
-        .execute()
-    )
-
-    user_messages = [m for m in messages.data if m["role"] == "user"]
-    words = get_words_by_ids(session_data["target_words"])
-    word_names = [w["word"] for w in words]
-
-    word_usage_details = []
-    for word_name in word_names:
-        for msg in user_messages:
-            if word_name.lower() in msg["content"].lower():
-                word_usage_details.append(
-                    {
-                        "word": word_name,
-                        "used_in": msg["content"][:100],
-                        "feedback": "자연스럽게 사용했어요!",
-                    }
-                )
-                break
-
-    first_msg_time = messages.data[0]["created_at"] if messages.data else None
-    last_msg_time = messages.data[-1]["created_at"] if messages.data else None
-    duration = 0
-    if first_msg_time and last_msg_time:
-        t1 = datetime.fromisoformat(first_msg_time.replace("Z", "+00:00"))
-        t2 = datetime.fromisoformat(last_msg_time.replace("Z", "+00:00"))
-        duration = int((t2 - t1).total_seconds())
-
+def _summary_result(
+    session_id: str, words: list[dict], summary: session_cache.SessionSummary
+) -> dict:
+    """누적값으로 완료 요약을 만든다 (추가 조회 없음)."""
     return {
         "session_id": session_id,
-        "duration_seconds": duration,
-        "message_count": len(messages.data),
-        "word_usage_details": word_usage_details,
+        "duration_seconds": _duration_seconds(
+            summary.first_message_at, summary.last_message_at
+        ),
+        "message_count": summary.message_count,
+        "word_usage_details": [
+            {
+                "word": w["word"],
+                "used_in": summary.first_use[w["word"]],
+                "feedback": "자연스럽게 사용했어요!",
+            }
+            for w in words
+            if w["word"] in summary.first_use
+        ],
     }
+
+
+async def _generate_summary(session_id: str, state: session_cache.SessionState) -> dict:
+    """누적값이 없는 (summary_stats 이전) 세션: 메시지를 다시 읽어 요약한다."""
+    # 캐시에 전체 대화가 있으면 재조회하지 않는다
+    if state.has_full_history:
+        messages = list(state.messages)
+    else:
+        await write_behind.wait_idle(session_id)
+        result = await (
+            async_supabase.table("chat_messages")
+            .select("role, content, created_at")
+            .eq("session_id", session_id)
+            .order("created_at")
+            .execute()
+        )
+        messages = result.data
+
+    word_names = [w["word"] for w in state.words]
+    index = await vocab_index.get_index()
+
+    # 단어별로 처음 사용한 유저 메시지 (메시지마다 토큰화 한 번)
+    first_use: dict[str, str] = {}
+    for msg in messages:
+        if msg["role"] != "user" or len(first_use) == len(word_names):
+            continue
+        remaining = [w for w in word_names if w not in first_use]
+        for word_name in index.lemmas.detect(msg["content"], remaining):
+            first_use[word_name] = msg["content"]
+
+    summary = session_cache.SessionSummary(
+        first_message_at=messages[0]["created_at"] if messages else None,
+        last_message_at=messages[-1]["created_at"] if messages else None,
+        message_count=len(messages),
+        first_use={w: c[: session_cache.USED_IN_CHARS] for w, c in first_use.items()},
+    )
+    return _summary_result(session_id, state.words, summary)
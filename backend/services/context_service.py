@@ -0,0 +1,184 @@
+"""
+Token-budgeted conversation context.
+
+Instead of resending the whole session on every turn, the prompt is built
+from: system prompt + rolling summary of older turns + the most recent
+messages, trimmed to fit `chat_context_token_budget`. Messages that fall out
+of the window are folded into the session's `context_summary` after the
+reply is sent, so prompt size stays flat as the session grows.
+
+Token counts are estimated (~4 chars/token) to avoid a tokenizer dependency;
+the budget is a soft cap, not an exact limit.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+
+from config import settings
+from db.supabase_client import async_supabase
+from services import llm_gateway, session_cache
+from services.background_queue import write_behind
+
+logger = logging.getLogger("toking-api")
+
+# Per-message framing overhead in the chat format (role, separators).
+MESSAGE_OVERHEAD_TOKENS = 4
+
+SUMMARY_SYSTEM_PROMPT = """You maintain a running summary of an English practice conversation between a Korean learner (user) and a conversation partner (assistant).
+
+Update the summary with the new messages below. Keep:
+- the scenario/topic and any role-play setup
+- facts the learner shared about themselves
+- which target words the learner has used and how
+- open questions the conversation was heading toward
+
+Write at most 120 words in English. Output ONLY the updated summary."""
+
+# Sessions with a summary update in flight (prevents duplicate folds).
+_folding: set[str] = set()
+_background_tasks: set[asyncio.Task] = set()
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // 4 + 1
+
+
+def _message_tokens(message: dict) -> int:
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+@dataclass
+class ContextWindow:
+    """Prompt messages for one turn."""
+
+    messages: list[dict]
+    prompt_tokens: int
+    # Unsummarized messages older than the window (to be folded next).
+    overflow_count: int = 0
+
+
+def build_context(
+    system_prompt: str,
+    summary: str | None,
+    history: list[dict],
+    unsummarized_count: int,
+    content: str,
+    token_budget: int | None = None,
+    recent_messages: int | None = None,
+) -> ContextWindow:
+    """Fit system prompt + summary + recent history + new message into the budget.
+
+    `history` is the tail of the session (oldest first) and
+    `unsummarized_count` how many messages at the end of the session are not
+    yet covered by `summary`. At most `recent_messages` of those are kept,
+    fewer if the token budget is exceeded; the last exchange is always kept.
+    """
+    token_budget = token_budget or settings.chat_context_token_budget
+    recent_messages = recent_messages or settings.chat_context_recent_messages
+
+    head = [{"role": "system", "content": system_prompt}]
+    if summary:
+        head.append(
+            {"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"}
+        )
+    user_message = {"role": "user", "content": content}
+
+    used = sum(_message_tokens(m) for m in head) + _message_tokens(user_message)
+    limit = min(recent_messages, unsummarized_count, len(history))
+    kept: list[dict] = []
+    for msg in reversed(history[len(history) - limit:] if limit else []):
+        cost = _message_tokens(msg)
+        if len(kept) >= 2 and used + cost > token_budget:
+            break
+        kept.append({"role": msg["role"], "content": msg["content"]})
+        used += cost
+    kept.reverse()
+
+    return ContextWindow(
+        messages=head + kept + [user_message],
+        prompt_tokens=used,
+        overflow_count=unsummarized_count - len(kept),
+    )
+
+
+async def fold_into_summary(
+    session_id: str,
+    summary: str | None,
+    summarized_count: int,
+    overflow_count: int,
+) -> str | None:
+    """Merge the next `overflow_count` unsummarized messages into the summary.
+
+    The update is guarded on `summarized_message_count` so a concurrent
+    fold of the same messages cannot apply twice.
+    """
+    if overflow_count <= 0:
+        return summary
+
+    # 아직 저장 중인 턴이 있으면 끝난 뒤에 읽는다
+    await write_behind.wait_idle(session_id)
+    result = await (
+        async_supabase.table("chat_messages")
+        .select("role, content")
+        .eq("session_id", session_id)
+        .order("created_at")
+        .offset(summarized_count)
+        .limit(overflow_count)
+        .execute()
+    )
+    overflow = result.data
+    if not overflow:
+        return summary
+
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in overflow)
+    response = await llm_gateway.complete(
+        llm_gateway.CONTEXT_SUMMARY,
+        model=settings.chat_summary_model,
+        messages=[
+            {"role": "system", "content": SUMMARY_SYSTEM_PROMPT},
+            {
+                "role": "user",
+                "content": f"CURRENT SUMMARY:\n{summary or '(none)'}\n\nNEW MESSAGES:\n{transcript}",
+            },
+        ],
+        temperature=0.2,
+        max_tokens=250,
+    )
+    new_summary = response.choices[0].message.content.strip()
+
+    new_count = summarized_count + len(overflow)
+    updated = await async_supabase.table("study_sessions").update(
+        {
+            "context_summary": new_summary,
+            "summarized_message_count": new_count,
+        }
+    ).eq("id", session_id).eq("summarized_message_count", summarized_count).execute()
+    if updated.data:
+        session_cache.record_summary(session_id, new_summary, new_count)
+    return new_summary
+
+
+def schedule_fold(
+    session_id: str,
+    summary: str | None,
+    summarized_count: int,
+    overflow_count: int,
+) -> None:
+    """Fold overflowed messages into the summary in the background."""
+    if overflow_count <= 0 or session_id in _folding:
+        return
+    _folding.add(session_id)
+
+    async def _run():
+        try:
+            await fold_into_summary(session_id, summary, summarized_count, overflow_count)
+        except Exception as exc:
+            # The messages stay unsummarized and are retried on the next turn.
+            logger.warning(f"Context summary update failed for {session_id}: {exc}")
+        finally:
+            _folding.discard(session_id)
+
+    task = asyncio.create_task(_run())
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
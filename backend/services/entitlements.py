@@ -0,0 +1,173 @@
+"""
+Premium entitlements carried in the access token.
+
+Access tokens are minted with signed claims (`claims()`): whether the user
+is premium, when the subscription ends, and the user's entitlement epoch.
+`middleware.premium.require_premium` checks them without a DB read.
+
+Claims are fixed for the token's lifetime (jwt_access_token_expire_minutes),
+so downgrades that cannot wait for expiry (refunds, admin action) go through
+`set_premium(..., revoke=True)`. That bumps users.entitlement_epoch
+(db/migrations/008_entitlement_epoch.sql); a token minted with a lower epoch
+is rejected and the client has to fetch a new one.
+
+Every process keeps the epochs bumped within the last access-token lifetime
+(older revocations cannot have live tokens left). A revocation made by this
+process applies immediately; others see it within
+`entitlement_refresh_seconds`, when the background task re-reads the recent
+revocations.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+from config import settings
+from db.supabase_client import async_supabase
+
+logger = logging.getLogger("toking-api")
+
+PAGE_SIZE = 1000
+# DB/서버 시계 차이 여유 (초)
+CLOCK_SKEW_SECONDS = 60
+
+# user_id -> (epoch, 변경 시각 unix)
+_epochs: dict[str, tuple[int, float]] = {}
+_refresh_task: asyncio.Task | None = None
+_refreshed_at: float | None = None
+
+
+def _timestamp(value: str) -> float:
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def claims(user: dict) -> dict:
+    """Entitlement claims for an access token, from a users row."""
+    expires_at = user.get("premium_expires_at")
+    return {
+        "premium": bool(user.get("is_premium")),
+        "premium_expires_at": int(_timestamp(expires_at)) if expires_at else None,
+        "entitlement_epoch": user.get("entitlement_epoch") or 0,
+    }
+
+
+def premium_active(token_claims: dict) -> bool:
+    """Premium flag set and not past its expiry (claims or `claims(row)`)."""
+    expires_at = token_claims.get("premium_expires_at")
+    return bool(token_claims.get("premium")) and (expires_at is None or expires_at > time.time())
+
+
+def current_epoch(user_id: str) -> int:
+    entry = _epochs.get(user_id)
+    return entry[0] if entry else 0
+
+
+def is_stale(token_claims: dict) -> bool:
+    """Minted before a revocation (or before tokens carried entitlements)."""
+    return token_claims.get("entitlement_epoch", -1) < current_epoch(token_claims["sub"])
+
+
+def _note(user_id: str, epoch: int, changed_at: float) -> None:
+    known = _epochs.get(user_id)
+    if known is None or epoch > known[0]:
+        _epochs[user_id] = (epoch, changed_at)
+
+
+def _window_seconds() -> float:
+    return settings.jwt_access_token_expire_minutes * 60 + CLOCK_SKEW_SECONDS
+
+
+async def set_premium(
+    user_id: str,
+    is_premium: bool,
+    expires_at: datetime | None = None,
+    revoke: bool = False,
+) -> dict:
+    """Update the user's premium state; return the users row for new tokens.
+
+    `revoke=True` also invalidates the premium claims of every token issued
+    so far.
+    """
+    result = await async_supabase.rpc(
+        "set_premium_entitlement",
+        {
+            "p_user_id": user_id,
+            "p_is_premium": is_premium,
+            "p_premium_expires_at": expires_at.isoformat() if expires_at else None,
+            "p_revoke": revoke,
+        },
+    ).execute()
+    user = result.data
+    if revoke:
+        _note(user_id, user["entitlement_epoch"], time.time())
+    return user
+
+
+async def refresh() -> None:
+    """Reload the epochs bumped within the last access-token lifetime."""
+    global _refreshed_at
+    now = time.time()
+    since = datetime.now(timezone.utc) - timedelta(seconds=_window_seconds())
+    rows: list[dict] = []
+    offset = 0
+    while True:
+        # 같은 시각에 바뀐 행이 페이지 경계에서 빠지지 않게 id로 순서를 고정
+        page = await (
+            async_supabase.table("users")
+            .select("id, entitlement_epoch, entitlement_changed_at")
+            .gte("entitlement_changed_at", since.isoformat())
+            .order("entitlement_changed_at")
+            .order("id")
+            .range(offset, offset + PAGE_SIZE - 1)
+            .execute()
+        )
+        rows.extend(page.data)
+        if len(page.data) < PAGE_SIZE:
+            break
+        offset += PAGE_SIZE
+
+    for row in rows:
+        _note(row["id"], row["entitlement_epoch"], _timestamp(row["entitlement_changed_at"]))
+    # 창 밖의 항목: 그 전에 발급된 토큰은 이미 만료됐다
+    cutoff = now - _window_seconds()
+    for user_id in [u for u, (_, changed_at) in _epochs.items() if changed_at < cutoff]:
+        del _epochs[user_id]
+    _refreshed_at = now
+
+
+async def _refresh_loop() -> None:
+    while True:
+        await asyncio.sleep(settings.entitlement_refresh_seconds)
+        try:
+            await refresh()
+        except Exception as exc:
+            logger.warning(f"Entitlement epoch refresh failed: {exc}")
+
+
+async def start() -> None:
+    """Load recent revocations and start the background refresher (app startup)."""
+    global _refresh_task
+    try:
+        await refresh()
+    except Exception as exc:
+        logger.error(f"Entitlement epoch load failed: {exc}")
+    if _refresh_task is None:
+        _refresh_task = asyncio.create_task(_refresh_loop(), name="entitlement-refresh")
+
+
+async def stop() -> None:
+    global _refresh_task
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        await asyncio.gather(_refresh_task, return_exceptions=True)
+        _refresh_task = None
+
+
+def stats() -> dict:
+    return {
+        "revoked_users": len(_epochs),
+        "refreshed_seconds_ago": (
+            round(time.time() - _refreshed_at, 1) if _refreshed_at is not None else None
+        ),
+    }
@@ -1,6 +1,8 @@
 from datetime import datetime, timedelta, timezone
 
-from db.supabase_client import supabase
+from db.supabase_client import async_supabase, supabase
+from middleware.auth import create_access_token, create_refresh_token
+from services import entitlements
 from services.toss_api_service import get_order_status
 
 
@@ -11,9 +13,14 @@ PRODUCT_DURATIONS = {
 
 
 async def verify_and_activate(user_id: str, order_id: str, product_id: str) -> dict:
+    """Verify the order and activate premium.
+
+    On success the response carries new tokens whose entitlement claims
+    include the subscription (the current access token says not premium).
+    """
     # 유저의 토스 키 조회
-    user = (
-        supabase.table("users")
+    user = await (
+        async_supabase.table("users")
         .select("toss_user_key")
         .eq("id", user_id)
         .single()
@@ -32,7 +39,7 @@ async def verify_and_activate(user_id: str, order_id: str, product_id: str) -> d
     expires_at = now + duration
 
     # 구독 기록 저장
-    supabase.table("subscriptions").insert(
+    await async_supabase.table("subscriptions").insert(
         {
             "user_id": user_id,
             "order_id": order_id,
@@ -42,13 +49,8 @@ async def verify_and_activate(user_id: str, order_id: str, product_id: str) -> d
         }
     ).execute()
 
-    # 유저 프리미엄 상태 업데이트
-    supabase.table("users").update(
-        {
-            "is_premium": True,
-            "premium_expires_at": expires_at.isoformat(),
-        }
-    ).eq("id", user_id).execute()
+    # 유저 프리미엄 상태 업데이트 (갱신된 행으로 새 토큰 발급)
+    updated = await entitlements.set_premium(user_id, True, expires_at)
 
     return {
         "verified": True,
@@ -57,6 +59,8 @@ async def verify_and_activate(user_id: str, order_id: str, product_id: str) -> d
             "product_id": product_id,
             "expires_at": expires_at.isoformat(),
         },
+        "access_token": create_access_token(user_id, entitlements.claims(updated)),
+        "refresh_token": create_refresh_token(user_id),
     }
 
 
@@ -69,7 +73,7 @@ def get_subscription_status(user_id: str) -> dict:
         .execute()
     )
 
-    if not user.data["is_premium"]:
+    if not entitlements.premium_active(entitlements.claims(user.data)):
         return {"is_premium": False, "subscription": None}
 
     active_sub = (
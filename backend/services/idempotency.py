@@ -0,0 +1,117 @@
+"""
+Idempotency keys for the LLM-backed POST endpoints.
+
+A client that retries a request after a timeout sends the same
+`Idempotency-Key` header. The first request with a given (user, key) runs;
+its response is stored for `idempotency_ttl_seconds` and returned to every
+retry instead of making another LLM call and saving the messages again.
+A retry that arrives while the first request is still running waits for
+that request's result.
+
+The work runs in its own task and the waiters are shielded from it, so a
+client disconnect does not cancel a turn whose result a retry is about to
+ask for. Failed requests are not stored: the key is free again once the
+error has been returned, and the client may retry.
+
+A key reused with a different request (another endpoint, session or body)
+is rejected with IdempotencyConflict rather than answered with the wrong
+response.
+
+Per process, like the session cache (one uvicorn worker).
+"""
+
+import asyncio
+import hashlib
+import json
+from typing import Awaitable, Callable
+
+from config import settings
+from services.ttl_cache import TTLCache
+
+MAX_KEY_LENGTH = 255
+
+Entry = tuple[str, str]  # (user_id, key)
+
+
+class IdempotencyConflict(ValueError):
+    """The key was already used for a different request (HTTP 422)."""
+
+
+def fingerprint(*parts) -> str:
+    """Digest of what identifies a request (endpoint, session, body)."""
+    return hashlib.sha256(
+        json.dumps(parts, sort_keys=True, ensure_ascii=False).encode()
+    ).hexdigest()
+
+
+def valid_key(key: str) -> bool:
+    return 0 < len(key) <= MAX_KEY_LENGTH and key.isascii() and key.isprintable()
+
+
+class IdempotencyStore:
+    def __init__(self, maxsize: int, ttl: float):
+        self._done: TTLCache[Entry, tuple[str, dict]] = TTLCache(maxsize, ttl)
+        self._inflight: dict[Entry, tuple[str, asyncio.Task]] = {}
+        self.replayed = 0
+        self.joined = 0
+        self.conflicts = 0
+
+    async def run(
+        self,
+        user_id: str,
+        key: str,
+        request_fingerprint: str,
+        call: Callable[[], Awaitable[dict]],
+    ) -> tuple[dict, bool]:
+        """(response, replayed): `call()`'s result, run at most once per key."""
+        entry = (user_id, key)
+        done = self._done.get(entry)
+        if done is not None:
+            self._check(done[0], request_fingerprint)
+            self.replayed += 1
+            return done[1], True
+
+        inflight = self._inflight.get(entry)
+        if inflight is not None:
+            self._check(inflight[0], request_fingerprint)
+            self.joined += 1
+            return await asyncio.shield(inflight[1]), True
+
+        task = asyncio.create_task(self._execute(entry, request_fingerprint, call))
+        self._inflight[entry] = (request_fingerprint, task)
+        task.add_done_callback(lambda t: self._finished(entry, t))
+        return await asyncio.shield(task), False
+
+    def _finished(self, entry: Entry, task: asyncio.Task) -> None:
+        self._inflight.pop(entry, None)
+        if not task.cancelled():
+            # 요청이 모두 끊긴 뒤 실패해도 "never retrieved" 경고를 남기지 않는다
+            task.exception()
+
+    async def _execute(
+        self, entry: Entry, request_fingerprint: str, call: Callable[[], Awaitable[dict]]
+    ) -> dict:
+        result = await call()
+        self._done.set(entry, (request_fingerprint, result))
+        return result
+
+    def _check(self, stored: str, request_fingerprint: str) -> None:
+        if stored != request_fingerprint:
+            self.conflicts += 1
+            raise IdempotencyConflict(
+                "Idempotency-Key was already used for a different request"
+            )
+
+    def stats(self) -> dict:
+        return {
+            **self._done.stats(),
+            "inflight": len(self._inflight),
+            "replayed": self.replayed,
+            "joined": self.joined,
+            "conflicts": self.conflicts,
+        }
+
+
+store = IdempotencyStore(
+    maxsize=settings.idempotency_cache_size, ttl=settings.idempotency_ttl_seconds
+)
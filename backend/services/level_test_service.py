@@ -1,4 +1,5 @@
 from db.supabase_client import supabase
+from services import recommendation_service, session_cache
 
 
 def get_test_questions() -> list[dict]:
@@ -55,6 +56,9 @@ def grade_and_assign_level(user_id: str, answers: list[dict]) -> dict:
     supabase.table("users").update({"level": assigned_level}).eq(
         "id", user_id
     ).execute()
+    session_cache.invalidate_user(user_id)
+    # 새 레벨 기준으로 오늘의 단어를 다시 뽑도록
+    recommendation_service.reset_for_user(user_id)
 
     level_messages = {
         "beginner": "기초 레벨로 배정되었습니다! 일상 영어부터 시작해요 💪",
@@ -0,0 +1,367 @@
+"""
+Single entry point for LLM completions.
+
+Every completion in the backend goes through `complete()` or `stream()` with
+a route name. The route sets the call's deadline: the total time for all
+attempts, after which `LLMDeadlineExceeded` is raised and the worker is
+freed.
+
+- Retries: timeouts, connection errors, 429 and 5xx are retried with
+  exponential backoff and jitter while the deadline allows.
+- Hedging: on routes that enable it, a duplicate request is sent once the
+  first has run longer than the route/model p95 latency, and the first
+  answer wins. Hedging starts after HEDGE_MIN_SAMPLES calls.
+- Circuit breaking: models with a fallback (gpt-4o -> gpt-4o-mini) get a
+  breaker over their recent calls. When the error rate or p95 latency
+  breaks its SLO, calls go to the fallback model for a cooldown; then one
+  probe call decides whether to close the breaker.
+
+Streams get deadlines, retries and failover until the first token arrives,
+but are not hedged. They use their own routes: time-to-first-token is
+tracked apart from full-completion latencies, so it never lowers a hedge
+delay, and the breaker only counts a stream's outcome, not its latency.
+"""
+
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import AsyncIterator
+
+import openai
+from openai import AsyncOpenAI
+
+from config import settings
+
+logger = logging.getLogger("toking-api")
+
+# Retries are handled here, not inside the SDK.
+client = AsyncOpenAI(api_key=settings.openai_api_key, max_retries=0)
+
+CHAT_TURN = "chat_turn"
+CHAT_STREAM = "chat_stream"
+SESSION_OPENING = "session_opening"
+CONTEXT_SUMMARY = "context_summary"
+TRANSCRIPT_CLEANUP = "transcript_cleanup"
+
+RETRYABLE_ERRORS = (
+    openai.APIConnectionError,  # includes APITimeoutError
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+RETRY_BASE_DELAY = 0.25
+RETRY_MAX_DELAY = 2.0
+HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+
+
+class LLMDeadlineExceeded(Exception):
+    """The route's deadline passed before the LLM answered."""
+
+
+@dataclass(frozen=True)
+class Route:
+    deadline: float
+    hedge: bool = False
+
+
+ROUTES: dict[str, Route] = {
+    CHAT_TURN: Route(settings.llm_deadline_chat_seconds, hedge=True),
+    CHAT_STREAM: Route(settings.llm_deadline_chat_seconds),
+    # Mostly pre-generated in the background (opening_pool).
+    SESSION_OPENING: Route(settings.llm_deadline_opening_seconds),
+    CONTEXT_SUMMARY: Route(settings.llm_deadline_summary_seconds),
+    TRANSCRIPT_CLEANUP: Route(settings.llm_deadline_transcript_seconds, hedge=True),
+}
+
+
+def _p95(values) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(
+        self,
+        fallback: str,
+        error_rate: float,
+        latency_p95: float,
+        cooldown: float,
+        window: int = 50,
+        min_calls: int = 10,
+    ):
+        self.fallback = fallback
+        self.error_rate = error_rate
+        self.latency_p95 = latency_p95
+        self.cooldown = cooldown
+        self.min_calls = min_calls
+        self.state = self.CLOSED
+        self._outcomes: deque[tuple[bool, float]] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probe_started: float | None = None
+        self.opened = 0
+
+    def allow(self) -> bool:
+        """Whether the next call may use the primary model."""
+        now = time.monotonic()
+        if self.state == self.OPEN and now - self._opened_at >= self.cooldown:
+            self.state, self._probe_started = self.HALF_OPEN, None
+        if self.state == self.CLOSED:
+            return True
+        # 프로브 한 건만 통과 (결과 없이 끝난 프로브는 cooldown 후 다시)
+        if self.state == self.HALF_OPEN and (
+            self._probe_started is None or now - self._probe_started >= self.cooldown
+        ):
+            self._probe_started = now
+            return True
+        return False
+
+    def record(self, ok: bool, latency: float | None) -> None:
+        """`latency=None`: count the outcome only (streams)."""
+        if self.state == self.HALF_OPEN:
+            if ok and (latency is None or latency <= self.latency_p95):
+                self.state = self.CLOSED
+                self._outcomes.clear()
+            else:
+                self._open()
+            return
+        if self.state == self.OPEN:
+            return
+        self._outcomes.append((ok, latency))
+        if len(self._outcomes) < self.min_calls:
+            return
+        errors = sum(1 for success, _ in self._outcomes if not success)
+        latencies = [lat for success, lat in self._outcomes if success and lat is not None]
+        if errors / len(self._outcomes) > self.error_rate or (
+            latencies and _p95(latencies) > self.latency_p95
+        ):
+            self._open()
+
+    def _open(self) -> None:
+        self.state = self.OPEN
+        self._opened_at = time.monotonic()
+        self.opened += 1
+        logger.warning(f"LLM circuit opened, failing over to {self.fallback}")
+
+
+_breakers: dict[str, CircuitBreaker] = {
+    model: CircuitBreaker(
+        fallback,
+        error_rate=settings.llm_breaker_error_rate,
+        latency_p95=settings.llm_breaker_latency_p95_seconds,
+        cooldown=settings.llm_breaker_cooldown_seconds,
+    )
+    for model, fallback in settings.llm_fallback_models.items()
+}
+_latencies: dict[tuple[str, str], deque[float]] = {}
+_stats: dict[str, dict[str, int]] = {}
+
+
+def _count(route: str, name: str) -> None:
+    counters = _stats.setdefault(route, {})
+    counters[name] = counters.get(name, 0) + 1
+
+
+def _select_model(route: str, model: str) -> str:
+    breaker = _breakers.get(model)
+    if breaker is None or breaker.allow():
+        return model
+    _count(route, "failovers")
+    return breaker.fallback
+
+
+def _record(route: str, model: str, ok: bool, latency: float) -> None:
+    if ok:
+        _latencies.setdefault((route, model), deque(maxlen=LATENCY_WINDOW)).append(latency)
+    breaker = _breakers.get(model)
+    if breaker is not None:
+        breaker.record(ok, latency)
+
+
+def _record_stream(route: str, model: str, ok: bool, latency: float) -> None:
+    # 첫 토큰까지의 시간: 스트림 라우트에만 쌓고 브레이커엔 결과만 넘긴다
+    if ok:
+        _latencies.setdefault((route, model), deque(maxlen=LATENCY_WINDOW)).append(latency)
+    breaker = _breakers.get(model)
+    if breaker is not None:
+        breaker.record(ok, None)
+
+
+def _hedge_delay(route: str, model: str) -> float | None:
+    samples = _latencies.get((route, model))
+    if not ROUTES[route].hedge or not samples or len(samples) < HEDGE_MIN_SAMPLES:
+        return None
+    return max(_p95(samples), settings.llm_hedge_min_delay_seconds)
+
+
+def _backoff(attempt: int) -> float:
+    return min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2**attempt) * random.uniform(0.5, 1.5)
+
+
+async def _call(route: str, model: str, timeout: float, params: dict):
+    started = time.monotonic()
+    try:
+        response = await client.chat.completions.create(
+            model=model, timeout=timeout, **params
+        )
+    except Exception:
+        _record(route, model, False, time.monotonic() - started)
+        raise
+    _record(route, model, True, time.monotonic() - started)
+    return response
+
+
+async def _hedged_call(route: str, model: str, timeout: float, params: dict):
+    primary = asyncio.create_task(_call(route, model, timeout, params))
+    hedge = None
+    try:
+        delay = _hedge_delay(route, model)
+        if delay is None or delay >= timeout:
+            return await primary
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+
+        # 첫 요청이 p95보다 느리면 같은 요청을 하나 더 보내고 먼저 온 응답을 쓴다
+        _count(route, "hedged")
+        hedge = asyncio.create_task(_call(route, model, timeout - delay, params))
+        pending = {primary, hedge}
+        error: BaseException | None = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is hedge:
+                        _count(route, "hedge_wins")
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in (primary, hedge):
+            if task is not None and not task.done():
+                task.cancel()
+
+
+async def complete(route: str, *, model: str, **params):
+    """Chat completion under the route's deadline, retry and failover policy.
+
+    `params` are passed to `chat.completions.create`.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + ROUTES[route].deadline
+    model = _select_model(route, model)
+    _count(route, "calls")
+    for attempt in range(settings.llm_max_retries + 1):
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        try:
+            return await asyncio.wait_for(
+                _hedged_call(route, model, remaining, params), remaining
+            )
+        except asyncio.TimeoutError:
+            # 남은 시간을 다 썼다
+            _record(route, model, False, remaining)
+            break
+        except RETRYABLE_ERRORS as exc:
+            if attempt == settings.llm_max_retries or loop.time() >= deadline:
+                _count(route, "failed")
+                raise
+            _count(route, "retries")
+            logger.warning(f"LLM {route} attempt {attempt + 1} failed ({model}): {exc!r}")
+            await asyncio.sleep(min(_backoff(attempt), max(0.0, deadline - loop.time())))
+    _count(route, "deadline_exceeded")
+    raise LLMDeadlineExceeded(f"{route}: no response within {ROUTES[route].deadline}s")
+
+
+async def _next_piece(chunks) -> str | None:
+    """Next non-empty content delta, or None at the end of the stream."""
+    async for chunk in chunks:
+        if chunk.choices and chunk.choices[0].delta.content:
+            return chunk.choices[0].delta.content
+    return None
+
+
+async def stream(route: str, *, model: str, **params) -> AsyncIterator[str]:
+    """Stream content deltas of a chat completion.
+
+    Retries and failover apply until the first token; after that a stalled
+    stream raises `LLMDeadlineExceeded` at the route deadline.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + ROUTES[route].deadline
+    model = _select_model(route, model)
+    _count(route, "calls")
+    response = first = None
+    for attempt in range(settings.llm_max_retries + 1):
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            break
+        started = loop.time()
+        try:
+            response = await asyncio.wait_for(
+                client.chat.completions.create(
+                    model=model, stream=True, timeout=remaining, **params
+                ),
+                remaining,
+            )
+            chunks = response.__aiter__()
+            first = await asyncio.wait_for(_next_piece(chunks), deadline - loop.time())
+        except (asyncio.TimeoutError, *RETRYABLE_ERRORS) as exc:
+            _record_stream(route, model, False, loop.time() - started)
+            if response is not None:
+                await response.close()
+                response = None
+            if isinstance(exc, asyncio.TimeoutError):
+                break
+            if attempt == settings.llm_max_retries or loop.time() >= deadline:
+                _count(route, "failed")
+                raise
+            _count(route, "retries")
+            logger.warning(f"LLM {route} stream attempt {attempt + 1} failed ({model}): {exc!r}")
+            await asyncio.sleep(min(_backoff(attempt), max(0.0, deadline - loop.time())))
+            continue
+        _record_stream(route, model, True, loop.time() - started)
+        break
+
+    if response is None:
+        _count(route, "deadline_exceeded")
+        raise LLMDeadlineExceeded(f"{route}: no response within {ROUTES[route].deadline}s")
+
+    try:
+        piece = first
+        while piece is not None:
+            yield piece
+            try:
+                piece = await asyncio.wait_for(
+                    _next_piece(chunks), max(0.0, deadline - loop.time())
+                )
+            except asyncio.TimeoutError:
+                _count(route, "deadline_exceeded")
+                raise LLMDeadlineExceeded(f"{route}: stream stalled past the deadline")
+    finally:
+        await response.close()
+
+
+def stats() -> dict:
+    return {
+        "routes": {route: dict(counters) for route, counters in _stats.items()},
+        "hedge_delay_seconds": {
+            f"{route}:{model}": round(delay, 3)
+            for (route, model) in _latencies
+            if (delay := _hedge_delay(route, model)) is not None
+        },
+        "ttft_p95_seconds": {
+            f"{route}:{model}": round(_p95(samples), 3)
+            for (route, model), samples in _latencies.items()
+            if route == CHAT_STREAM and samples
+        },
+        "breakers": {
+            model: {"state": breaker.state, "opened": breaker.opened}
+            for model, breaker in _breakers.items()
+        },
+    }
@@ -0,0 +1,74 @@
+"""
+Per-turn model tiering for speaking mode.
+
+Speaking turns used to go to gpt-4o unconditionally. Most turns are short
+replies that only move the conversation along. gpt-4o's feedback matters
+on turns where the learner tries a target word (word-usage judgement,
+pronunciation notes), writes a longer sentence (grammar feedback), or is
+still at the start of the session (scenario setup). Those turns go to the
+strong model and the rest to the light one. Chat mode always uses the
+light model.
+
+Thresholds come from settings (SPEAKING_TIER_*), and
+`benchmarks/replay_model_tiering.py` replays recorded sessions to measure
+the cost and latency saved.
+"""
+
+from dataclasses import dataclass
+
+from config import settings
+from services.word_detector import tokenize
+
+
+@dataclass(frozen=True)
+class TurnSignals:
+    mode: str
+    word_count: int
+    # Earlier user messages in the session (0 = first reply)
+    user_turns: int
+    mentions_unused_word: bool
+
+
+@dataclass(frozen=True)
+class TierDecision:
+    model: str
+    reason: str
+
+
+def turn_signals(
+    mode: str, content: str, user_turns: int, candidates: list[str]
+) -> TurnSignals:
+    """`candidates`: unused target words word_detector found in `content`."""
+    return TurnSignals(
+        mode=mode,
+        word_count=len(tokenize(content)),
+        user_turns=user_turns,
+        mentions_unused_word=bool(candidates),
+    )
+
+
+def choose_model(signals: TurnSignals) -> TierDecision:
+    light = settings.speaking_tier_light_model
+    if signals.mode != "speaking":
+        return TierDecision(light, "chat")
+    strong = settings.speaking_tier_strong_model
+    if not settings.speaking_tier_enabled:
+        return TierDecision(strong, "disabled")
+    if signals.mentions_unused_word:
+        return TierDecision(strong, "target_word")
+    if signals.word_count >= settings.speaking_tier_long_message_words:
+        return TierDecision(strong, "long_message")
+    if signals.user_turns < settings.speaking_tier_opening_turns:
+        return TierDecision(strong, "session_start")
+    return TierDecision(light, "small_talk")
+
+
+_decisions: dict[str, int] = {}
+
+
+def record(decision: TierDecision) -> None:
+    _decisions[decision.reason] = _decisions.get(decision.reason, 0) + 1
+
+
+def stats() -> dict:
+    return dict(_decisions)
@@ -0,0 +1,329 @@
+"""
+Pool of pre-generated session openings.
+
+The first assistant message of a session depends only on the mode, the
+user's level and the target words, so it can be written before the user
+taps "start". A background task reads today's daily recommendations, turns
+each into (mode, level, word ids) keys - chat for everyone, speaking for
+premium users - and generates an opening for every key not in the pool.
+`create_session` takes a ready opening (each is used once), waits for one
+that is still being generated, and only calls the LLM on a miss.
+
+Speculation covers triples the refiller has not seen yet: when the vocab
+endpoint returns words, `speculate()` starts generating their openings in
+the background, within a per-user daily budget. Speculative openings expire
+after `speculation_ttl_seconds` if no session uses them.
+
+Metrics (`stats()`): hit rate of `take()`, refill lag (time from the
+refiller first seeing a key to its opening being ready), and speculation
+hit/waste ratios.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from datetime import date
+
+from config import settings
+from db.supabase_client import async_supabase
+from services import entitlements, llm_gateway, vocab_index
+from services.prompt_registry import build_system_prompt
+from services.ttl_cache import TTLCache
+from services.vocab_service import get_words_by_ids
+
+logger = logging.getLogger("toking-api")
+
+OPENING_INSTRUCTION = "Start the conversation. Set up a natural scenario."
+# The home screen starts sessions with the first three daily words.
+WORDS_PER_SESSION = 3
+PAGE_SIZE = 1000
+USER_BATCH_SIZE = 200
+
+PoolKey = tuple[str, str, tuple[str, ...]]
+
+
+def pool_key(mode: str, level: str, word_ids: list[str]) -> PoolKey:
+    # 단어 순서와 무관하게 같은 키
+    return (mode, level, tuple(sorted(word_ids)))
+
+
+async def generate_opening(mode: str, level: str, words: list[dict]) -> str:
+    """Ask the LLM for a session's first assistant message."""
+    words_used = {w["word"]: False for w in words}
+    response = await llm_gateway.complete(
+        llm_gateway.SESSION_OPENING,
+        model="gpt-4o-mini",
+        messages=[
+            {
+                "role": "system",
+                "content": build_system_prompt(mode, level, words, words_used),
+            },
+            {"role": "user", "content": OPENING_INSTRUCTION},
+        ],
+        temperature=0.8,
+        response_format={"type": "json_object"},
+    )
+    return json.loads(response.choices[0].message.content).get("message", "")
+
+
+class OpeningPool:
+    def __init__(self, maxsize: int, ttl: float, concurrency: int, refill_batch: int):
+        self._ready: TTLCache[PoolKey, str] = TTLCache(maxsize, ttl)
+        self._refill_batch = refill_batch
+        # 아직 채우지 못한 키 -> 처음 발견한 시각 (refill lag 측정용)
+        self._wanted: dict[PoolKey, float] = {}
+        self._inflight: dict[PoolKey, asyncio.Task] = {}
+        self._semaphore = asyncio.Semaphore(concurrency)
+        # 오늘 이미 스캔한 추천 (user_id, created_at) / 스캔 위치
+        self._day: date | None = None
+        self._seen: set[tuple[str, str]] = set()
+        self._watermark: str | None = None
+        # 추측 생성한 키 -> 만료 시각 / 오늘 유저별 사용한 예산
+        self._speculative: dict[PoolKey, float] = {}
+        # 날짜가 바뀌면 비우므로 LRU로 밀려나 예산이 초기화되지 않는다
+        self._budget_day: date | None = None
+        self._budget: dict[str, int] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self.lags: deque[float] = deque(maxlen=500)
+        self.hits = 0
+        self.inflight_hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.failed = 0
+        self.speculation_started = 0
+        self.speculation_hits = 0
+        self.speculation_wasted = 0
+        self.speculation_over_budget = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._ready.maxsize > 0
+
+    async def take(self, key: PoolKey, words: list[dict]) -> str:
+        """Opening for `key`: a pooled one, one being generated, or a live call.
+
+        Pooled openings are used once.
+        """
+        opening = self._ready.get(key, count=False)
+        if opening is None and key in self._inflight:
+            # 생성 중이면 새로 호출하지 않고 그 결과를 쓴다
+            await asyncio.shield(self._inflight[key])
+            opening = self._ready.get(key, count=False)
+            if opening is not None:
+                self.inflight_hits += 1
+        if opening is None:
+            self.misses += 1
+            mode, level, _ = key
+            return await generate_opening(mode, level, words)
+        self._ready.pop(key)
+        self.hits += 1
+        if self._speculative.pop(key, None) is not None:
+            self.speculation_hits += 1
+        return opening
+
+    def want(self, key: PoolKey) -> None:
+        if key in self._speculative:
+            # 추천 목록에 들어온 키는 일반 항목으로 유지
+            del self._speculative[key]
+            self._ready.touch(key)
+        if key not in self._ready and key not in self._inflight:
+            self._wanted.setdefault(key, time.monotonic())
+
+    def _start_fill(self, key: PoolKey, ttl: float | None = None) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fill(key, ttl))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return task
+
+    async def _fill(self, key: PoolKey, ttl: float | None) -> None:
+        mode, level, word_ids = key
+        try:
+            async with self._semaphore:
+                words = await get_words_by_ids(list(word_ids))
+                opening = await generate_opening(mode, level, words)
+        except Exception as exc:
+            # 다음 refill 때 다시 시도
+            self.failed += 1
+            logger.warning(f"Opening generation failed for {key}: {exc}")
+            return
+        self._ready.set(key, opening, ttl)
+        self.generated += 1
+        if ttl is not None and key not in self._wanted:
+            self._speculative[key] = time.monotonic() + ttl
+        seen_at = self._wanted.pop(key, None)
+        if seen_at is not None:
+            self.lags.append(time.monotonic() - seen_at)
+
+    def _expire_speculation(self) -> None:
+        now = time.monotonic()
+        for key, expires_at in list(self._speculative.items()):
+            if expires_at <= now or key not in self._ready:
+                del self._speculative[key]
+                self.speculation_wasted += 1
+
+    def speculate(self, user_id: str, word_ids: list[str], premium: bool) -> None:
+        """Start generating openings for words just shown to the user.
+
+        `premium` comes from the caller's token claims; the level is that of
+        the words (daily picks are drawn from the user's level).
+        """
+        if not self.enabled or not word_ids or settings.speculation_budget_per_user <= 0:
+            return
+        self._expire_speculation()
+        task = asyncio.create_task(self._speculate(user_id, word_ids, premium))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _speculate(self, user_id: str, word_ids: list[str], premium: bool) -> None:
+        index = await vocab_index.get_index()
+        records = index.get_many(word_ids)
+        if len(records) < len(word_ids):
+            # 인덱스에 아직 없는 단어: 다음 refill에서 처리
+            return
+        level = records[0].level
+        today = date.today()
+        if today != self._budget_day:
+            self._budget_day, self._budget = today, {}
+        modes = ["chat", "speaking"] if premium else ["chat"]
+        for mode in modes:
+            key = pool_key(mode, level, word_ids)
+            if key in self._ready or key in self._inflight:
+                continue
+            used = self._budget.get(user_id, 0)
+            if used >= settings.speculation_budget_per_user:
+                self.speculation_over_budget += 1
+                return
+            self._budget[user_id] = used + 1
+            self.speculation_started += 1
+            self._start_fill(key, ttl=settings.speculation_ttl_seconds)
+
+    async def _scan_recommendations(self, day: date) -> None:
+        """Queue keys for today's recommendations added since the last scan."""
+        if day != self._day:
+            self._day, self._seen, self._watermark = day, set(), None
+        rows: list[dict] = []
+        offset = 0
+        while True:
+            query = (
+                async_supabase.table("daily_recommendations")
+                .select("user_id, word_ids, created_at")
+                .eq("rec_date", day.isoformat())
+            )
+            if self._watermark is not None:
+                query = query.gte("created_at", self._watermark)
+            # 배치 upsert는 created_at(NOW())이 같으므로 user_id로 순서를 고정
+            # ((user_id, rec_date)가 PK라 오늘 날짜 안에서는 유일)
+            page = await (
+                query.order("created_at")
+                .order("user_id")
+                .range(offset, offset + PAGE_SIZE - 1)
+                .execute()
+            )
+            rows.extend(
+                r for r in page.data if (r["user_id"], r["created_at"]) not in self._seen
+            )
+            if len(page.data) < PAGE_SIZE:
+                break
+            offset += PAGE_SIZE
+        if not rows:
+            return
+
+        user_ids = [r["user_id"] for r in rows]
+        users: dict[str, dict] = {}
+        for start in range(0, len(user_ids), USER_BATCH_SIZE):
+            result = await (
+                async_supabase.table("users")
+                .select("id, level, is_premium, premium_expires_at")
+                .in_("id", user_ids[start:start + USER_BATCH_SIZE])
+                .execute()
+            )
+            users.update((u["id"], u) for u in result.data)
+
+        for row in rows:
+            self._seen.add((row["user_id"], row["created_at"]))
+            user = users.get(row["user_id"])
+            if user is None:
+                continue
+            word_ids = row["word_ids"][:WORDS_PER_SESSION]
+            self.want(pool_key("chat", user["level"], word_ids))
+            if entitlements.premium_active(entitlements.claims(user)):
+                self.want(pool_key("speaking", user["level"], word_ids))
+        self._watermark = rows[-1]["created_at"]
+
+    async def refill(self) -> int:
+        """Scan for new demand and generate up to `refill_batch` missing openings.
+
+        Keys are started oldest first; the rest wait for the next pass, so a
+        large backlog does not keep the loop from rescanning.
+        """
+        await self._scan_recommendations(date.today())
+        self._expire_speculation()
+        for key in [k for k in self._wanted if k in self._ready]:
+            del self._wanted[key]
+        missing = [k for k in self._wanted if k not in self._inflight][: self._refill_batch]
+        await asyncio.gather(*(self._start_fill(k) for k in missing))
+        return len(missing)
+
+    def stats(self) -> dict:
+        self._expire_speculation()
+        lookups = self.hits + self.misses
+        lags = sorted(self.lags)
+        settled = self.speculation_hits + self.speculation_wasted
+        return {
+            "ready": len(self._ready),
+            "wanted": len(self._wanted),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "inflight_hits": self.inflight_hits,
+            "generated": self.generated,
+            "failed": self.failed,
+            "refill_lag_p50_seconds": round(lags[len(lags) // 2], 3) if lags else None,
+            "refill_lag_max_seconds": round(lags[-1], 3) if lags else None,
+            "speculation": {
+                "started": self.speculation_started,
+                "pending": len(self._speculative),
+                "hits": self.speculation_hits,
+                "wasted": self.speculation_wasted,
+                "over_budget": self.speculation_over_budget,
+                "hit_ratio": round(self.speculation_hits / settled, 4) if settled else 0.0,
+                "waste_ratio": round(self.speculation_wasted / settled, 4) if settled else 0.0,
+            },
+        }
+
+
+pool = OpeningPool(
+    maxsize=settings.opening_pool_size,
+    ttl=settings.opening_pool_ttl_seconds,
+    concurrency=settings.opening_pool_concurrency,
+    refill_batch=settings.opening_pool_refill_batch,
+)
+_refill_task: asyncio.Task | None = None
+
+
+async def _refill_loop() -> None:
+    while True:
+        try:
+            await pool.refill()
+        except Exception as exc:
+            logger.warning(f"Opening pool refill failed: {exc}")
+        await asyncio.sleep(settings.opening_pool_refill_seconds)
+
+
+def start() -> None:
+    """Start the background refiller (app startup). Size 0 disables the pool."""
+    global _refill_task
+    if pool.enabled and _refill_task is None:
+        _refill_task = asyncio.create_task(_refill_loop(), name="opening-pool-refill")
+
+
+async def stop() -> None:
+    global _refill_task
+    if _refill_task is not None:
+        _refill_task.cancel()
+        await asyncio.gather(_refill_task, return_exceptions=True)
+        _refill_task = None
@@ -0,0 +1,143 @@
+"""
+Prompt templates loaded once and rendered from pre-split parts.
+
+Every `*.txt` file in `backend/prompts` is read at import and parsed
+(str.format syntax, `{{`/`}}` escapes) into literal chunks and field slots,
+so building a system prompt is a list copy, a few slot assignments and one
+`"".join` instead of a disk read plus a full `str.format` parse.
+
+Files are re-checked at most every `prompt_reload_interval_seconds` and
+reloaded when their mtime changes, so prompt edits apply without a restart
+(0 disables the check). A template that fails to parse keeps the previous
+version.
+"""
+
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from string import Formatter
+
+from config import settings
+
+logger = logging.getLogger("toking-api")
+
+PROMPTS_DIR = Path(__file__).parent.parent / "prompts"
+
+
+class PromptTemplate:
+    __slots__ = ("name", "mtime", "fields", "_parts", "_slots")
+
+    def __init__(self, name: str, text: str, mtime: int = 0):
+        self.name = name
+        self.mtime = mtime
+        parts: list[str] = []
+        slots: list[tuple[int, str]] = []
+        for literal, field, spec, conversion in Formatter().parse(text):
+            if literal:
+                parts.append(literal)
+            if field is None:
+                continue
+            if not field.isidentifier() or spec or conversion:
+                raise ValueError(f"{name}: unsupported placeholder {{{field}}}")
+            slots.append((len(parts), field))
+            parts.append("")
+        self._parts = parts
+        self._slots = tuple(slots)
+        self.fields = frozenset(field for _, field in slots)
+
+    def render(self, **values: str) -> str:
+        """Fill the placeholders; raises KeyError for a missing value."""
+        parts = self._parts.copy()
+        for i, field in self._slots:
+            parts[i] = values[field]
+        return "".join(parts)
+
+
+class PromptRegistry:
+    def __init__(self, directory: Path, reload_interval: float):
+        self.directory = directory
+        self.reload_interval = reload_interval
+        self._templates: dict[str, PromptTemplate] = {}
+        self._checked_at = 0.0
+        self.reloads = 0
+        for path in sorted(directory.glob("*.txt")):
+            self._load(path)
+        self._checked_at = time.monotonic()
+
+    def _load(self, path: Path) -> None:
+        mtime = os.stat(path).st_mtime_ns
+        template = PromptTemplate(path.stem, path.read_text(encoding="utf-8"), mtime)
+        self._templates[path.stem] = template
+
+    def _reload_changed(self) -> None:
+        for name, template in list(self._templates.items()):
+            path = self.directory / f"{name}.txt"
+            mtime = template.mtime
+            try:
+                mtime = os.stat(path).st_mtime_ns
+                if mtime == template.mtime:
+                    continue
+                self._load(path)
+                self.reloads += 1
+                logger.info(f"Prompt template reloaded: {name}")
+            except (OSError, ValueError) as exc:
+                logger.warning(f"Prompt template reload failed for {name}: {exc}")
+                # 다음 수정 전까지 다시 시도하지 않는다
+                template.mtime = mtime
+
+    def get(self, name: str) -> PromptTemplate:
+        if self.reload_interval > 0:
+            now = time.monotonic()
+            if now - self._checked_at >= self.reload_interval:
+                self._checked_at = now
+                self._reload_changed()
+        return self._templates[name]
+
+    def render(self, name: str, /, **values: str) -> str:
+        return self.get(name).render(**values)
+
+    def names(self) -> list[str]:
+        return sorted(self._templates)
+
+
+prompts = PromptRegistry(PROMPTS_DIR, settings.prompt_reload_interval_seconds)
+
+
+def build_system_prompt(
+    mode: str,
+    level: str,
+    target_words: list[dict],
+    words_used: dict,
+    candidates: list[str] | None = None,
+) -> str:
+    """System prompt for a chat/speaking session.
+
+    `candidates` are the unused target words found in the user's message
+    (word_detector). The word-usage rules and the "word_usage" response
+    field are only included when there are some.
+    """
+    word_names = [w["word"] for w in target_words]
+    used_list = [w for w, used in words_used.items() if used]
+
+    word_usage_rules = word_usage_field = ""
+    if candidates:
+        word_usage_rules = prompts.render(
+            "speaking_word_usage" if mode == "speaking" else "chat_word_usage",
+            candidates=", ".join(candidates),
+        )
+        word_usage_field = '\n  "word_usage": ' + json.dumps(
+            {w: False for w in candidates}, ensure_ascii=False
+        ) + ","
+
+    return prompts.render(
+        "speaking_system" if mode == "speaking" else "chat_system",
+        word_usage_rules=word_usage_rules,
+        word_usage_field=word_usage_field,
+        level=level,
+        word1=word_names[0] if len(word_names) > 0 else "",
+        word2=word_names[1] if len(word_names) > 1 else "",
+        word3=word_names[2] if len(word_names) > 2 else "",
+        used_words=", ".join(used_list) if used_list else "none",
+    )
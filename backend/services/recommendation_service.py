@@ -0,0 +1,130 @@
+"""
+Daily word recommendations (오늘의 단어).
+
+Each user gets one pick of `daily_word_count` words per date, stored in
+`daily_recommendations` keyed by (user_id, rec_date). The batch job
+(`python -m jobs.daily_recommendations`) fills the next day's rows for
+recently active users ahead of time; anyone without a row gets one computed
+on their first request. The home screen is then a single primary-key lookup
+and shows the same words all day. Requests for fewer words get a prefix of
+the stored pick.
+"""
+
+import asyncio
+import logging
+from datetime import date, timedelta
+
+from config import settings
+from db.supabase_client import async_supabase, supabase
+from services.vocab_service import (
+    get_random_word_ids,
+    get_recent_word_ids,
+    get_words_by_ids,
+    pick_word_ids,
+)
+
+logger = logging.getLogger("toking-api")
+
+TABLE = "daily_recommendations"
+PAGE_SIZE = 1000
+WRITE_BATCH_SIZE = 500
+
+
+async def _lookup(user_id: str, day: date) -> list[str] | None:
+    result = await (
+        async_supabase.table(TABLE)
+        .select("word_ids")
+        .eq("user_id", user_id)
+        .eq("rec_date", day.isoformat())
+        .limit(1)
+        .execute()
+    )
+    return result.data[0]["word_ids"] if result.data else None
+
+
+async def _store(user_id: str, day: date, word_ids: list[str]) -> list[str]:
+    """Save a pick unless one exists; returns the pick that won."""
+    result = await async_supabase.table(TABLE).upsert(
+        {"user_id": user_id, "rec_date": day.isoformat(), "word_ids": word_ids},
+        on_conflict="user_id,rec_date",
+        ignore_duplicates=True,
+    ).execute()
+    if result.data:
+        return word_ids
+    # 동시 요청이 먼저 저장한 추천을 따른다
+    return await _lookup(user_id, day) or word_ids
+
+
+async def get_daily_word_ids(user_id: str, day: date | None = None) -> list[str]:
+    day = day or date.today()
+    word_ids = await _lookup(user_id, day)
+    if word_ids is None:
+        # 배치에서 빠진 유저 (신규/비활성): 첫 요청 때 계산해서 저장
+        word_ids = await get_random_word_ids(user_id, settings.daily_word_count)
+        word_ids = await _store(user_id, day, word_ids)
+    return word_ids
+
+
+async def get_daily_words(user_id: str, count: int = 3) -> list[dict]:
+    word_ids = await get_daily_word_ids(user_id)
+    return await get_words_by_ids(word_ids[:count])
+
+
+def reset_for_user(user_id: str) -> None:
+    """Drop today's and upcoming picks (e.g. after a level change)."""
+    supabase.table(TABLE).delete().eq("user_id", user_id).gte(
+        "rec_date", date.today().isoformat()
+    ).execute()
+
+
+async def _active_users(since: date) -> list[dict]:
+    users: list[dict] = []
+    offset = 0
+    while True:
+        page = await (
+            async_supabase.table("users")
+            .select("id, level")
+            .gte("last_study_date", since.isoformat())
+            .order("id")
+            .range(offset, offset + PAGE_SIZE - 1)
+            .execute()
+        )
+        users.extend(page.data)
+        if len(page.data) < PAGE_SIZE:
+            return users
+        offset += PAGE_SIZE
+
+
+async def precompute(day: date, active_days: int | None = None) -> int:
+    """Fill `day`'s picks for users active in the last `active_days` days.
+
+    Existing rows are kept, so re-running the job (or racing a lazy
+    first request) never changes a pick that may already have been shown.
+    Returns the number of users processed.
+    """
+    active_days = active_days or settings.daily_recommendation_active_days
+    users = await _active_users(day - timedelta(days=active_days))
+    semaphore = asyncio.Semaphore(settings.daily_recommendation_concurrency)
+
+    async def _pick(user: dict) -> dict | None:
+        async with semaphore:
+            try:
+                recent = await get_recent_word_ids(user["id"])
+                word_ids = await pick_word_ids(
+                    user["level"], settings.daily_word_count, recent
+                )
+            except Exception as exc:
+                # 실패한 유저는 첫 요청 때 계산된다
+                logger.warning(f"Daily pick failed for {user['id']}: {exc}")
+                return None
+        return {"user_id": user["id"], "rec_date": day.isoformat(), "word_ids": word_ids}
+
+    rows = [r for r in await asyncio.gather(*(_pick(u) for u in users)) if r]
+    for start in range(0, len(rows), WRITE_BATCH_SIZE):
+        await async_supabase.table(TABLE).upsert(
+            rows[start:start + WRITE_BATCH_SIZE],
+            on_conflict="user_id,rec_date",
+            ignore_duplicates=True,
+        ).execute()
+    logger.info(f"Daily recommendations for {day}: {len(rows)}/{len(users)} users")
+    return len(rows)
@@ -0,0 +1,168 @@
+"""
+Write-through cache of per-session chat state.
+
+A chat turn needs the session row, its target words, the user's level and
+the recent messages before it can call the LLM. The first turn handled by
+this process loads them once; every write path (session creation, turn
+persistence, summary folds, level changes) updates or invalidates the entry
+so later turns read it from memory.
+
+`SessionSummary` accumulates what the completion summary needs (first and
+last message time, message count, first use of each word) turn by turn.
+It is persisted with every turn (study_sessions.summary_stats), so it
+survives restarts and cache evictions.
+
+The cache is per process. It assumes a session's turns are served by one
+worker (the Dockerfile runs a single uvicorn worker); set
+SESSION_CACHE_SIZE=0 to disable it when running several workers.
+"""
+
+from collections import deque
+from dataclasses import dataclass, field, replace
+
+from config import settings
+from services.ttl_cache import TTLCache
+
+
+# Length of the "used_in" excerpt in the completion summary
+USED_IN_CHARS = 100
+
+
+@dataclass(frozen=True)
+class SessionSummary:
+    first_message_at: str | None = None
+    last_message_at: str | None = None
+    message_count: int = 0
+    # word -> excerpt of the first user message that used it
+    first_use: dict[str, str] = field(default_factory=dict)
+
+    def with_messages(
+        self, messages: list[dict], newly_used: list[str] = ()
+    ) -> "SessionSummary":
+        """Summary after appending `messages`; `newly_used` words were first
+        used by the user message among them."""
+        first_use = self.first_use
+        if newly_used:
+            user_content = next(m["content"] for m in messages if m["role"] == "user")
+            first_use = {
+                **first_use,
+                **{
+                    w: user_content[:USED_IN_CHARS]
+                    for w in newly_used
+                    if w not in first_use
+                },
+            }
+        return replace(
+            self,
+            first_message_at=self.first_message_at or messages[0]["created_at"],
+            last_message_at=messages[-1]["created_at"],
+            message_count=self.message_count + len(messages),
+            first_use=first_use,
+        )
+
+    def to_json(self) -> dict:
+        return {
+            "first_message_at": self.first_message_at,
+            "last_message_at": self.last_message_at,
+            "message_count": self.message_count,
+            "first_use": self.first_use,
+        }
+
+    @classmethod
+    def from_json(cls, data: dict | None) -> "SessionSummary | None":
+        if data is None:
+            return None
+        return cls(
+            first_message_at=data.get("first_message_at"),
+            last_message_at=data.get("last_message_at"),
+            message_count=data.get("message_count", 0),
+            first_use=data.get("first_use") or {},
+        )
+
+
+@dataclass
+class SessionState:
+    session_id: str
+    user_id: str
+    mode: str
+    level: str
+    target_word_ids: list[str]
+    words: list[dict]
+    words_used: dict[str, bool]
+    is_completed: bool = False
+    context_summary: str | None = None
+    summarized_count: int = 0
+    # Total messages in the session; `messages` keeps only the most recent.
+    message_count: int = 0
+    # None for sessions created before summary_stats existed
+    summary: SessionSummary | None = None
+    messages: deque = field(
+        default_factory=lambda: deque(maxlen=settings.session_cache_max_messages)
+    )
+
+    @property
+    def has_full_history(self) -> bool:
+        return len(self.messages) == self.message_count
+
+    def recent(self, n: int) -> list[dict]:
+        if n <= 0:
+            return []
+        return list(self.messages)[-n:]
+
+
+_cache: TTLCache[str, SessionState] = TTLCache(
+    maxsize=settings.session_cache_size, ttl=settings.session_cache_ttl_seconds
+)
+
+
+def get(session_id: str, user_id: str) -> SessionState | None:
+    state = _cache.get(session_id)
+    if state is None or state.user_id != user_id:
+        # Ownership is re-checked against the DB on a miss.
+        return None
+    return state
+
+
+def put(state: SessionState) -> None:
+    _cache.set(state.session_id, state)
+
+
+def record_turn(
+    session_id: str,
+    new_messages: list[dict],
+    words_used: dict[str, bool],
+    is_completed: bool,
+    summary: SessionSummary | None,
+) -> None:
+    """Apply a persisted turn to the cached state."""
+    state = _cache.get(session_id, count=False)
+    if state is None:
+        return
+    state.messages.extend(new_messages)
+    state.message_count += len(new_messages)
+    state.words_used = words_used
+    state.is_completed = is_completed
+    state.summary = summary
+    _cache.touch(session_id)
+
+
+def record_summary(session_id: str, summary: str, summarized_count: int) -> None:
+    state = _cache.get(session_id, count=False)
+    if state is not None and summarized_count > state.summarized_count:
+        state.context_summary = summary
+        state.summarized_count = summarized_count
+
+
+def invalidate(session_id: str) -> None:
+    _cache.pop(session_id)
+
+
+def invalidate_user(user_id: str) -> None:
+    """Drop every cached session of a user (e.g. after a level change)."""
+    for state in list(_cache.values()):
+        if state.user_id == user_id:
+            _cache.pop(state.session_id)
+
+
+def stats() -> dict:
+    return _cache.stats()
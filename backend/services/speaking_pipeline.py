@@ -0,0 +1,163 @@
+"""
+Staged audio pipeline behind /api/speaking/transcribe.
+
+    receive ──> normalize ──> transcribe (Groq upload) ──┬──> post_process ──> respond
+            └─> session_lookup ──────────────────────────┘    (skipped when clean)
+
+Normalization, when enabled, trims silence and re-encodes to mono 16kHz
+Opus (transcription_service.normalize_audio); a clip with no speech skips
+Groq.
+The session/target-word lookup runs while the audio is normalized and
+uploaded to Groq. If either side fails, the other is cancelled before the
+error propagates: a failed lookup (unknown or foreign session) aborts the
+upload, and the caller closes the spool right after.
+LLM post-processing only runs when the raw transcript needs it (fillers,
+stutters, or a near-miss spelling of a target word; see
+transcription_service.needs_post_processing).
+A retried upload of the same audio reuses its transcript, and a transcript
+already cleaned up for the same target words reuses that result
+(services/transcript_cache.py); the stage timings then show no transcribe /
+a near-zero post_process.
+
+Every request's stage durations are logged, returned in a Server-Timing
+header, and aggregated (p50/p95 per stage) for /api/metrics.
+"""
+
+import asyncio
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from services import session_cache, transcript_cache
+from services.audio_upload import SpooledAudio
+from services.chat_service import get_session_state
+from services.transcription_service import (
+    needs_post_processing,
+    normalize_audio,
+    normalize_stats,
+    post_process_transcript,
+    transcribe_audio,
+)
+
+STAGES = ("receive", "normalize", "transcribe", "session_lookup", "post_process", "respond")
+SAMPLE_WINDOW = 500
+
+
+class StageTimer:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations: dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] = time.perf_counter() - start
+
+    def timings_ms(self) -> dict[str, float]:
+        timings = {name: round(d * 1000, 1) for name, d in self.durations.items()}
+        timings["total"] = round((time.perf_counter() - self.started) * 1000, 1)
+        return timings
+
+    def server_timing(self) -> str:
+        return ", ".join(f"{name};dur={ms}" for name, ms in self.timings_ms().items())
+
+
+_samples: dict[str, deque[float]] = {}
+_post_process = {"ran": 0, "skipped": 0}
+
+
+def record(timer: StageTimer) -> None:
+    for name, ms in timer.timings_ms().items():
+        _samples.setdefault(name, deque(maxlen=SAMPLE_WINDOW)).append(ms)
+
+
+async def _timed(timer: StageTimer, name: str, coro):
+    with timer.stage(name):
+        return await coro
+
+
+async def _normalize_and_transcribe(audio: SpooledAudio, timer: StageTimer) -> str:
+    digest = audio.digest
+    raw_transcript = transcript_cache.get_raw(digest)
+    if raw_transcript is None:
+        raw_transcript = await _transcribe_uncached(audio, timer)
+        transcript_cache.put_raw(digest, raw_transcript)
+    return raw_transcript
+
+
+async def _transcribe_uncached(audio: SpooledAudio, timer: StageTimer) -> str:
+    with timer.stage("normalize"):
+        normalized = await normalize_audio(audio)
+    try:
+        if normalized.size == 0:
+            return ""  # 음성 없음
+        with timer.stage("transcribe"):
+            return await transcribe_audio(normalized)
+    finally:
+        if normalized is not audio:
+            normalized.close()
+
+
+async def transcribe(
+    user_id: str, session_id: str, audio: SpooledAudio, timer: StageTimer
+) -> tuple[session_cache.SessionState, dict]:
+    """Transcribe `audio` for a session: (session state, transcription).
+
+    The upload and the session lookup run as concurrent tasks; the first
+    failure cancels the other.
+    """
+    lookup = asyncio.create_task(
+        _timed(timer, "session_lookup", get_session_state(user_id, session_id))
+    )
+    upload = asyncio.create_task(_normalize_and_transcribe(audio, timer))
+    tasks = (upload, lookup)
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        for task in (lookup, upload):  # 둘 다 실패하면 세션 오류가 우선
+            if task in done and task.exception() is not None:
+                raise task.exception()
+        raw_transcript, state = upload.result(), lookup.result()
+    finally:
+        # 실패/취소 시 남은 쪽(ffmpeg, Groq 업로드)을 스풀이 닫히기 전에 취소
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    target_words = [w["word"] for w in state.words]
+
+    processed_transcript = raw_transcript
+    post_processed = needs_post_processing(raw_transcript, target_words)
+    if post_processed:
+        with timer.stage("post_process"):
+            processed_transcript = transcript_cache.get_processed(raw_transcript, target_words)
+            if processed_transcript is None:
+                processed_transcript = await post_process_transcript(raw_transcript, target_words)
+                transcript_cache.put_processed(raw_transcript, target_words, processed_transcript)
+    _post_process["ran" if post_processed else "skipped"] += 1
+
+    return state, {
+        "raw_transcript": raw_transcript,
+        "processed_transcript": processed_transcript,
+        "text": processed_transcript or raw_transcript,  # Fallback to raw if post-processing fails
+        "post_processed": post_processed,
+    }
+
+
+def stats() -> dict:
+    stages = {}
+    for name in (*STAGES, "total"):
+        samples = sorted(_samples.get(name, ()))
+        if samples:
+            stages[name] = {
+                "count": len(samples),
+                "p50_ms": samples[len(samples) // 2],
+                "p95_ms": samples[min(len(samples) - 1, int(len(samples) * 0.95))],
+            }
+    return {
+        "stages": stages,
+        "post_process": dict(_post_process),
+        "normalize": normalize_stats(),
+        "cache": transcript_cache.stats(),
+    }
@@ -0,0 +1,193 @@
+"""
+Streaming helpers for LLM replies.
+
+The chat prompts ask for a JSON object ({"message": ..., "word_usage": ...}).
+MessageFieldParser reads that JSON as it is generated and returns the decoded
+text of the top-level "message" string as soon as each piece arrives, so the
+reply can be shown before the closing brace is produced.
+"""
+
+import json
+import logging
+from typing import AsyncIterator
+
+logger = logging.getLogger("toking-api")
+
+# Keep proxies (nginx, Render) from buffering the event stream.
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+# Parser states
+_SEEK_KEY = 0       # inside the top-level object, waiting for a key
+_IN_KEY = 1         # reading a top-level key string
+_AFTER_KEY = 2      # key read, waiting for ':'
+_BEFORE_VALUE = 3   # ':' read, waiting for the value
+_IN_MESSAGE = 4     # decoding the "message" string value
+_SKIP_VALUE = 5     # skipping any other value
+_DONE = 6           # "message" fully read
+
+_ESCAPES = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+
+
+class MessageFieldParser:
+    """Incrementally extract the top-level "message" string from a JSON stream.
+
+    Each character is inspected once; escape sequences (including \\uXXXX
+    and surrogate pairs) may be split across chunks.
+    """
+
+    def __init__(self, field: str = "message"):
+        self.field = field
+        self._state = _SEEK_KEY
+        self._started = False   # saw the opening '{'
+        self._key: list[str] = []
+        self._escape: str | None = None   # pending escape sequence after '\'
+        # A lone high surrogate is dropped, like a lenient decoder would.
+        self._high_surrogate: int | None = None
+        # For _SKIP_VALUE: nesting depth and string/escape flags
+        self._depth = 0
+        self._in_string = False
+        self._string_escape = False
+
+    @property
+    def done(self) -> bool:
+        return self._state == _DONE
+
+    def feed(self, chunk: str) -> str:
+        """Consume a chunk of raw JSON and return newly decoded message text."""
+        out: list[str] = []
+        for ch in chunk:
+            state = self._state
+            if state == _DONE:
+                break
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                continue
+
+            if state == _IN_MESSAGE:
+                self._feed_message_char(ch, out)
+            elif state == _SEEK_KEY:
+                if ch == '"':
+                    self._key.clear()
+                    self._escape = None
+                    self._state = _IN_KEY
+            elif state == _IN_KEY:
+                if self._escape is not None:
+                    self._key.append(ch)
+                    self._escape = None
+                elif ch == "\\":
+                    self._escape = ""
+                elif ch == '"':
+                    self._state = _AFTER_KEY
+                else:
+                    self._key.append(ch)
+            elif state == _AFTER_KEY:
+                if ch == ":":
+                    self._state = _BEFORE_VALUE
+            elif state == _BEFORE_VALUE:
+                if ch.isspace():
+                    continue
+                if ch == '"' and "".join(self._key) == self.field:
+                    self._state = _IN_MESSAGE
+                else:
+                    self._start_skip(ch)
+            elif state == _SKIP_VALUE:
+                self._feed_skip_char(ch)
+        return "".join(out)
+
+    def _feed_message_char(self, ch: str, out: list[str]) -> None:
+        if self._escape is None:
+            if ch == "\\":
+                self._escape = ""
+            elif ch == '"':
+                self._state = _DONE
+            else:
+                self._high_surrogate = None
+                out.append(ch)
+            return
+
+        if self._escape == "":
+            if ch == "u":
+                self._escape = "u"
+                return
+            self._high_surrogate = None
+            out.append(_ESCAPES.get(ch, ch))
+            self._escape = None
+            return
+
+        # Collecting \uXXXX
+        self._escape += ch
+        if len(self._escape) < 5:
+            return
+        code = int(self._escape[1:], 16)
+        self._escape = None
+        if 0xD800 <= code <= 0xDBFF:
+            self._high_surrogate = code
+        elif 0xDC00 <= code <= 0xDFFF and self._high_surrogate is not None:
+            high = self._high_surrogate
+            self._high_surrogate = None
+            out.append(chr(0x10000 + ((high - 0xD800) << 10) + (code - 0xDC00)))
+        else:
+            self._high_surrogate = None
+            out.append(chr(code))
+
+    def _start_skip(self, ch: str) -> None:
+        self._state = _SKIP_VALUE
+        self._depth = 0
+        self._in_string = False
+        self._string_escape = False
+        self._feed_skip_char(ch)
+
+    def _feed_skip_char(self, ch: str) -> None:
+        if self._in_string:
+            if self._string_escape:
+                self._string_escape = False
+            elif ch == "\\":
+                self._string_escape = True
+            elif ch == '"':
+                self._in_string = False
+                if self._depth == 0:
+                    self._state = _SEEK_KEY
+            return
+
+        if ch == '"':
+            self._in_string = True
+        elif ch in "{[":
+            self._depth += 1
+        elif ch in "}]":
+            self._depth -= 1
+            if self._depth <= 0:
+                self._state = _SEEK_KEY
+        elif ch == "," and self._depth == 0:
+            self._state = _SEEK_KEY
+
+
+def sse_event(event: str, data: dict) -> str:
+    """Format one Server-Sent Events frame."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def encode_sse(events: AsyncIterator[tuple[str, dict]]) -> AsyncIterator[str]:
+    """Turn (event, data) pairs into SSE frames.
+
+    The HTTP status is already sent once streaming starts, so failures are
+    reported to the client as a final "error" event instead of a 500.
+    """
+    try:
+        async for event, data in events:
+            yield sse_event(event, data)
+    except Exception as exc:
+        logger.error(f"Streaming reply failed: {exc}", exc_info=True)
+        yield sse_event(
+            "error",
+            {"detail": "서버 오류가 발생했습니다. 잠시 후 다시 시도해주세요."},
+        )
@@ -1,53 +1,106 @@
+"""
+Apps-in-Toss partner API (mTLS).
+
+One `httpx.AsyncClient` per worker, created on first use and closed in the
+app lifespan (`close()`). The client certificate is loaded once and
+connections are kept alive between calls, so a login (token exchange +
+login-me) or an IAP check reuses an established mTLS connection instead of
+a TCP + TLS handshake per call. HTTP/2 (TOSS_HTTP2=true, needs the `h2`
+package) multiplexes concurrent calls over one connection.
+"""
+
+import logging
+
 import httpx
 
 from config import settings
 
+logger = logging.getLogger("toking-api")
 
-def _get_mtls_client() -> httpx.AsyncClient:
+_client: httpx.AsyncClient | None = None
+
+
+def _http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _create_client() -> httpx.AsyncClient:
+    http2 = settings.toss_http2
+    if http2 and not _http2_available():
+        logger.warning("TOSS_HTTP2 is set but the h2 package is missing; using HTTP/1.1")
+        http2 = False
     return httpx.AsyncClient(
         cert=(settings.toss_mtls_cert_path, settings.toss_mtls_key_path),
         base_url=settings.toss_api_url,
-        timeout=30.0,
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=settings.toss_max_connections,
+            max_keepalive_connections=settings.toss_max_keepalive_connections,
+            keepalive_expiry=settings.toss_keepalive_expiry_seconds,
+        ),
+        timeout=httpx.Timeout(
+            settings.toss_read_timeout_seconds,
+            connect=settings.toss_connect_timeout_seconds,
+            pool=settings.toss_pool_timeout_seconds,
+        ),
     )
 
 
+def _get_mtls_client() -> httpx.AsyncClient:
+    global _client
+    if _client is None or _client.is_closed:
+        _client = _create_client()
+    return _client
+
+
+async def close() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
 async def exchange_authorization_code(
     authorization_code: str, referrer: str
 ) -> dict:
-    async with _get_mtls_client() as client:
-        response = await client.post(
-            "/api-partner/v1/apps-in-toss/user/oauth2/generate-token",
-            json={
-                "authorizationCode": authorization_code,
-                "referrer": referrer,
-            },
-        )
-        data = response.json()
-        if data.get("resultType") != "SUCCESS":
-            raise Exception(f"Toss login failed: {data.get('error', {}).get('reason')}")
-        return data["success"]
+    client = _get_mtls_client()
+    response = await client.post(
+        "/api-partner/v1/apps-in-toss/user/oauth2/generate-token",
+        json={
+            "authorizationCode": authorization_code,
+            "referrer": referrer,
+        },
+    )
+    data = response.json()
+    if data.get("resultType") != "SUCCESS":
+        raise Exception(f"Toss login failed: {data.get('error', {}).get('reason')}")
+    return data["success"]
 
 
 async def get_toss_user_info(access_token: str) -> dict:
-    async with _get_mtls_client() as client:
-        response = await client.get(
-            "/api-partner/v1/apps-in-toss/user/oauth2/login-me",
-            headers={"Authorization": f"Bearer {access_token}"},
-        )
-        data = response.json()
-        if data.get("resultType") != "SUCCESS":
-            raise Exception(f"Failed to get user info: {data.get('error', {}).get('reason')}")
-        return data["success"]
+    client = _get_mtls_client()
+    response = await client.get(
+        "/api-partner/v1/apps-in-toss/user/oauth2/login-me",
+        headers={"Authorization": f"Bearer {access_token}"},
+    )
+    data = response.json()
+    if data.get("resultType") != "SUCCESS":
+        raise Exception(f"Failed to get user info: {data.get('error', {}).get('reason')}")
+    return data["success"]
 
 
 async def get_order_status(order_id: str, user_key: str) -> dict:
-    async with _get_mtls_client() as client:
-        response = await client.post(
-            "/api-partner/v1/apps-in-toss/order/get-order-status",
-            json={"orderId": order_id},
-            headers={"x-toss-user-key": user_key},
-        )
-        data = response.json()
-        if data.get("resultType") != "SUCCESS":
-            raise Exception(f"Order status check failed: {data.get('error', {}).get('reason')}")
-        return data["success"]
+    client = _get_mtls_client()
+    response = await client.post(
+        "/api-partner/v1/apps-in-toss/order/get-order-status",
+        json={"orderId": order_id},
+        headers={"x-toss-user-key": user_key},
+    )
+    data = response.json()
+    if data.get("resultType") != "SUCCESS":
+        raise Exception(f"Order status check failed: {data.get('error', {}).get('reason')}")
+    return data["success"]
@@ -0,0 +1,60 @@
+"""
+Content-addressed cache of transcription results.
+
+Mobile clients retry an upload after a timeout, often with the exact same
+audio. Both expensive steps are deterministic for a given input, so their
+results are cached by content:
+
+- level 1: SHA-256 of the uploaded audio -> raw Groq transcript
+- level 2: (raw transcript, sorted target words) -> post-processed transcript
+  (post_process_transcript runs at temperature 0)
+
+Level 2 also serves different recordings that Whisper transcribed the same
+way. Keys hold no user or session id: the same input gives the same output
+for everyone. Empty post-processing results are not cached (the route falls
+back to the raw transcript for those, and a retry may do better).
+
+Per process, like the session cache.
+"""
+
+from config import settings
+from services.ttl_cache import TTLCache
+
+ProcessedKey = tuple[str, tuple[str, ...]]
+
+_raw: TTLCache[str, str] = TTLCache(
+    maxsize=settings.transcript_cache_size, ttl=settings.transcript_cache_ttl_seconds
+)
+_processed: TTLCache[ProcessedKey, str] = TTLCache(
+    maxsize=settings.transcript_cache_size, ttl=settings.transcript_cache_ttl_seconds
+)
+
+
+def _processed_key(raw_transcript: str, target_words: list[str]) -> ProcessedKey:
+    return raw_transcript, tuple(sorted(target_words))
+
+
+def get_raw(audio_digest: str) -> str | None:
+    return _raw.get(audio_digest)
+
+
+def put_raw(audio_digest: str, raw_transcript: str) -> None:
+    _raw.set(audio_digest, raw_transcript)
+
+
+def get_processed(raw_transcript: str, target_words: list[str]) -> str | None:
+    return _processed.get(_processed_key(raw_transcript, target_words))
+
+
+def put_processed(raw_transcript: str, target_words: list[str], processed: str) -> None:
+    if processed:
+        _processed.set(_processed_key(raw_transcript, target_words), processed)
+
+
+def clear() -> None:
+    _raw.clear()
+    _processed.clear()
+
+
+def stats() -> dict:
+    return {"audio": _raw.stats(), "transcript": _processed.stats()}
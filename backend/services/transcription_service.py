@@ -2,15 +2,36 @@
 Groq Whisper STT Service
 Inspired by Freeflow (github.com/zachlatta/freeflow)
 
-Pipeline: Audio → Groq Whisper (transcription) → LLM post-processing
+Pipeline: Audio → normalization → Groq Whisper (transcription) → LLM post-processing
+- Normalization (off by default, AUDIO_NORMALIZE_ENABLED): silence trimmed
+  (energy VAD), mono 16kHz Opus, via ffmpeg. Decoded PCM is spooled like
+  the upload; the process pool gets it in PCM_CHUNK pieces and returns
+  per-frame levels only. The original upload is sent when ffmpeg is
+  unavailable or normalization does not make it smaller
 - Groq Whisper Large v3 Turbo: 216x real-time speed, <1 second transcription
-- LLM post-processing: context-aware correction with target vocabulary
+- LLM post-processing: context-aware correction with target vocabulary,
+  only when the raw transcript needs it
+The stages are run by services/speaking_pipeline.py.
 """
 
+import asyncio
+import logging
+import multiprocessing
+import shutil
+from array import array
+from collections.abc import Awaitable, Callable
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
 import httpx
-from openai import OpenAI
 
 from config import settings
+from services import llm_gateway
+from services.audio_processing import FRAME_BYTES, SAMPLE_RATE, frame_levels, speech_frames
+from services.audio_upload import SpooledAudio
+from services.word_detector import near_misses, tokenize
+
+logger = logging.getLogger("toking-api")
 
 # Groq client (OpenAI-compatible API)
 groq_client = httpx.AsyncClient(
@@ -19,14 +40,217 @@ groq_client = httpx.AsyncClient(
     timeout=20.0,
 )
 
-openai_client = OpenAI(api_key=settings.openai_api_key)
+# Disfluencies Whisper transcribes verbatim
+FILLER_WORDS = {"um", "umm", "uh", "uhh", "uhm", "erm", "er", "hmm", "mm", "ah"}
+
+FFMPEG_CHUNK = 64 * 1024
+# Decoded PCM per process-pool call (30s = 960KB, whole VAD frames)
+PCM_CHUNK = 30 * SAMPLE_RATE * 2
+# libopus complexity (0-10). The default 10 costs ~4x the encode time for
+# no difference Whisper can hear at speech bitrates.
+OPUS_COMPLEXITY = 0
+_ffmpeg: str | None = None
+_pool: ProcessPoolExecutor | None = None
+_normalize_stats = {
+    "normalized": 0,
+    "silent": 0,
+    "passthrough": 0,
+    "failed": 0,
+    "bytes_in": 0,
+    "bytes_out": 0,
+}
+
+
+def start() -> None:
+    """Create the audio process pool (app startup). Without ffmpeg, audio is
+    sent to Groq as uploaded."""
+    global _ffmpeg, _pool
+    if not settings.audio_normalize_enabled or _pool is not None:
+        return
+    _ffmpeg = shutil.which(settings.audio_ffmpeg_path)
+    if _ffmpeg is None:
+        logger.warning("ffmpeg not found; audio normalization disabled")
+        return
+    # spawn: workers must not inherit the event loop / client state
+    _pool = ProcessPoolExecutor(
+        max_workers=settings.audio_normalize_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+
+def stop() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def _run_ffmpeg(
+    args: list[str],
+    source: SpooledAudio,
+    start: int = 0,
+    end: int | None = None,
+    reader: Callable[[asyncio.StreamReader], Awaitable[None]] | None = None,
+) -> bytes | None:
+    """Run ffmpeg with `source[start:end]` streamed to stdin.
+
+    Returns stdout, or None when `reader` consumes it instead.
+    """
+    proc = await asyncio.create_subprocess_exec(
+        _ffmpeg, "-hide_banner", "-loglevel", "error", *args,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+
+    async def feed():
+        try:
+            source.seek(start)
+            remaining = (source.size if end is None else end) - start
+            while remaining > 0 and (chunk := source.read(min(FFMPEG_CHUNK, remaining))):
+                remaining -= len(chunk)
+                proc.stdin.write(chunk)
+                await proc.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # ffmpeg exited early; its return code tells why
+        finally:
+            proc.stdin.close()
+
+    try:
+        output = reader(proc.stdout) if reader is not None else proc.stdout.read()
+        _, stdout, stderr = await asyncio.gather(feed(), output, proc.stderr.read())
+        await proc.wait()
+    except BaseException:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+        raise
+    source.seek(0)
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg exited with {proc.returncode}: {stderr[-300:]!r}")
+    return stdout
+
+
+async def _decode(audio: SpooledAudio, pcm: SpooledAudio) -> array:
+    """Decode `audio` to mono 16kHz 16-bit PCM in `pcm`; return its frame levels."""
+    loop = asyncio.get_running_loop()
+    levels = array("f")
+
+    async def consume(stdout: asyncio.StreamReader) -> None:
+        # 스풀에 쓰면서 PCM_CHUNK 단위로 프레임 레벨 계산 (풀에 한 번에 한 조각만)
+        pending = None
+        try:
+            while True:
+                try:
+                    chunk = await stdout.readexactly(PCM_CHUNK)
+                except asyncio.IncompleteReadError as exc:
+                    chunk = exc.partial
+                if chunk:
+                    pcm.write(chunk)
+                if pending is not None:
+                    levels.extend(await pending)
+                    pending = None
+                if len(chunk) < PCM_CHUNK:
+                    if chunk:
+                        levels.extend(await loop.run_in_executor(_pool, frame_levels, chunk))
+                    return
+                pending = loop.run_in_executor(_pool, frame_levels, chunk)
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    await _run_ffmpeg(
+        ["-i", "pipe:0", "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE), "-f", "s16le", "pipe:1"],
+        source=audio,
+        reader=consume,
+    )
+    return levels
+
+
+async def _normalize(audio: SpooledAudio) -> SpooledAudio:
+    # 1) 디코드 + 프레임 레벨 (CPU 작업은 프로세스 풀에서)
+    with SpooledAudio("audio.pcm", "audio/L16", settings.audio_spool_memory_bytes) as pcm:
+        levels = await _decode(audio, pcm)
+        # 2) 앞뒤 무음 구간
+        frames = speech_frames(levels)
+        normalized = SpooledAudio("audio.ogg", "audio/ogg", settings.audio_spool_memory_bytes)
+        if frames is None:
+            _normalize_stats["silent"] += 1
+            return normalized
+        # 3) 인코드: Opus (음성용 저비트레이트)
+        try:
+            encoded = await _run_ffmpeg(
+                [
+                    "-f", "s16le", "-ar", str(SAMPLE_RATE), "-ac", "1", "-i", "pipe:0",
+                    "-c:a", "libopus", "-b:a", settings.audio_normalize_bitrate,
+                    "-application", "voip", "-compression_level", str(OPUS_COMPLEXITY),
+                    "-f", "ogg", "pipe:1",
+                ],
+                source=pcm,
+                start=frames[0] * FRAME_BYTES,
+                end=frames[1] * FRAME_BYTES,
+            )
+        except BaseException:
+            normalized.close()
+            raise
+    normalized.write(encoded)
+    normalized.seek(0)
+    return normalized
+
+
+async def normalize_audio(audio: SpooledAudio) -> SpooledAudio:
+    """Trimmed mono 16kHz Opus version of `audio`.
+
+    Returns an empty SpooledAudio when the clip has no speech, and `audio`
+    itself when normalization is disabled, fails, times out or would not
+    shrink the upload. The caller closes a returned object that is not
+    `audio`.
+    """
+    if _pool is None:
+        return audio
+    _normalize_stats["bytes_in"] += audio.size
+    try:
+        normalized = await asyncio.wait_for(
+            _normalize(audio), settings.audio_normalize_timeout_seconds
+        )
+    except Exception as exc:
+        _normalize_stats["failed"] += 1
+        _normalize_stats["bytes_out"] += audio.size
+        logger.warning(f"Audio normalization failed, sending the original: {exc!r}")
+        if isinstance(exc, BrokenProcessPool):
+            # 워커가 죽은 풀은 다시 쓸 수 없다
+            stop()
+            start()
+        audio.seek(0)
+        return audio
+    if normalized.size and normalized.size >= audio.size:
+        normalized.close()
+        _normalize_stats["passthrough"] += 1
+        _normalize_stats["bytes_out"] += audio.size
+        return audio
+    if normalized.size:
+        _normalize_stats["normalized"] += 1
+    _normalize_stats["bytes_out"] += normalized.size
+    return normalized
+
+
+def normalize_stats() -> dict:
+    stats = dict(_normalize_stats)
+    stats["enabled"] = _pool is not None
+    stats["size_ratio"] = (
+        round(stats["bytes_out"] / stats["bytes_in"], 4) if stats["bytes_in"] else None
+    )
+    return stats
 
 
-async def transcribe_audio(audio_data: bytes, filename: str = "audio.webm") -> str:
+async def transcribe_audio(audio: SpooledAudio) -> str:
     """
     Transcribe audio using Groq Whisper API.
     Returns raw transcription text.
 
+    The upload is streamed from its spooled buffer as the multipart body
+    (no extra in-memory copy).
+
     Groq Whisper Large v3 Turbo: $0.04/hour, 216x real-time speed
     """
     if not settings.groq_api_key:
@@ -34,7 +258,13 @@ async def transcribe_audio(audio_data: bytes, filename: str = "audio.webm") -> s
 
     response = await groq_client.post(
         "/audio/transcriptions",
-        files={"file": (filename, audio_data, "audio/webm")},
+        files={
+            "file": (
+                audio.filename or "audio.webm",
+                audio,
+                audio.content_type or "audio/webm",
+            )
+        },
         data={
             "model": "whisper-large-v3-turbo",
             "language": "en",
@@ -45,7 +275,7 @@ async def transcribe_audio(audio_data: bytes, filename: str = "audio.webm") -> s
     return response.text.strip()
 
 
-def post_process_transcript(
+async def post_process_transcript(
     raw_transcript: str,
     target_words: list[str],
     learning_context: str = "conversation practice",
@@ -75,7 +305,8 @@ If the student attempted to use any of these vocabulary words, ensure they are s
 
 Output ONLY the cleaned transcript. No commentary, no explanations."""
 
-    response = openai_client.chat.completions.create(
+    response = await llm_gateway.complete(
+        llm_gateway.TRANSCRIPT_CLEANUP,
         model="gpt-4o-mini",
         messages=[
             {"role": "system", "content": system_prompt},
@@ -91,23 +322,19 @@ Output ONLY the cleaned transcript. No commentary, no explanations."""
     return response.choices[0].message.content.strip()
 
 
-async def transcribe_and_process(
-    audio_data: bytes,
-    target_words: list[str],
-    filename: str = "audio.webm",
-) -> dict:
-    """
-    Full pipeline: Groq Whisper transcription + LLM post-processing.
-    Returns both raw and processed transcripts.
-    """
-    # Stage 1: Fast transcription via Groq Whisper
-    raw_transcript = await transcribe_audio(audio_data, filename)
+def needs_post_processing(raw_transcript: str, target_words: list[str]) -> bool:
+    """Whether the LLM clean-up pass can change anything useful.
 
-    # Stage 2: LLM post-processing with vocabulary context
-    processed_transcript = post_process_transcript(raw_transcript, target_words)
-
-    return {
-        "raw_transcript": raw_transcript,
-        "processed_transcript": processed_transcript,
-        "text": processed_transcript or raw_transcript,  # Fallback to raw if post-processing fails
-    }
+    Post-processing exists to remove disfluencies and to restore the
+    spelling of target words that STT got slightly wrong. A transcript with
+    no filler words, no stutter ("I I") and no near-miss of a target word
+    is used as is.
+    """
+    tokens = tokenize(raw_transcript)
+    if not tokens:
+        return False
+    if any(t in FILLER_WORDS for t in tokens):
+        return True
+    if any(a == b for a, b in zip(tokens, tokens[1:])):
+        return True
+    return bool(near_misses(raw_transcript, target_words))
@@ -0,0 +1,195 @@
+"""
+In-memory vocabulary index.
+
+The vocabulary table is small and read-mostly, so each worker keeps a copy:
+compact `__slots__` records, an id -> record map, a tuple of ids per
+level and an inflection index of the words (see word_detector). It is
+loaded at startup and refreshed in the background: every
+`vocab_index_refresh_seconds` a cheap probe (row count + latest created_at)
+decides whether to reload, and a full reload happens at least every
+`vocab_index_max_age_seconds` to pick up in-place edits.
+"""
+
+import asyncio
+import logging
+import time
+
+from config import settings
+from db.supabase_client import async_supabase
+from services.word_detector import LemmaIndex
+
+logger = logging.getLogger("toking-api")
+
+VOCAB_COLUMNS = (
+    "id", "word", "level", "pos", "definition_ko", "definition_en",
+    "example_sentence", "pronunciation",
+)
+# Fields returned by the API (level is internal)
+PUBLIC_FIELDS = (
+    "id", "word", "pos", "definition_ko", "definition_en",
+    "example_sentence", "pronunciation",
+)
+PAGE_SIZE = 1000
+
+
+class VocabRecord:
+    __slots__ = VOCAB_COLUMNS
+
+    def __init__(self, row: dict):
+        for name in VOCAB_COLUMNS:
+            setattr(self, name, row.get(name))
+
+    def to_dict(self, fields: tuple[str, ...] = PUBLIC_FIELDS) -> dict:
+        return {name: getattr(self, name) for name in fields}
+
+
+class VocabIndex:
+    def __init__(self, records: list[VocabRecord], version: tuple):
+        self.version = version
+        self.loaded_at = time.monotonic()
+        self.by_id: dict[str, VocabRecord] = {}
+        self.lemmas = LemmaIndex()
+        levels: dict[str, list[str]] = {}
+        for record in records:
+            self.by_id[record.id] = record
+            self.lemmas.add(record.word)
+            levels.setdefault(record.level, []).append(record.id)
+        self.level_ids: dict[str, tuple[str, ...]] = {
+            level: tuple(ids) for level, ids in levels.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    def get(self, word_id: str) -> VocabRecord | None:
+        return self.by_id.get(word_id)
+
+    def get_many(self, word_ids: list[str]) -> list[VocabRecord]:
+        """Records for `word_ids` in the given order, skipping unknown ids."""
+        by_id = self.by_id
+        return [by_id[i] for i in word_ids if i in by_id]
+
+    def ids_for_level(self, level: str) -> tuple[str, ...]:
+        return self.level_ids.get(level, ())
+
+    def add(self, record: VocabRecord) -> None:
+        if record.id not in self.by_id:
+            ids = self.level_ids.get(record.level, ())
+            self.level_ids[record.level] = ids + (record.id,)
+        self.by_id[record.id] = record
+        self.lemmas.add(record.word)
+
+
+_index: VocabIndex | None = None
+_load_lock = asyncio.Lock()
+_refresh_task: asyncio.Task | None = None
+
+
+async def _probe_version() -> tuple:
+    result = await (
+        async_supabase.table("vocabularies")
+        .select("created_at", count="exact")
+        .order("created_at", desc=True)
+        .limit(1)
+        .execute()
+    )
+    latest = result.data[0]["created_at"] if result.data else None
+    return (result.count, latest)
+
+
+async def _load() -> VocabIndex:
+    version = await _probe_version()
+    rows: list[dict] = []
+    offset = 0
+    while True:
+        page = await (
+            async_supabase.table("vocabularies")
+            .select(", ".join(VOCAB_COLUMNS))
+            .order("id")
+            .range(offset, offset + PAGE_SIZE - 1)
+            .execute()
+        )
+        rows.extend(page.data)
+        if len(page.data) < PAGE_SIZE:
+            break
+        offset += PAGE_SIZE
+    index = VocabIndex([VocabRecord(r) for r in rows], version)
+    logger.info(f"Vocabulary index loaded: {len(index)} words")
+    return index
+
+
+async def reload() -> VocabIndex:
+    global _index
+    async with _load_lock:
+        _index = await _load()
+    return _index
+
+
+async def get_index() -> VocabIndex:
+    """Return the loaded index, loading it on first use."""
+    global _index
+    if _index is not None:
+        return _index
+    async with _load_lock:
+        if _index is None:
+            _index = await _load()
+    return _index
+
+
+async def refresh_if_stale() -> None:
+    """Reload when the table changed or the copy is older than the max age."""
+    if _index is None:
+        await get_index()
+        return
+    age = time.monotonic() - _index.loaded_at
+    if age >= settings.vocab_index_max_age_seconds:
+        await reload()
+        return
+    version = await _probe_version()
+    if version != _index.version:
+        await reload()
+
+
+async def fetch_missing(word_ids: list[str]) -> list[VocabRecord]:
+    """Load ids that are not in the index yet (words added since the last refresh)."""
+    index = await get_index()
+    missing = [i for i in word_ids if i not in index.by_id]
+    if missing:
+        result = await (
+            async_supabase.table("vocabularies")
+            .select(", ".join(VOCAB_COLUMNS))
+            .in_("id", missing)
+            .execute()
+        )
+        for row in result.data:
+            index.add(VocabRecord(row))
+    return index.get_many(word_ids)
+
+
+async def _refresh_loop() -> None:
+    while True:
+        await asyncio.sleep(settings.vocab_index_refresh_seconds)
+        try:
+            await refresh_if_stale()
+        except Exception as exc:
+            logger.warning(f"Vocabulary index refresh failed: {exc}")
+
+
+async def start() -> None:
+    """Load the index and start the background refresher (app startup)."""
+    global _refresh_task
+    try:
+        await get_index()
+    except Exception as exc:
+        # Lookups retry the load lazily.
+        logger.error(f"Vocabulary index load failed: {exc}")
+    if _refresh_task is None:
+        _refresh_task = asyncio.create_task(_refresh_loop(), name="vocab-index-refresh")
+
+
+async def stop() -> None:
+    global _refresh_task
+    if _refresh_task is not None:
+        _refresh_task.cancel()
+        await asyncio.gather(_refresh_task, return_exceptions=True)
+        _refresh_task = None
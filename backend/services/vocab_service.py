@@ -1,57 +1,59 @@
-from db.supabase_client import supabase
+import asyncio
 
+from db.supabase_client import async_supabase
+from services import vocab_index
+from services.word_sampler import sample_ids
+
+# 최근 N세션의 목표 단어는 새 추천에서 제외
+RECENT_SESSIONS = 10
 
-def get_random_words(user_id: str, count: int = 3) -> list[dict]:
-    # 유저 레벨 조회
-    user = (
-        supabase.table("users")
-        .select("level")
-        .eq("id", user_id)
-        .single()
-        .execute()
-    )
-    level = user.data["level"]
 
-    # 최근 학습한 단어 ID 조회 (최근 10세션)
-    recent_sessions = (
-        supabase.table("study_sessions")
+async def get_recent_word_ids(user_id: str) -> set[str]:
+    """Target words of the user's most recent sessions."""
+    recent_sessions = await (
+        async_supabase.table("study_sessions")
         .select("target_words")
         .eq("user_id", user_id)
         .order("started_at", desc=True)
-        .limit(10)
+        .limit(RECENT_SESSIONS)
         .execute()
     )
     recent_word_ids = set()
     for session in recent_sessions.data:
         for word_id in session.get("target_words", []):
             recent_word_ids.add(word_id)
+    return recent_word_ids
 
-    # 레벨에 맞는 단어 조회 (최근 학습 단어 제외)
-    query = (
-        supabase.table("vocabularies")
-        .select("id, word, pos, definition_ko, definition_en, example_sentence, pronunciation")
-        .eq("level", level)
-    )
 
-    result = query.execute()
-    available_words = [w for w in result.data if w["id"] not in recent_word_ids]
+async def pick_word_ids(level: str, count: int, exclude: set[str]) -> list[str]:
+    # 레벨 단어 배열에서 O(k) 샘플링 (최근 학습 단어 제외, 부족하면 포함)
+    index = await vocab_index.get_index()
+    return sample_ids(index.ids_for_level(level), count, exclude=exclude)
 
-    # 부족하면 최근 단어도 포함
-    if len(available_words) < count:
-        available_words = result.data
 
-    # 랜덤 선택
-    import random
+async def get_random_word_ids(user_id: str, count: int = 3) -> list[str]:
+    # 유저 레벨 / 최근 학습한 단어 ID (최근 10세션) 동시 조회
+    user, recent_word_ids = await asyncio.gather(
+        async_supabase.table("users")
+        .select("level")
+        .eq("id", user_id)
+        .single()
+        .execute(),
+        get_recent_word_ids(user_id),
+    )
+    return await pick_word_ids(user.data["level"], count, recent_word_ids)
 
-    selected = random.sample(available_words, min(count, len(available_words)))
-    return selected
 
+async def get_random_words(user_id: str, count: int = 3) -> list[dict]:
+    return await get_words_by_ids(await get_random_word_ids(user_id, count))
 
-def get_words_by_ids(word_ids: list[str]) -> list[dict]:
-    result = (
-        supabase.table("vocabularies")
-        .select("id, word, pos, definition_ko, definition_en, example_sentence, pronunciation")
-        .in_("id", word_ids)
-        .execute()
-    )
-    return result.data
+
+async def get_words_by_ids(
+    word_ids: list[str], fields: tuple[str, ...] = vocab_index.PUBLIC_FIELDS
+) -> list[dict]:
+    index = await vocab_index.get_index()
+    records = index.get_many(word_ids)
+    if len(records) < len(word_ids):
+        # 인덱스 갱신 이후 추가된 단어
+        records = await vocab_index.fetch_missing(word_ids)
+    return [r.to_dict(fields) for r in records]
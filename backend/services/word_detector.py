@@ -0,0 +1,207 @@
+"""
+Local detection of target-word usage.
+
+The vocabulary index builds a `LemmaIndex`: every surface form of every
+word (plurals, -s/-ed/-ing forms, comparatives, common irregular verbs)
+mapped to the word itself. A message is tokenized once and each token (or
+n-gram, for phrases like "thank you") is looked up, so detection costs a
+few dict lookups per token.
+
+This is a deterministic first pass. A target word that does not appear in
+any form cannot have been used. A word that does appear is a *candidate*,
+and the LLM still judges whether it was used meaningfully. Turns with no
+candidates leave the word-usage instructions out of the prompt.
+
+Speech transcripts can also misspell a target word ("sinceerly"):
+`near_misses()` finds tokens close to a target word without being one of
+its forms. They are candidates in speaking mode, and make
+transcription_service post-process a transcript.
+
+Forms are over-generated on purpose (e.g. both "budgeted" and
+"budgetted"). A spurious form only costs a lookup, while a missing one
+would hide a real use.
+"""
+
+import re
+from difflib import SequenceMatcher
+
+_TOKEN = re.compile(r"[a-z]+")
+_VOWELS = set("aeiou")
+# Tokens this similar to a target word (but not one of its forms) are
+# treated as a misrecognised target word
+NEAR_MISS_RATIO = 0.7
+NEAR_MISS_MIN_LENGTH = 4
+
+IRREGULAR_FORMS = {
+    "be": ("am", "is", "are", "was", "were", "been", "being"),
+    "have": ("has", "had", "having"),
+    "do": ("does", "did", "done", "doing"),
+    "go": ("goes", "went", "gone", "going"),
+    "eat": ("ate", "eaten"),
+    "drink": ("drank", "drunk"),
+    "make": ("made",),
+    "take": ("took", "taken"),
+    "give": ("gave", "given"),
+    "see": ("saw", "seen"),
+    "come": ("came",),
+    "get": ("got", "gotten"),
+    "find": ("found",),
+    "think": ("thought",),
+    "tell": ("told",),
+    "feel": ("felt",),
+    "leave": ("left",),
+    "bring": ("brought",),
+    "buy": ("bought",),
+    "begin": ("began", "begun"),
+    "keep": ("kept",),
+    "write": ("wrote", "written"),
+    "spend": ("spent",),
+    "lose": ("lost",),
+    "pay": ("paid",),
+    "meet": ("met",),
+    "run": ("ran",),
+    "speak": ("spoke", "spoken"),
+    "choose": ("chose", "chosen"),
+    "drive": ("drove", "driven"),
+    "forget": ("forgot", "forgotten"),
+    "grow": ("grew", "grown"),
+    "know": ("knew", "known"),
+    "break": ("broke", "broken"),
+    "teach": ("taught",),
+    "catch": ("caught",),
+    "sell": ("sold",),
+    "send": ("sent",),
+    "build": ("built",),
+    "understand": ("understood",),
+    "undertake": ("undertook", "undertaken"),
+    "overcome": ("overcame",),
+    "withdraw": ("withdrew", "withdrawn"),
+    "big": ("bigger", "biggest"),
+    "good": ("better", "best"),
+    "bad": ("worse", "worst"),
+}
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN.findall(text.lower())
+
+
+def _ends_cvc(word: str) -> bool:
+    return (
+        len(word) >= 3
+        and word[-1] not in _VOWELS
+        and word[-1] not in "wxy"
+        and word[-2] in _VOWELS
+        and word[-3] not in _VOWELS
+    )
+
+
+def inflections(word: str) -> set[str]:
+    """Surface forms of a single word (the word itself included)."""
+    word = word.lower()
+    forms = {word}
+    forms.update(IRREGULAR_FORMS.get(word, ()))
+
+    # plural / 3rd person singular
+    if word.endswith("y") and len(word) > 2 and word[-2] not in _VOWELS:
+        forms.add(word[:-1] + "ies")
+    elif word.endswith(("s", "x", "z", "ch", "sh")):
+        forms.add(word + "es")
+    else:
+        forms.add(word + "s")
+    if word.endswith("s") and len(word) > 3:
+        # vocabulary entries given in the plural ("implications")
+        forms.add(word[:-1])
+
+    # past tense / participle / comparative
+    if word.endswith("e"):
+        forms.update((word + "d", word + "r", word + "st", word[:-1] + "ing"))
+    elif word.endswith("y") and len(word) > 2 and word[-2] not in _VOWELS:
+        forms.update((word[:-1] + "ied", word[:-1] + "ier", word[:-1] + "iest", word + "ing"))
+    else:
+        forms.update((word + "ed", word + "er", word + "est", word + "ing"))
+    if word.endswith("ie"):
+        forms.add(word[:-2] + "ying")
+    if _ends_cvc(word):
+        doubled = word + word[-1]
+        forms.update((doubled + "ed", doubled + "er", doubled + "est", doubled + "ing"))
+    return forms
+
+
+def near_misses(text: str, words: list[str]) -> list[str]:
+    """Words from `words` that `text` has a near-miss spelling of, in `words` order.
+
+    A near miss is a token of 4+ letters, within two letters in length and
+    NEAR_MISS_RATIO similarity of one of the word's tokens, that is not an
+    inflected form of any of `words`.
+    """
+    targets = {
+        word: [t for t in tokenize(word) if len(t) >= NEAR_MISS_MIN_LENGTH] for word in words
+    }
+    forms = set().union(*(inflections(t) for ts in targets.values() for t in ts))
+    tokens = {t for t in tokenize(text) if len(t) >= NEAR_MISS_MIN_LENGTH and t not in forms}
+    return [
+        word
+        for word, word_tokens in targets.items()
+        if any(
+            abs(len(token) - len(target)) <= 2
+            and SequenceMatcher(None, token, target).ratio() >= NEAR_MISS_RATIO
+            for token in tokens
+            for target in word_tokens
+        )
+    ]
+
+
+class LemmaIndex:
+    """Surface form -> vocabulary words it can stand for."""
+
+    def __init__(self, words: list[str] = ()):
+        self._forms: dict[str, set[str]] = {}
+        # Multi-word entries, keyed by token tuple
+        self._phrases: dict[tuple[str, ...], set[str]] = {}
+        self._phrase_heads: set[str] = set()
+        self.max_tokens = 1
+        for word in words:
+            self.add(word)
+
+    def __len__(self) -> int:
+        return len(self._forms) + len(self._phrases)
+
+    def add(self, word: str) -> None:
+        tokens = tokenize(word)
+        if not tokens:
+            return
+        if len(tokens) == 1:
+            for form in inflections(tokens[0]):
+                self._forms.setdefault(form, set()).add(word)
+            return
+        # Phrases inflect on their head (first) word: "looked forward to".
+        for head in inflections(tokens[0]):
+            self._phrases.setdefault((head, *tokens[1:]), set()).add(word)
+            self._phrase_heads.add(head)
+        self.max_tokens = max(self.max_tokens, len(tokens))
+
+    def detect(self, text: str, words: list[str], near_miss: bool = False) -> list[str]:
+        """Words from `words` that appear in `text` in some form, in `words` order.
+
+        `near_miss`: also words `text` only has a near-miss spelling of
+        (speech transcripts).
+        """
+        if not words:
+            return []
+        wanted = set(words)
+        tokens = tokenize(text)
+        found: set[str] = set()
+        forms, heads = self._forms, self._phrase_heads
+        for i, token in enumerate(tokens):
+            lemmas = forms.get(token)
+            if lemmas:
+                found.update(lemmas & wanted)
+            if token in heads:
+                for n in range(2, min(self.max_tokens, len(tokens) - i) + 1):
+                    lemmas = self._phrases.get(tuple(tokens[i:i + n]))
+                    if lemmas:
+                        found.update(lemmas & wanted)
+        if near_miss:
+            found.update(near_misses(text, [w for w in words if w not in found]))
+        return [w for w in words if w in found]
@@ -0,0 +1,63 @@
+"""
+O(k) word sampling from the per-level id arrays of the vocabulary index.
+
+Words are drawn by rejection sampling: pick a random position in the level's
+id tuple and reject it if it was recently studied or already picked. When
+recent words are a small fraction of the level this takes O(k) expected
+draws and never scans the level. If too many draws are rejected (the level
+is nearly exhausted), it falls back to one O(n) pass that prefers fresh
+words and tops up with recent ones.
+"""
+
+import random
+from typing import Collection, Sequence
+
+# Draw budget per requested word before falling back to a scan.
+MAX_DRAWS_PER_WORD = 8
+
+
+def sample_ids(
+    pool: Sequence[str],
+    k: int,
+    exclude: Collection[str] = (),
+    rng: random.Random | None = None,
+) -> list[str]:
+    """Pick up to `k` distinct ids from `pool`, avoiding `exclude` when possible."""
+    rng = rng or random
+    n = len(pool)
+    if k <= 0 or n == 0:
+        return []
+    if k >= n:
+        chosen = list(pool)
+        rng.shuffle(chosen)
+        return chosen
+
+    chosen: list[str] = []
+    seen: set[str] = set()
+    draws = MAX_DRAWS_PER_WORD * k
+    while len(chosen) < k and draws > 0:
+        draws -= 1
+        word_id = pool[rng.randrange(n)]
+        if word_id in seen or word_id in exclude:
+            continue
+        seen.add(word_id)
+        chosen.append(word_id)
+
+    if len(chosen) < k:
+        chosen.extend(_fill(pool, k - len(chosen), exclude, seen, rng))
+    return chosen
+
+
+def _fill(
+    pool: Sequence[str],
+    need: int,
+    exclude: Collection[str],
+    seen: set[str],
+    rng,
+) -> list[str]:
+    """Slow path: fresh words first, then recent ones if the level runs low."""
+    fresh = [i for i in pool if i not in seen and i not in exclude]
+    if len(fresh) >= need:
+        return rng.sample(fresh, need)
+    recent = [i for i in pool if i not in seen and i in exclude]
+    return fresh + rng.sample(recent, min(need - len(fresh), len(recent)))
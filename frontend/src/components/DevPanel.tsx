@@ -52,7 +52,9 @@ export default function DevPanel() {
   const handleTogglePremium = async () => {
     if (!user) return
     try {
-      await api.patch(`/auth/dev-update`, { is_premium: !user.is_premium })
+      const { data: updated } = await api.patch(`/auth/dev-update`, { is_premium: !user.is_premium })
+      // 프리미엄 변경 시 기존 토큰은 무효화되고 새 토큰이 온다
+      if (updated.access_token) localStorage.setItem('access_token', updated.access_token)
       const { data } = await api.get('/auth/me')
       setUser({ ...user, ...data })
       setMessage(`프리미엄: ${!user.is_premium ? 'ON' : 'OFF'}`)
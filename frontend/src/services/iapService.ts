@@ -5,11 +5,15 @@ export const iapService = {
   async verifyPurchase(
     orderId: string,
     productId: string
-  ): Promise<{ verified: boolean; subscription: any }> {
+  ): Promise<{ verified: boolean; subscription: any; access_token?: string }> {
     const { data } = await api.post('/iap/verify', {
       order_id: orderId,
       product_id: productId,
     })
+    // 구독 상태가 담긴 새 토큰 (기존 토큰으로는 프리미엄 기능을 쓸 수 없음)
+    if (data.access_token) {
+      localStorage.setItem('access_token', data.access_token)
+    }
     return data
   },
 